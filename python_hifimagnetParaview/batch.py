@@ -0,0 +1,218 @@
+"""Batch post-processing of many result files
+
+Runs the cli on a list (or glob) of case files in a bounded pool of worker
+processes. Each worker imports ParaView once and is reused across cases
+(the session is reset between cases), pint units are created once per
+worker. The status, timing and log file of every case are gathered in a
+csv index.
+
+    hifimagnet-paraview-batch "sweep/*/*/*/Export.case" --workers 4 -- 3D --stats --histos
+
+ParaView is only imported by the workers.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextlib
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+import pandas as pd
+from tabulate import tabulate
+
+INDEX = ["case", "status", "seconds", "exports", "log", "error"]
+
+
+def splitArgs(argv: list[str]) -> tuple:
+    """split batch arguments and cli arguments at `--`
+
+    Args:
+        argv (list[str]): command line arguments
+
+    Returns:
+        tuple: batch arguments, cli arguments (dimmension first)
+    """
+    if "--" not in argv:
+        return argv, []
+    i = argv.index("--")
+    return argv[:i], argv[i + 1 :]
+
+
+def expandCases(patterns: list[str]) -> list[str]:
+    """expand case files and glob patterns
+
+    Args:
+        patterns (list[str]): case files or glob patterns (`**` allowed)
+
+    Returns:
+        list[str]: existing case files, sorted, without duplicates
+    """
+    cases = set()
+    for pattern in patterns:
+        cases.update(
+            file for file in glob.glob(pattern, recursive=True) if os.path.isfile(file)
+        )
+    return sorted(cases)
+
+
+def caseArgs(case: str, options: list[str]) -> list[str]:
+    """cli arguments for a case
+
+    Args:
+        case (str): case file
+        options (list[str]): cli arguments, dimmension first (eg. ["3D", "--stats"])
+
+    Returns:
+        list[str]: arguments of cli.main
+    """
+    return [options[0], case] + options[1:]
+
+
+@contextlib.contextmanager
+def redirectOutput(file):
+    """redirect stdout and stderr to a file at file descriptor level
+
+    the output written by the VTK/ParaView C++ code does not go through
+    sys.stdout, so the descriptors 1 and 2 are duplicated onto the file
+
+    Args:
+        file: file opened for writing
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    os.dup2(file.fileno(), 1)
+    os.dup2(file.fileno(), 2)
+    try:
+        with contextlib.redirect_stdout(file), contextlib.redirect_stderr(file):
+            yield
+    finally:
+        file.flush()
+        for fd, copy in zip([1, 2], saved, strict=True):
+            os.dup2(copy, fd)
+            os.close(copy)
+
+
+def runCase(case: str, options: list[str]) -> dict:
+    """post-process a case in the current (worker) process
+
+    the output of the cli (and of ParaView) is written to
+    paraview.exports/batch.log
+
+    Args:
+        case (str): case file
+        options (list[str]): cli arguments, dimmension first
+
+    Returns:
+        dict: index row (see INDEX)
+    """
+    from paraview.simple import ResetSession
+
+    from .cli import main
+
+    exports = f"{os.path.dirname(case)}/paraview.exports"
+    os.makedirs(exports, exist_ok=True)
+    logfile = f"{exports}/batch.log"
+    row = {"case": case, "status": "ok", "exports": exports, "log": logfile}
+    row["error"] = ""
+
+    start = time.perf_counter()
+    with open(logfile, "w", buffering=1) as log, redirectOutput(log):
+        try:
+            code = main(caseArgs(case, options))
+        except SystemExit as e:
+            code = e.code
+        except Exception as e:
+            code = 1
+            row["error"] = repr(e)
+        finally:
+            ResetSession()
+    if code:
+        row["status"] = "failed"
+        if not row["error"]:
+            row["error"] = f"exit code {code}"
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def writeIndex(rows: list[dict], file: str) -> pd.DataFrame:
+    """write the batch index
+
+    Args:
+        rows (list[dict]): one row per case (see runCase)
+        file (str): csv file name
+
+    Returns:
+        pd.DataFrame: index sorted by case
+    """
+    df = pd.DataFrame(rows, columns=INDEX).sort_values("case", ignore_index=True)
+    df.to_csv(file, index=False)
+    return df
+
+
+def options(description: str, epilog: str):
+    """
+    define options
+    """
+    parser = argparse.ArgumentParser(description=description, epilog=epilog)
+    parser.add_argument(
+        "cases", nargs="+", help="case files or glob patterns (ex. 'sweep/**/Export.case')"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="number of worker processes", default=2
+    )
+    parser.add_argument(
+        "--index", type=str, help="csv index of the cases", default="batch-index.csv"
+    )
+    return parser
+
+
+def main(argv: list[str] = None):
+    """run the cli on many case files"""
+    if argv is None:
+        argv = sys.argv[1:]
+    (argv, cli) = splitArgs(argv)
+    parser = options(
+        "post-process many result files",
+        "cli arguments follow `--`, ex: -- 3D --stats --histos",
+    )
+    args = parser.parse_args(argv)
+    if not cli:
+        parser.error("missing cli arguments after `--` (ex. -- 3D --stats)")
+
+    cases = expandCases(args.cases)
+    if not cases:
+        parser.error(f"no case file found for {args.cases}")
+    print(f"batch: {len(cases)} cases, {args.workers} workers", flush=True)
+
+    # workers are forked before ParaView is imported
+    context = None
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        futures = {pool.submit(runCase, case, cli): case for case in cases}
+        for future in as_completed(futures):
+            case = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                row = {"case": case, "status": "failed", "error": repr(e)}
+            print(
+                f"batch: {row['status']} {case} ({row.get('seconds', 0):.1f}s)",
+                flush=True,
+            )
+            rows.append(row)
+
+    df = writeIndex(rows, args.index)
+    print(tabulate(df[["case", "status", "seconds"]], headers="keys", tablefmt="psql"))
+    print(f"batch: index saved to {args.index}", flush=True)
+    return int((df["status"] != "ok").any())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
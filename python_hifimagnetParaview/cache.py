@@ -0,0 +1,115 @@
+"""Derived-dataset cache
+
+The dataset built by meshinfo (CellDatatoPointData, derived fields, CellSize)
+is saved under `paraview.exports/cache/` and reused by later runs on the
+same input. The cache key is a hash of the input files (content of the case
+file, name, size and mtime of the data files), the package version and the
+derivation options. This module does not depend on ParaView.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from . import __version__
+from .ensight import caseFiles
+
+
+def inputFingerprint(file: str) -> dict:
+    """fingerprint of an input file and of the data files it references
+
+    Args:
+        file (str): input file (ex. Export.case)
+
+    Returns:
+        dict: {"case": sha256 of file content, "files": [[name, size, mtime], ...]}
+    """
+    with open(file, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    files = []
+    if file.endswith(".case"):
+        for data in caseFiles(file):
+            stat = os.stat(data)
+            files.append([os.path.basename(data), stat.st_size, stat.st_mtime_ns])
+
+    return {"case": digest, "files": files}
+
+
+def cacheKey(file: str, options: dict) -> str:
+    """cache key for the derived dataset of an input file
+
+    Args:
+        file (str): input file (ex. Export.case)
+        options (dict): derivation options (must be json serializable)
+
+    Returns:
+        str: hexadecimal key
+    """
+    data = {
+        "input": inputFingerprint(file),
+        "version": __version__,
+        "options": options,
+    }
+    text = json.dumps(data, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def cachePath(basedir: str, key: str, name: str = "cellsize") -> str:
+    """path of a cached dataset, without extension
+
+    the extension is .vtm for MultiBlock datasets, .vtu otherwise,
+    a ResultStore dump ("store") is a directory
+
+    Args:
+        basedir (str): result directory
+        key (str): cache key
+        name (str, optional): dataset name. Defaults to "cellsize".
+
+    Returns:
+        str: {basedir}/cache/{name}-{key}
+    """
+    return f"{basedir}/cache/{name}-{key}"
+
+
+def clearCache(basedir: str, name: str = None):
+    """remove cached datasets
+
+    Args:
+        basedir (str): result directory
+        name (str, optional): only remove the entries of this dataset.
+            Defaults to None (remove all).
+    """
+    cachedir = f"{basedir}/cache"
+    if not os.path.isdir(cachedir):
+        return
+    if name is None:
+        print(f"clearCache: remove {cachedir}", flush=True)
+        shutil.rmtree(cachedir)
+        return
+
+    for entry in os.listdir(cachedir):
+        if entry.startswith(f"{name}-"):
+            path = f"{cachedir}/{entry}"
+            print(f"clearCache: remove {path}", flush=True)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+
+def clearEntry(path: str):
+    """remove a single cached dataset
+
+    Args:
+        path (str): cache path without extension (see cachePath), the .vtm/.vtu
+            files and the block directory or store directory are removed
+    """
+    for entry in [path, f"{path}.vtm", f"{path}.vtu"]:
+        if os.path.isdir(entry):
+            print(f"clearEntry: remove {entry}", flush=True)
+            shutil.rmtree(entry)
+        elif os.path.isfile(entry):
+            print(f"clearEntry: remove {entry}", flush=True)
+            os.remove(entry)
@@ -1,22 +1,38 @@
+import numpy as np
 import pandas as pd
-import os
-import gc
 
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
-from numpy import pi, arctan2
 from math import pi, cos, sin
 
-from paraview.simple import (
-    CellDatatoPointData,
-    PlotOverLine,
-    Delete,
-    CreateWriter,
-    SetActiveSource,
+from ..method import (
+    convert_data,
+    showplot,
+    plot_greySpace,
+    keyinfo,
+    sampleLines,
+    PointDataCache,
 )
+from ..probe import ProbeLines, lineFields, THETA_RESOLUTION, VALID
+from ..grid import CylindricalGrid
 
-from ..method import convert_data, resultinfo, showplot, plot_greySpace, keyinfo
-from ..view import makeclip, makecylinderslice
+
+def orLine(r: list[float], theta: float) -> tuple:
+    """end points of a line along r
+
+    Args:
+        r (list[float]): [r_start, r_end]
+        theta (float): angle of the line in degree
+
+    Returns:
+        tuple: Point1, Point2
+    """
+    [r0, r1] = r
+    radian = theta * pi / 180.0
+    return (
+        [r0 * cos(radian), r0 * sin(radian), 0],
+        [r1 * cos(radian), r1 * sin(radian), 0],
+    )
 
 
 def plotOr(
@@ -31,6 +47,7 @@ def plotOr(
     axs: dict = None,  # dict of fig ax for each field
     greyspace: bool = False,
     argsfield: str = None,
+    samples: dict = None,
 ) -> dict:
     """plot vs r for a given theta
 
@@ -46,35 +63,22 @@ def plotOr(
         axs (dict, optional): dict containing fig,ax,legend for each exported fields. Defaults to None.
         greyspace (bool, optional): plot grey vertical bars to fill holes in plots (slits/channels). Defaults to False.
         argsfield (str, optional): selected field to display. Defaults to None.
+        samples (dict, optional): {key: values} sampled along the line
+            (see method.sampleLines), sampled here if None. Defaults to None.
 
     Returns:
         dict: contains fig,ax,legend for each exported fields
     """
 
     [r0, r1] = r
-    radian = theta * pi / 180.0
-
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-
-    plotOverLine = PlotOverLine(registrationName="Oz", Input=cellDatatoPointData1)
-
-    # init the 'Line' selected for 'Source'
-    plotOverLine.Point1 = [r0 * cos(radian), r0 * sin(radian), 0]
-    plotOverLine.Point2 = [r1 * cos(radian), r1 * sin(radian), 0]
-
-    filename = f"{basedir}/plots/r0={r0}m-r1={r1}m-theta={theta}deg.csv"
-    export = CreateWriter(filename, proxy=plotOverLine)
-    if not printed:
-        for prop in export.ListProperties():
-            print(f"export: {prop}={export.GetPropertyValue(prop)}")
-    export.UpdateVTKObjects()  # is it needed?
-    export.UpdatePipeline()
+    if samples is None:
+        lines = ProbeLines()
+        lines.add("Or", *orLine(r, theta))
+        samples = sampleLines(input, lines)["Or"]
 
     # plot with matplotlib
     def plotOrField(
-        file,
+        samples: dict,
         key: str,
         theta: float,
         fieldunits: dict,
@@ -84,7 +88,7 @@ def plotOr(
         greyspace: bool = False,
     ):
         [fig, ax, legend] = axs
-        print(f"plotOrField: file={file}, key={key}", flush=True)
+        print(f"plotOrField: key={key}", flush=True)
         (toolbox, physic, fieldname) = keyinfo(key)
         # print(f"physic={physic}, fieldname={fieldname}", flush=True)
         # print(f'fieldunits[fieldname]={fieldunits[fieldname]}"', flush=True)
@@ -99,12 +103,7 @@ def plotOr(
             ax = plt.gca()
 
         # see vonmises-vs-theta.py and/or vonmises-vs-theta-plot-savedata.py
-        csv = pd.read_csv(file)
-        keycsv = csv[["arc_length", key]]
-
-        # rename columns
-        keycsv.rename(columns={"arc_length": "r"}, inplace=True)
-        keycsv["r"] = keycsv["r"] + r0
+        keycsv = pd.DataFrame({"r": samples["arc_length"] + r0, key: samples[key]})
         # print(f"new keys: {keycsv.columns.values.tolist()}")
 
         # rescale columns to plot
@@ -127,40 +126,26 @@ def plotOr(
         keycsv.to_csv(f"{basedir}/plots/{key}-vs-r-theta={theta}deg.csv")
         return legend
 
-    # requirements: create PointData from CellData
-    # for field in input.PointData.keys():
-    datadict = resultinfo(cellDatatoPointData1, ignored_keys)
-    for field in datadict["PointData"]["Arrays"]:
-        if not field in ignored_keys and (not argsfield or field.startswith(argsfield)):
-            kdata = datadict["PointData"]["Arrays"][field]
-            Components = kdata["Components"]
-            print(f"plotOrField for {field} - components={Components}", flush=True)
-            if Components > 1:
-                for i in range(Components):
-                    print(f"plotOrField for {field}:{i} skipped", flush=True)
-            else:
-                if field not in axs:  # if field not in dict -> create fig, ax,legend
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    axs[field] = [fig, ax, []]
-                axs[field][2] = plotOrField(
-                    filename,
-                    field,
-                    theta,
-                    fieldunits,
-                    basedir,
-                    axs=axs[field],
-                    marker=marker,
-                    greyspace=greyspace,
-                )
-
-    # remove temporary csv files
-    os.remove(filename)
-
-    Delete(plotOverLine)
-    del plotOverLine
-
-    Delete(cellDatatoPointData1)
-    del cellDatatoPointData1
+    # PointData (CellData interpolated to points) sampled along the line
+    for field, Components in lineFields(samples, ignored_keys, argsfield).items():
+        print(f"plotOrField for {field} - components={Components}", flush=True)
+        if Components > 1:
+            for i in range(Components):
+                print(f"plotOrField for {field}:{i} skipped", flush=True)
+        else:
+            if field not in axs:  # if field not in dict -> create fig, ax,legend
+                fig, ax = plt.subplots(figsize=(12, 8))
+                axs[field] = [fig, ax, []]
+            axs[field][2] = plotOrField(
+                samples,
+                field,
+                theta,
+                fieldunits,
+                basedir,
+                axs=axs[field],
+                marker=marker,
+                greyspace=greyspace,
+            )
     return axs
 
 
@@ -175,10 +160,13 @@ def plotTheta(
     marker: str = None,
     axs: dict = None,  # dict of fig,ax for each field
     argsfield: str = None,
+    pointdata: PointDataCache = None,
+    resolution: int = THETA_RESOLUTION,
+    samples: dict = None,
 ) -> dict:
     """plot along theta for a given r
 
-    for theta, need to apply CellDataToPointData filter
+    the fields are sampled on a circle of radius r (see probe.ProbeLines)
 
     Args:
         input: paraview reader
@@ -191,41 +179,26 @@ def plotTheta(
         marker (str, optional): plot on specific marker. Defaults to None.
         axs (dict, optional): dict containing fig,ax,legend for each exported fields. Defaults to None.
         argsfield (str, optional): selected field to display. Defaults to None.
+        pointdata (PointDataCache, optional): reuse the point data of input,
+            built and released here if None. Defaults to None.
+        resolution (int, optional): number of angular segments.
+            Defaults to THETA_RESOLUTION.
+        samples (dict, optional): {key: values} sampled along the circle
+            (see method.sampleLines), sampled here if None. Defaults to None.
 
     Returns:
         dict: contains fig,ax,legend for each exported fields
     """
 
     print(f"plotTheta: r={r}", flush=True)
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-
-    # create clip with plane (howto give a color for each clip)
-    print("cellDatatoPointDatalip up and down", flush=True)
-    clip_down = makeclip(cellDatatoPointData1, "clip_down", invert=False)
-    clip_up = makeclip(cellDatatoPointData1, "clip_up", invert=True)
-
-    files = []
-    for i, clip in enumerate([clip_down, clip_up]):
-        if clip.PointData.keys():
-            slice = makecylinderslice(clip, f"slice{i}", r)
-            SetActiveSource(slice)
-
-            export = CreateWriter(
-                f"{basedir}/plots/r={r}m-{i}.csv",
-                proxy=slice,
-            )
-            if not printed:
-                for prop in export.ListProperties():
-                    print(f"export: {prop}={export.GetPropertyValue(prop)}", flush=True)
-            export.UpdateVTKObjects()  # is it needed?
-            export.UpdatePipeline()
-            files.append(f"{basedir}/plots/r={r}m-{i}.csv")
+    if samples is None:
+        lines = ProbeLines()
+        lines.addCircle("Otheta", r, 0, resolution)
+        samples = sampleLines(input, lines, pointdata)["Otheta"]
 
     # plot with matplotlib
     def plotThetaField(
-        files,
+        samples: dict,
         key: str,
         r: float,
         fieldunits: dict,
@@ -234,7 +207,7 @@ def plotTheta(
         marker: str = None,
     ):
         [fig, ax, legend] = axs
-        print(f"plotThetaField: files={files}, key={key}", flush=True)
+        print(f"plotThetaField: key={key}", flush=True)
         (toolbox, physic, fieldname) = keyinfo(key)
         symbol = fieldunits[fieldname]["Symbol"]
         msymbol = symbol
@@ -246,48 +219,28 @@ def plotTheta(
             ax = plt.gca()
 
         # see vonmises-vs-theta.py and/or vonmises-vs-theta-plot-savedata.py
-        keycsv_dfs = []
-        for file in files:
-            csv = pd.read_csv(file)
-            keycsv = csv[["Points:0", "Points:1", key]]
-
-            # rename columns
-            keycsv.rename(columns={"Points:0": "x", "Points:1": "y"}, inplace=True)
-            # print(f"new keys: {keycsv.columns.values.tolist()}", flush=True)
-
-            # rescale columns to plot
-            theta = arctan2(keycsv["y"].to_numpy(), keycsv["x"].to_numpy()) * 180 / pi
-            # print(f'theta (type={type(theta)}, nelem={theta.shape}): {theta}', flush=True)
-            keycsv["theta"] = keycsv.apply(
-                lambda row: arctan2(row.y, row.x) * 180 / pi,
-                axis=1,
-            )
-
-            # Sort the rows of dataframe by 'Name' column
-            keycsv = keycsv.sort_values(by="theta")
-            # # drop last line
-            # print(f"drop first line from {file}", flush=True)
-            # keycsv.drop(index=keycsv.index[-1], axis=0, inplace=True)
-
-            units = {fieldname: fieldunits[fieldname]["Units"]}
-            values = keycsv[key].to_list()
-            out_values = convert_data(units, values, fieldname)
-            ndf = {key: [val for val in out_values]}
-
-            keycsv[key] = ndf[key]
-            keycsv_dfs.append(keycsv)
+        radian = samples["theta"] * pi / 180.0
+        df = pd.DataFrame(
+            {
+                "x": r * np.cos(radian),
+                "y": r * np.sin(radian),
+                key: samples[key],
+                "theta": samples["theta"],
+            }
+        )
+        # drop the points outside the mesh (eg. --cliptheta)
+        df = df[samples[VALID] > 0]
 
-            del ndf
+        # rescale columns to plot
+        units = {fieldname: fieldunits[fieldname]["Units"]}
+        values = df[key].to_list()
+        out_values = convert_data(units, values, fieldname)
+        df[key] = [val for val in out_values]
 
-        df = pd.concat(keycsv_dfs)
-        df = df.sort_values(by="theta")
         r_units = {"coord": fieldunits["coord"]["Units"]}
         mm = f'{fieldunits["coord"]["Units"][1]:~P}'
         r_mm = convert_data(r_units, r, "coord")
         df.to_csv(f"{basedir}/plots/{key}-vs-theta-r={r_mm}{mm}.csv")
-        # print(f"df keys: {df.columns.values.tolist()}", flush=True)
-        # assert key in df.columns.values.tolist(), f"{key} not in df_keys"
-        # print(f"df={df}", flush=True)
         df.plot(x="theta", y=key, marker=marker, grid=True, ax=ax)
         legend.append(f"r={r_mm:.0f}{mm}")
 
@@ -305,48 +258,38 @@ def plotTheta(
         print(f"{df[key].describe()}", flush=True)
         return legend
 
-    # requirements: create PointData from CellData
-    datadict = resultinfo(cellDatatoPointData1, ignored_keys)
-    for field in datadict["PointData"]["Arrays"]:
-        if not field in ignored_keys and (not argsfield or field.startswith(argsfield)):
-            kdata = datadict["PointData"]["Arrays"][field]
-            Components = kdata["Components"]
-            print(f"plotThetaField for {field} - components={Components}", flush=True)
-            if Components > 1:
-                for i in range(Components):
-                    print(f"plotThetaField for {field}:{i} skipped", flush=True)
-                # for i in range(Components):
-                #     plotThetaField(files, f"{field}:{i}", r, z, ax=None, show=show)
-            else:
-                if field not in axs:  # if field not in dict -> create fig, ax
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    axs[field] = [fig, ax, []]
-                axs[field][2] = plotThetaField(
-                    files,
-                    field,
-                    r,
-                    fieldunits,
-                    basedir,
-                    axs=axs[field],
-                    marker=marker,
-                )
-
-    # remove temporary csv files
-    for file in files:
-        os.remove(file)
-
-    Delete(cellDatatoPointData1)
-    del cellDatatoPointData1
-
-    # Force a garbage collection
-    collected = gc.collect()
-    if verbose:
-        print(f"Garbage collector: collected {collected} objects.", flush=True)
+    # PointData (CellData interpolated to points) sampled along the circle
+    for field, Components in lineFields(samples, ignored_keys, argsfield).items():
+        print(f"plotThetaField for {field} - components={Components}", flush=True)
+        if Components > 1:
+            for i in range(Components):
+                print(f"plotThetaField for {field}:{i} skipped", flush=True)
+        else:
+            if field not in axs:  # if field not in dict -> create fig, ax
+                fig, ax = plt.subplots(figsize=(12, 8))
+                axs[field] = [fig, ax, []]
+            axs[field][2] = plotThetaField(
+                samples,
+                field,
+                r,
+                fieldunits,
+                basedir,
+                axs=axs[field],
+                marker=marker,
+            )
 
     return axs
 
 
-def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir: str):
+def makeplot(
+    args,
+    cellsize,
+    fieldunits: dict,
+    ignored_keys: list[str],
+    basedir: str,
+    pointdata: PointDataCache = None,
+    grid: CylindricalGrid = None,
+):
     """different plot situations for 2D
 
     * if 2 args.r and args.theta: plot Or from r0 to r1 at theta=args.theta
@@ -358,6 +301,10 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
         fieldunits (dict): dict of field units
         ignored_keys (list[str]): list of ignored fields
         basedir (str): result directory
+        pointdata (PointDataCache, optional): point data shared with the
+            other stages (see method.PointDataCache). Defaults to None.
+        grid (CylindricalGrid, optional): sample the plots in the resampled
+            dataset (see method.resampleGrid). Defaults to None.
     """
     if args.r:
         title = ""
@@ -367,6 +314,17 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
             title = title + f"\nB0={fieldunits['B0']['Val']}T"
         if fieldunits["Bbg"]["Val"]:
             title = title + f"\nBackground field: {fieldunits['Bbg']['Val']}"
+
+        # sample all the Otheta circles and Or lines in a single probe
+        lines = ProbeLines()
+        if len(args.r) != 2 or not args.theta:
+            for r in args.r:
+                lines.addCircle(f"Otheta-r={r}", r, 0)
+        if args.theta and len(args.r) == 2:
+            for theta in args.theta:
+                lines.add(f"Or-theta={theta}", *orLine(args.r, theta))
+        samples = sampleLines(cellsize, lines, pointdata, grid)
+
         if len(args.r) != 2 or not args.theta:
             figaxs = {}
             for r in args.r:
@@ -379,6 +337,7 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
                     marker=args.plotsMarker,
                     axs=figaxs,
                     argsfield=args.field,
+                    samples=samples[f"Otheta-r={r}"],
                 )
 
             showplot(figaxs, f"-vs-theta", basedir, title=title, show=args.show)
@@ -398,6 +357,7 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
                     axs=figaxs,
                     greyspace=args.greyspace,
                     argsfield=args.field,
+                    samples=samples[f"Or-theta={theta}"],
                 )  # with r=[r1, r2]
 
             showplot(
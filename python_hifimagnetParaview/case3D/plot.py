@@ -1,22 +1,57 @@
+import numpy as np
 import pandas as pd
-import os
-import gc
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
-from numpy import pi, arctan2
 from math import pi, cos, sin
 
-from paraview.simple import (
-    PlotOnIntersectionCurves,
-    CellDatatoPointData,
-    PlotOverLine,
-    Delete,
-    CreateWriter,
-    SetActiveSource,
+from ..method import (
+    convert_data,
+    showplot,
+    plot_greySpace,
+    keyinfo,
+    sampleLines,
+    PointDataCache,
 )
+from ..probe import ProbeLines, lineFields, THETA_RESOLUTION, VALID
+from ..grid import CylindricalGrid
 
-from ..method import convert_data, resultinfo, showplot, plot_greySpace, keyinfo
-from ..view import makeclip, makecylinderslice
+
+def orLine(r: list[float], theta: float, z: float) -> tuple:
+    """end points of a line along r
+
+    Args:
+        r (list[float]): [r_start, r_end]
+        theta (float): angle of the line in degree
+        z (float): z coordinate of the line in m
+
+    Returns:
+        tuple: Point1, Point2
+    """
+    [r0, r1] = r
+    radian = theta * pi / 180.0
+    return (
+        [r0 * cos(radian), r0 * sin(radian), z],
+        [r1 * cos(radian), r1 * sin(radian), z],
+    )
+
+
+def ozLine(r: float, theta: float, z: list[float]) -> tuple:
+    """end points of a line along z
+
+    Args:
+        r (float): r coordinate of the line in m
+        theta (float): angle of the line in degree
+        z (list[float]): [z_start, z_end]
+
+    Returns:
+        tuple: Point1, Point2
+    """
+    [z0, z1] = z
+    radian = theta * pi / 180.0
+    return (
+        [r * cos(radian), r * sin(radian), z0],
+        [r * cos(radian), r * sin(radian), z1],
+    )
 
 
 def plotOr(
@@ -32,6 +67,7 @@ def plotOr(
     axs: dict = None,  # dict of fig,ax for each field
     greyspace: bool = False,
     argsfield: str = None,
+    samples: dict = None,
 ) -> dict:
     """plot vs r for a given theta and a given z
 
@@ -48,41 +84,21 @@ def plotOr(
         axs (dict, optional): dict containing fig,ax,legend for each exported fields. Defaults to None.
         greyspace (bool, optional): plot grey vertical bars to fill holes in plots (slits/channels). Defaults to False.
         argsfield (str, optional): selected field to display. Defaults to None.
+        samples (dict, optional): {key: values} sampled along the line
+            (see method.sampleLines), sampled here if None. Defaults to None.
 
     Returns:
         dict: contains fig,ax,legend for each exported fields
     """
     [r0, r1] = r
-    radian = theta * pi / 180.0
-
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-
-    plotOverLine = PlotOverLine(registrationName="Oz", Input=cellDatatoPointData1)
-    # get params list
-    if not printed:
-        for prop in plotOverLine.ListProperties():
-            print(
-                f"plotOverLine': {prop}={plotOverLine.GetPropertyValue(prop)}",
-                flush=True,
-            )
-
-    # init the 'Line' selected for 'Source'
-    plotOverLine.Point1 = [r0 * cos(radian), r0 * sin(radian), z]
-    plotOverLine.Point2 = [r1 * cos(radian), r1 * sin(radian), z]
-
-    filename = f"{basedir}/plots/r0={r0}m-r1={r1}m-theta={theta}deg-z={z}m.csv"
-    export = CreateWriter(filename, proxy=plotOverLine)
-    if not printed:
-        for prop in export.ListProperties():
-            print(f"export: {prop}={export.GetPropertyValue(prop)}", flush=True)
-    export.UpdateVTKObjects()  # is it needed?
-    export.UpdatePipeline()
+    if samples is None:
+        lines = ProbeLines()
+        lines.add("Or", *orLine(r, theta, z))
+        samples = sampleLines(input, lines)["Or"]
 
     # plot with matplotlib
     def plotOrField(
-        file,
+        samples: dict,
         key: str,
         theta: float,
         z: float,
@@ -93,7 +109,7 @@ def plotOr(
         greyspace: bool = False,
     ):
         [fig, ax, legend] = axs
-        print(f"plotOrField: file={file}, key={key}", flush=True)
+        print(f"plotOrField: key={key}", flush=True)
         (toolbox, physic, fieldname) = keyinfo(key)
         # print(f"physic={physic}, fieldname={fieldname}", flush=True)
         # print(f'fieldunits[fieldname]={fieldunits[fieldname]}"', flush=True)
@@ -108,12 +124,7 @@ def plotOr(
             ax = plt.gca()
 
         # see vonmises-vs-theta.py and/or vonmises-vs-theta-plot-savedata.py
-        csv = pd.read_csv(file)
-        keycsv = csv[["arc_length", key]]
-
-        # rename columns
-        keycsv.rename(columns={"arc_length": "r"}, inplace=True)
-        keycsv["r"] = keycsv["r"] + r0
+        keycsv = pd.DataFrame({"r": samples["arc_length"] + r0, key: samples[key]})
         # print(f"new keys: {keycsv.columns.values.tolist()}", flush=True)
 
         # rescale columns to plot
@@ -139,41 +150,27 @@ def plotOr(
         keycsv.to_csv(f"{basedir}/plots/{key}-vs-r-theta={theta}deg-z={z_mm}{mm}.csv")
         return legend
 
-    # requirements: create PointData from CellData
-    # for field in input.PointData.keys():
-    datadict = resultinfo(cellDatatoPointData1, ignored_keys)
-    for field in datadict["PointData"]["Arrays"]:
-        if not field in ignored_keys and (not argsfield or field.startswith(argsfield)):
-            kdata = datadict["PointData"]["Arrays"][field]
-            Components = kdata["Components"]
-            print(f"plotOrField for {field} - components={Components}", flush=True)
-            if Components > 1:
-                for i in range(Components):
-                    print(f"plotOrField for {field}:{i} skipped", flush=True)
-            else:
-                if field not in axs:  # if field not in dict -> create fig, ax, legend
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    axs[field] = [fig, ax, []]
-                axs[field][2] = plotOrField(
-                    filename,
-                    field,
-                    theta,
-                    z,
-                    fieldunits,
-                    basedir,
-                    axs=axs[field],
-                    marker=marker,
-                    greyspace=greyspace,
-                )
-
-    # remove temporary csv files
-    os.remove(filename)
-
-    Delete(plotOverLine)
-    del plotOverLine
-
-    Delete(cellDatatoPointData1)
-    del cellDatatoPointData1
+    # PointData (CellData interpolated to points) sampled along the line
+    for field, Components in lineFields(samples, ignored_keys, argsfield).items():
+        print(f"plotOrField for {field} - components={Components}", flush=True)
+        if Components > 1:
+            for i in range(Components):
+                print(f"plotOrField for {field}:{i} skipped", flush=True)
+        else:
+            if field not in axs:  # if field not in dict -> create fig, ax, legend
+                fig, ax = plt.subplots(figsize=(12, 8))
+                axs[field] = [fig, ax, []]
+            axs[field][2] = plotOrField(
+                samples,
+                field,
+                theta,
+                z,
+                fieldunits,
+                basedir,
+                axs=axs[field],
+                marker=marker,
+                greyspace=greyspace,
+            )
     return axs
 
 
@@ -189,6 +186,7 @@ def plotOz(
     marker: str = None,
     axs: dict = None,  # dict of fig,ax for each field
     argsfield: str = None,
+    samples: dict = None,
 ) -> dict:
     """plot along z for a given r and for a given theta
 
@@ -204,34 +202,21 @@ def plotOz(
         marker (str, optional): plot on specific marker. Defaults to None.
         axs (dict, optional): dict containing fig,ax,legend for each exported fields. Defaults to None.
         argsfield (str, optional): selected field to display. Defaults to None.
+        samples (dict, optional): {key: values} sampled along the line
+            (see method.sampleLines), sampled here if None. Defaults to None.
 
     Returns:
         dict: contains fig,ax,legend for each exported fields
     """
     [z0, z1] = z
-    radian = theta * pi / 180.0
-
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-
-    plotOverLine = PlotOverLine(registrationName="Oz", Input=cellDatatoPointData1)
-
-    # init the 'Line' selected for 'Source'
-    plotOverLine.Point1 = [r * cos(radian), r * sin(radian), z0]
-    plotOverLine.Point2 = [r * cos(radian), r * sin(radian), z1]
-
-    filename = f"{basedir}/plots/r={r}m-theta={theta}deg-z0={z0}m-z1={z1}m.csv"
-    export = CreateWriter(filename, proxy=plotOverLine)
-    if not printed:
-        for prop in export.ListProperties():
-            print(f"export: {prop}={export.GetPropertyValue(prop)}", flush=True)
-    export.UpdateVTKObjects()  # is it needed?
-    export.UpdatePipeline()
+    if samples is None:
+        lines = ProbeLines()
+        lines.add("Oz", *ozLine(r, theta, z))
+        samples = sampleLines(input, lines)["Oz"]
 
     # plot with matplotlib
     def plotOzField(
-        file,
+        samples: dict,
         key: str,
         theta: float,
         z: list[float],
@@ -241,7 +226,7 @@ def plotOz(
         marker: str = None,
     ):
         [fig, ax, legend] = axs
-        print(f"plotOrField: file={file}, key={key}", flush=True)
+        print(f"plotOzField: key={key}", flush=True)
         (toolbox, physic, fieldname) = keyinfo(key)
         symbol = fieldunits[fieldname]["Symbol"]
         msymbol = symbol
@@ -253,12 +238,7 @@ def plotOz(
             ax = plt.gca()
 
         # see vonmises-vs-theta.py and/or vonmises-vs-theta-plot-savedata.py
-        csv = pd.read_csv(file)
-        keycsv = csv[["arc_length", key]]
-
-        # rename columns
-        keycsv.rename(columns={"arc_length": "z"}, inplace=True)
-        keycsv["z"] = keycsv["z"] + z0
+        keycsv = pd.DataFrame({"z": samples["arc_length"] + z0, key: samples[key]})
         # print(f"new keys: {keycsv.columns.values.tolist()}", flush=True)
 
         # rescale columns to plot
@@ -282,40 +262,26 @@ def plotOz(
         keycsv.to_csv(f"{basedir}/plots/{key}-vs-z-theta={theta}deg-r={r_mm}{mm}.csv")
         return legend
 
-    # requirements: create PointData from CellData
-    # for field in input.PointData.keys():
-    datadict = resultinfo(cellDatatoPointData1, ignored_keys)
-    for field in datadict["PointData"]["Arrays"]:
-        if not field in ignored_keys and (not argsfield or field.startswith(argsfield)):
-            kdata = datadict["PointData"]["Arrays"][field]
-            Components = kdata["Components"]
-            print(f"plotOzField for {field} - components={Components}", flush=True)
-            if Components > 1:
-                for i in range(Components):
-                    print(f"plotOzField for {field}:{i} skipped", flush=True)
-            else:
-                if field not in axs:  # if field not in dict -> create fig, ax
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    axs[field] = [fig, ax, []]
-                axs[field][2] = plotOzField(
-                    filename,
-                    field,
-                    theta,
-                    z,
-                    fieldunits,
-                    basedir,
-                    axs=axs[field],
-                    marker=marker,
-                )
-
-    # remove temporary csv files
-    os.remove(filename)
-
-    Delete(plotOverLine)
-    del plotOverLine
-
-    Delete(cellDatatoPointData1)
-    del cellDatatoPointData1
+    # PointData (CellData interpolated to points) sampled along the line
+    for field, Components in lineFields(samples, ignored_keys, argsfield).items():
+        print(f"plotOzField for {field} - components={Components}", flush=True)
+        if Components > 1:
+            for i in range(Components):
+                print(f"plotOzField for {field}:{i} skipped", flush=True)
+        else:
+            if field not in axs:  # if field not in dict -> create fig, ax
+                fig, ax = plt.subplots(figsize=(12, 8))
+                axs[field] = [fig, ax, []]
+            axs[field][2] = plotOzField(
+                samples,
+                field,
+                theta,
+                z,
+                fieldunits,
+                basedir,
+                axs=axs[field],
+                marker=marker,
+            )
     return axs
 
 
@@ -332,9 +298,14 @@ def plotTheta(
     marker: str = None,
     axs: dict = None,  # dict of fig,ax for each field
     argsfield: str = None,
+    pointdata: PointDataCache = None,
+    resolution: int = THETA_RESOLUTION,
+    samples: dict = None,
 ) -> dict:
     """plot along theta for a given r and for a given z
 
+    the fields are sampled on a circle of radius r at z (see probe.ProbeLines)
+
     Args:
         input: paraview reader
         r (float): r coordinates in m
@@ -347,56 +318,26 @@ def plotTheta(
         marker (str, optional): plot on specific marker. Defaults to None.
         axs (dict, optional): dict containing fig,ax,legend for each exported fields. Defaults to None.
         argsfield (str, optional): selected field to display. Defaults to None.
+        pointdata (PointDataCache, optional): reuse the point data of input,
+            built and released here if None. Defaults to None.
+        resolution (int, optional): number of angular segments.
+            Defaults to THETA_RESOLUTION.
+        samples (dict, optional): {key: values} sampled along the circle
+            (see method.sampleLines), sampled here if None. Defaults to None.
 
     Returns:
         dict: contains fig,ax,legend for each exported fields
     """
 
     print(f"plotTheta: r={r}, z={z}", flush=True)
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-
-    # create clip with plane (howto give a color for each clip)
-    print("cellDatatoPointDatalip up and down", flush=True)
-    clip_down = makeclip(cellDatatoPointData1, "clip_down", invert=False)
-    clip_up = makeclip(cellDatatoPointData1, "clip_up", invert=True)
-
-    files = []
-    for i, clip in enumerate([clip_down, clip_up]):
-        slice = makecylinderslice(clip, f"slice{i}", r)
-        SetActiveSource(slice)
-
-        plotOnIntersectionCurve = PlotOnIntersectionCurves(
-            registrationName=f"PlotOnIntersectionCurves{i}", Input=slice
-        )
-        # get params list
-        if not printed:
-            for prop in plotOnIntersectionCurve.ListProperties():
-                print(
-                    f"plotOnIntersectionCurve: {prop}={plotOnIntersectionCurve.GetPropertyValue(prop)}",
-                    flush=True,
-                )
-
-        plotOnIntersectionCurve.SliceType = "Plane"
-        # Properties modified on plotOnIntersectionCurves1.SliceType
-        plotOnIntersectionCurve.SliceType.Origin = [0.0, 0.0, z]
-        plotOnIntersectionCurve.SliceType.Normal = [0.0, 0.0, 1.0]
-
-        # plotOnIntersectionCurves.append(plotOnIntersectionCurve)
-        export = CreateWriter(
-            f"{basedir}/plots/r={r}m-z={z}m-{i}.csv", proxy=plotOnIntersectionCurve
-        )
-        if not printed:
-            for prop in export.ListProperties():
-                print(f"export: {prop}={export.GetPropertyValue(prop)}", flush=True)
-        export.UpdateVTKObjects()  # is it needed?
-        export.UpdatePipeline()
-        files.append(f"{basedir}/plots/r={r}m-z={z}m-{i}.csv")
+    if samples is None:
+        lines = ProbeLines()
+        lines.addCircle("Otheta", r, z, resolution)
+        samples = sampleLines(input, lines, pointdata)["Otheta"]
 
     # plot with matplotlib
     def plotThetaField(
-        files,
+        samples: dict,
         key: str,
         r: float,
         z: float,
@@ -406,7 +347,7 @@ def plotTheta(
         marker: str = None,
     ):
         [fig, ax, legend] = axs
-        print(f"plotThetaField: files={files}, key={key}", flush=True)
+        print(f"plotThetaField: key={key}", flush=True)
         (toolbox, physic, fieldname) = keyinfo(key)
         symbol = fieldunits[fieldname]["Symbol"]
         msymbol = symbol
@@ -418,49 +359,30 @@ def plotTheta(
             ax = plt.gca()
 
         # see vonmises-vs-theta.py and/or vonmises-vs-theta-plot-savedata.py
-        keycsv_dfs = []
-        for file in files:
-            csv = pd.read_csv(file)
-            keycsv = csv[["Points:0", "Points:1", "arc_length", key]]
-
-            # rename columns
-            keycsv.rename(columns={"Points:0": "x", "Points:1": "y"}, inplace=True)
-            # print(f"new keys: {keycsv.columns.values.tolist()}", flush=True)
-
-            # rescale columns to plot
-            theta = arctan2(keycsv["y"].to_numpy(), keycsv["x"].to_numpy()) * 180 / pi
-            # print(f'theta (type={type(theta)}, nelem={theta.shape}): {theta}', flush=True)
-            keycsv["theta"] = keycsv.apply(
-                lambda row: arctan2(row.y, row.x) * 180 / pi,
-                axis=1,
-            )
-
-            # Sort the rows of dataframe by 'Name' column
-            keycsv = keycsv.sort_values(by="theta")
-            # # drop last line
-            # print(f"drop first line from {file}", flush=True)
-            # keycsv.drop(index=keycsv.index[-1], axis=0, inplace=True)
-
-            units = {fieldname: fieldunits[fieldname]["Units"]}
-            values = keycsv[key].to_list()
-            out_values = convert_data(units, values, fieldname)
-            ndf = {key: [val for val in out_values]}
-
-            keycsv[key] = ndf[key]
-            keycsv_dfs.append(keycsv)
+        radian = samples["theta"] * pi / 180.0
+        df = pd.DataFrame(
+            {
+                "x": r * np.cos(radian),
+                "y": r * np.sin(radian),
+                "arc_length": samples["arc_length"],
+                key: samples[key],
+                "theta": samples["theta"],
+            }
+        )
+        # drop the points outside the mesh
+        df = df[samples[VALID] > 0]
 
-            del ndf
+        # rescale columns to plot
+        units = {fieldname: fieldunits[fieldname]["Units"]}
+        values = df[key].to_list()
+        out_values = convert_data(units, values, fieldname)
+        df[key] = [val for val in out_values]
 
-        df = pd.concat(keycsv_dfs)
-        df = df.sort_values(by="theta")
         r_units = {"coord": fieldunits["coord"]["Units"]}
         mm = f'{fieldunits["coord"]["Units"][1]:~P}'
         r_mm = convert_data(r_units, r, "coord")
         z_mm = convert_data(r_units, z, "coord")
         df.to_csv(f"{basedir}/plots/{key}-vs-theta-r={r_mm}{mm}-z={z_mm}{mm}.csv")
-        # print(f"df keys: {df.columns.values.tolist()}", flush=True)
-        # assert key in df.columns.values.tolist(), f"{key} not in df_keys"
-        # print(f"df={df}", flush=True)
         df.plot(x="theta", y=key, marker=marker, grid=True, ax=ax)
         legend.append(f"z={z_mm:.0f}{mm}")
 
@@ -478,49 +400,39 @@ def plotTheta(
         print(f"{df[key].describe()}", flush=True)
         return legend
 
-    # requirements: create PointData from CellData
-    datadict = resultinfo(cellDatatoPointData1, ignored_keys)
-    for field in datadict["PointData"]["Arrays"]:
-        if not field in ignored_keys and (not argsfield or field.startswith(argsfield)):
-            kdata = datadict["PointData"]["Arrays"][field]
-            Components = kdata["Components"]
-            print(f"plotThetaField for {field} - components={Components}", flush=True)
-            if Components > 1:
-                for i in range(Components):
-                    print(f"plotThetaField for {field}:{i} skipped", flush=True)
-                # for i in range(Components):
-                #     plotThetaField(files, f"{field}:{i}", r, z, ax=None)
-            else:
-                if field not in axs:  # if field not in dict -> create fig, ax
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    axs[field] = [fig, ax, []]
-                axs[field][2] = plotThetaField(
-                    files,
-                    field,
-                    r,
-                    z,
-                    fieldunits,
-                    basedir,
-                    axs=axs[field],
-                    marker=marker,
-                )
-
-    # remove temporary csv files
-    for file in files:
-        os.remove(file)
-
-    Delete(cellDatatoPointData1)
-    del cellDatatoPointData1
-
-    # Force a garbage collection
-    collected = gc.collect()
-    if verbose:
-        print(f"Garbage collector: collected {collected} objects.", flush=True)
+    # PointData (CellData interpolated to points) sampled along the circle
+    for field, Components in lineFields(samples, ignored_keys, argsfield).items():
+        print(f"plotThetaField for {field} - components={Components}", flush=True)
+        if Components > 1:
+            for i in range(Components):
+                print(f"plotThetaField for {field}:{i} skipped", flush=True)
+        else:
+            if field not in axs:  # if field not in dict -> create fig, ax
+                fig, ax = plt.subplots(figsize=(12, 8))
+                axs[field] = [fig, ax, []]
+            axs[field][2] = plotThetaField(
+                samples,
+                field,
+                r,
+                z,
+                fieldunits,
+                basedir,
+                axs=axs[field],
+                marker=marker,
+            )
 
     return axs
 
 
-def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir: str):
+def makeplot(
+    args,
+    cellsize,
+    fieldunits: dict,
+    ignored_keys: list[str],
+    basedir: str,
+    pointdata: PointDataCache = None,
+    grid: CylindricalGrid = None,
+):
     """different plot situations for 3D
 
     * if args.r and args.z: plot Otheta
@@ -533,6 +445,10 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
         fieldunits (dict): dict of field units
         ignored_keys (list[str]): list of ignored fields
         basedir (str): result directory
+        pointdata (PointDataCache, optional): point data shared with the
+            other stages (see method.PointDataCache). Defaults to None.
+        grid (CylindricalGrid, optional): sample the plots in the resampled
+            dataset (see method.resampleGrid). Defaults to None.
     """
     if args.r and args.z:
         title = ""
@@ -542,6 +458,22 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
             title = title + f"\nB0={fieldunits['B0']['Val']}T"
         if fieldunits["Bbg"]["Val"]:
             title = title + f"\nBackground field: {fieldunits['Bbg']['Val']}"
+
+        # sample all the Otheta circles and Or/Oz lines in a single probe
+        lines = ProbeLines()
+        for r in args.r:
+            for z in args.z:
+                lines.addCircle(f"Otheta-r={r}-z={z}", r, z)
+        if args.theta and len(args.z) == 2:
+            for r in args.r:
+                for theta in args.theta:
+                    lines.add(f"Oz-r={r}-theta={theta}", *ozLine(r, theta, args.z))
+        if args.theta and len(args.r) == 2:
+            for theta in args.theta:
+                for z in args.z:
+                    lines.add(f"Or-theta={theta}-z={z}", *orLine(args.r, theta, z))
+        samples = sampleLines(cellsize, lines, pointdata, grid)
+
         for r in args.r:
             figaxs = {}
             for z in args.z:
@@ -555,6 +487,7 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
                     marker=args.plotsMarker,
                     axs=figaxs,
                     argsfield=args.field,
+                    samples=samples[f"Otheta-r={r}-z={z}"],
                 )
 
             showplot(
@@ -580,6 +513,7 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
                         marker=args.plotsMarker,
                         axs=figaxs,
                         argsfield=args.field,
+                        samples=samples[f"Oz-r={r}-theta={theta}"],
                     )  # with r: float, z=[z1,z2]
 
                 showplot(
@@ -606,6 +540,7 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
                         axs=figaxs,
                         greyspace=args.greyspace,
                         argsfield=args.field,
+                        samples=samples[f"Or-theta={theta}-z={z}"],
                     )  # with r=[r1, r2], z: float
 
                 showplot(
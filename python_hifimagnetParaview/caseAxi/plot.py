@@ -1,10 +1,44 @@
 import pandas as pd
-import os
 import matplotlib.pyplot as plt
 
-from paraview.simple import CellDatatoPointData, PlotOverLine, CreateWriter, Delete
+from ..method import (
+    convert_data,
+    showplot,
+    plot_greySpace,
+    keyinfo,
+    sampleLines,
+    PointDataCache,
+)
+from ..probe import ProbeLines, lineFields
+from ..grid import CylindricalGrid
 
-from ..method import convert_data, resultinfo, showplot, plot_greySpace, keyinfo
+
+def orLine(r: list[float], z: float) -> tuple:
+    """end points of a line along r
+
+    Args:
+        r (list[float]): [r_start, r_end]
+        z (float): z coordinate of the line in m
+
+    Returns:
+        tuple: Point1, Point2
+    """
+    [r0, r1] = r
+    return ([r0, z, 0], [r1, z, 0])
+
+
+def ozLine(r: float, z: list[float]) -> tuple:
+    """end points of a line along z
+
+    Args:
+        r (float): r coordinate of the line in m
+        z (list[float]): [z_start, z_end]
+
+    Returns:
+        tuple: Point1, Point2
+    """
+    [z0, z1] = z
+    return ([r, z0, 0], [r, z1, 0])
 
 
 def plotOr(
@@ -19,6 +53,7 @@ def plotOr(
     axs: dict = None,  # dict of fig,ax for each field
     greyspace: bool = False,
     argsfield: str = None,
+    samples: dict = None,
 ) -> dict:
     """plot vs r for a given z
 
@@ -34,40 +69,22 @@ def plotOr(
         axs (dict, optional): dict containing fig,ax,legend for each exported fields. Defaults to None.
         greyspace (bool, optional): plot grey vertical bars to fill holes in plots (slits/channels). Defaults to False.
         argsfield (str, optional): selected field to display. Defaults to None.
+        samples (dict, optional): {key: values} sampled along the line
+            (see method.sampleLines), sampled here if None. Defaults to None.
 
     Returns:
         dict: contains fig,ax,legend for each exported fields
     """
     [r0, r1] = r
 
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-
-    plotOverLine = PlotOverLine(registrationName="Oz", Input=cellDatatoPointData1)
-    # get params list
-    if not printed:
-        for prop in plotOverLine.ListProperties():
-            print(
-                f"plotOverLine': {prop}={plotOverLine.GetPropertyValue(prop)}",
-                flush=True,
-            )
-
-    # init the 'Line' selected for 'Source'
-    plotOverLine.Point1 = [r0, z, 0]
-    plotOverLine.Point2 = [r1, z, 0]
-
-    filename = f"{basedir}/plots/r0={r0}m-r1={r1}m-z={z}m.csv"
-    export = CreateWriter(filename, proxy=plotOverLine)
-    if not printed:
-        for prop in export.ListProperties():
-            print(f"export: {prop}={export.GetPropertyValue(prop)}", flush=True)
-    export.UpdateVTKObjects()  # is it needed?
-    export.UpdatePipeline()
+    if samples is None:
+        lines = ProbeLines()
+        lines.add("Or", *orLine(r, z))
+        samples = sampleLines(input, lines)["Or"]
 
     # plot with matplotlib
     def plotOrField(
-        file,
+        samples: dict,
         key: str,
         z: float,
         fieldunits: dict,
@@ -76,7 +93,7 @@ def plotOr(
         greyspace: bool = False,
     ):
         [fig, ax, legend] = axs
-        print(f"plotOrField: file={file}, key={key}", flush=True)
+        print(f"plotOrField: key={key}", flush=True)
         (toolbox, physic, fieldname) = keyinfo(key.replace("_Magnitude", ""))
         # print(f"physic={physic}, fieldname={fieldname}", flush=True)
         # print(f'fieldunits[fieldname]={fieldunits[fieldname]}"', flush=True)
@@ -92,12 +109,7 @@ def plotOr(
         z_mm = convert_data(z_units, z, "coord")
 
         # see vonmises-vs-theta.py and/or vonmises-vs-theta-plot-savedata.py
-        csv = pd.read_csv(file)
-        keycsv = csv[["arc_length", key]]
-
-        # rename columns
-        keycsv.rename(columns={"arc_length": "r"}, inplace=True)
-        keycsv["r"] = keycsv["r"] + r0
+        keycsv = pd.DataFrame({"r": samples["arc_length"] + r0, key: samples[key]})
         # print(f"new keys: {keycsv.columns.values.tolist()}", flush=True)
 
         # rescale columns to plot
@@ -119,38 +131,25 @@ def plotOr(
         # ax.yaxis.set_major_locator(MaxNLocator(10))
         return legend
 
-    # requirements: create PointData from CellData
-    # for field in input.PointData.keys():
-    datadict = resultinfo(cellDatatoPointData1, ignored_keys)
-    for field in datadict["PointData"]["Arrays"]:
-        if not field in ignored_keys and (not argsfield or field.startswith(argsfield)):
-            kdata = datadict["PointData"]["Arrays"][field]
-            Components = kdata["Components"]
-            print(f"plotOrField for {field} - components={Components}", flush=True)
-            if Components > 1:
-                for i in range(Components):
-                    print(f"plotOrField for {field}:{i} skipped", flush=True)
-            else:
-                if field not in axs:  # if field not in dict -> create fig, ax
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    axs[field] = [fig, ax, []]
-                axs[field][2] = plotOrField(
-                    filename,
-                    field,
-                    z,
-                    fieldunits,
-                    axs=axs[field],
-                    marker=marker,
-                    greyspace=greyspace,
-                )
-
-    os.remove(filename)
-
-    Delete(plotOverLine)
-    del plotOverLine
-
-    Delete(cellDatatoPointData1)
-    del cellDatatoPointData1
+    # PointData (CellData interpolated to points) sampled along the line
+    for field, Components in lineFields(samples, ignored_keys, argsfield).items():
+        print(f"plotOrField for {field} - components={Components}", flush=True)
+        if Components > 1:
+            for i in range(Components):
+                print(f"plotOrField for {field}:{i} skipped", flush=True)
+        else:
+            if field not in axs:  # if field not in dict -> create fig, ax
+                fig, ax = plt.subplots(figsize=(12, 8))
+                axs[field] = [fig, ax, []]
+            axs[field][2] = plotOrField(
+                samples,
+                field,
+                z,
+                fieldunits,
+                axs=axs[field],
+                marker=marker,
+                greyspace=greyspace,
+            )
     return axs
 
 
@@ -165,6 +164,7 @@ def plotOz(
     marker: str = None,
     axs: dict = None,  # dict of fig,ax for each field
     argsfield: str = None,
+    samples: dict = None,
 ) -> dict:
     """plot along z for a given r
 
@@ -179,33 +179,22 @@ def plotOz(
         marker (str, optional): plot on specific marker. Defaults to None.
         axs (dict, optional): dict containing fig,ax,legend for each exported fields. Defaults to None.
         argsfield (str, optional): selected field to display. Defaults to None.
+        samples (dict, optional): {key: values} sampled along the line
+            (see method.sampleLines), sampled here if None. Defaults to None.
 
     Returns:
         dict: contains fig,ax,legend for each exported fields
     """
     [z0, z1] = z
 
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-
-    plotOverLine = PlotOverLine(registrationName="Oz", Input=cellDatatoPointData1)
-
-    # init the 'Line' selected for 'Source'
-    plotOverLine.Point1 = [r, z0, 0]
-    plotOverLine.Point2 = [r, z1, 0]
-
-    filename = f"{basedir}/plots/r={r}m-z0={z0}m-z1={z1}m.csv"
-    export = CreateWriter(filename, proxy=plotOverLine)
-    if not printed:
-        for prop in export.ListProperties():
-            print(f"export: {prop}={export.GetPropertyValue(prop)}", flush=True)
-    export.UpdateVTKObjects()  # is it needed?
-    export.UpdatePipeline()
+    if samples is None:
+        lines = ProbeLines()
+        lines.add("Oz", *ozLine(r, z))
+        samples = sampleLines(input, lines)["Oz"]
 
     # plot with matplotlib
     def plotOzField(
-        file,
+        samples: dict,
         key: str,
         r: float,
         fieldunits: dict,
@@ -213,7 +202,7 @@ def plotOz(
         marker: str = None,
     ):
         [fig, ax, legend] = axs
-        print(f"plotOrField: file={file}, key={key}", flush=True)
+        print(f"plotOzField: key={key}", flush=True)
         (toolbox, physic, fieldname) = keyinfo(key.replace("_Magnitude", ""))
         symbol = fieldunits[fieldname]["Symbol"]
         [in_unit, out_unit] = fieldunits[fieldname]["Units"]
@@ -226,12 +215,7 @@ def plotOz(
         r_mm = convert_data(r_units, r, "coord")
 
         # see vonmises-vs-theta.py and/or vonmises-vs-theta-plot-savedata.py
-        csv = pd.read_csv(file)
-        keycsv = csv[["arc_length", key]]
-
-        # rename columns
-        keycsv.rename(columns={"arc_length": "z"}, inplace=True)
-        keycsv["z"] = keycsv["z"] + z0
+        keycsv = pd.DataFrame({"z": samples["arc_length"] + z0, key: samples[key]})
         # print(f"new keys: {keycsv.columns.values.tolist()}", flush=True)
 
         # rescale columns to plot
@@ -251,33 +235,36 @@ def plotOz(
         # ax.yaxis.set_major_locator(MaxNLocator(10))
         return legend
 
-    # requirements: create PointData from CellData
-    # for field in input.PointData.keys():
-    datadict = resultinfo(cellDatatoPointData1, ignored_keys)
-    for field in datadict["PointData"]["Arrays"]:
-        if not field in ignored_keys and (not argsfield or field.startswith(argsfield)):
-            kdata = datadict["PointData"]["Arrays"][field]
-            Components = kdata["Components"]
-            print(f"plotOzField for {field} - components={Components}", flush=True)
-            if Components > 1:
-                for i in range(Components):
-                    print(f"plotOzField for {field}:{i} skipped", flush=True)
-            else:
-                if field not in axs:  # if field not in dict -> create fig, ax,legend
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    axs[field] = [fig, ax, []]
-                axs[field][2] = plotOzField(
-                    filename,
-                    field,
-                    r,
-                    fieldunits,
-                    axs=axs[field],
-                    marker=marker,
-                )
+    # PointData (CellData interpolated to points) sampled along the line
+    for field, Components in lineFields(samples, ignored_keys, argsfield).items():
+        print(f"plotOzField for {field} - components={Components}", flush=True)
+        if Components > 1:
+            for i in range(Components):
+                print(f"plotOzField for {field}:{i} skipped", flush=True)
+        else:
+            if field not in axs:  # if field not in dict -> create fig, ax,legend
+                fig, ax = plt.subplots(figsize=(12, 8))
+                axs[field] = [fig, ax, []]
+            axs[field][2] = plotOzField(
+                samples,
+                field,
+                r,
+                fieldunits,
+                axs=axs[field],
+                marker=marker,
+            )
     return axs
 
 
-def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir: str):
+def makeplot(
+    args,
+    cellsize,
+    fieldunits: dict,
+    ignored_keys: list[str],
+    basedir: str,
+    pointdata: PointDataCache = None,
+    grid: CylindricalGrid = None,
+):
     """different plot situations for Axi
 
     * if 2 args.r and args.z: plot Or from r0 to r1 at z=args.z
@@ -289,6 +276,10 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
         fieldunits (dict): dict of field units
         ignored_keys (list[str]): list of ignored fields
         basedir (str): result directory
+        pointdata (PointDataCache, optional): point data shared with the
+            other stages (see method.PointDataCache). Defaults to None.
+        grid (CylindricalGrid, optional): sample the plots in the resampled
+            dataset (see method.resampleGrid). Defaults to None.
     """
     if args.r and args.z:
         title = ""
@@ -299,6 +290,17 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
         if fieldunits["Bbg"]["Val"]:
             title = title + f"\nBackground field: {fieldunits['Bbg']['Val']}"
         print(f"plots: r={args.r}, z={args.z}", flush=True)
+
+        # sample all the Or/Oz lines in a single probe
+        lines = ProbeLines()
+        if len(args.r) == 2:
+            for z in args.z:
+                lines.add(f"Or-z={z}", *orLine(args.r, z))
+        if len(args.z) == 2:
+            for r in args.r:
+                lines.add(f"Oz-r={r}", *ozLine(r, args.z))
+        samples = sampleLines(cellsize, lines, pointdata, grid)
+
         if len(args.r) == 2:
             figaxs = {}  # create dict for fig and ax
             for z in args.z:
@@ -314,6 +316,7 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
                     axs=figaxs,
                     greyspace=args.greyspace,
                     argsfield=args.field,
+                    samples=samples[f"Or-z={z}"],
                 )  # with r=[r1, r2], z: float
             # plot every field with all z
 
@@ -332,6 +335,7 @@ def makeplot(args, cellsize, fieldunits: dict, ignored_keys: list[str], basedir:
                     marker=args.plotsMarker,
                     axs=figaxs,
                     argsfield=args.field,
+                    samples=samples[f"Oz-r={r}"],
                 )  # with r: float, z=[z1,z2]
 
             showplot(figaxs, f"-vs-z", basedir, title=title, show=args.show)
@@ -1,4 +1,6 @@
 # import vtk
+from functools import cache
+
 import pandas as pd
 
 from paraview.simple import (
@@ -9,9 +11,28 @@ from paraview.simple import (
     SaveData,
 )
 
-from .method import load, info, getbounds, resultinfo, getcurrent, getB0
-from .view import deformed, makethetaclip
+from .method import (
+    load,
+    info,
+    getbounds,
+    resultinfo,
+    getcurrent,
+    getB0,
+    redistribute,
+    timesteps,
+    PointDataCache,
+    resampleGrid,
+)
+from .view import deformed, makethetaclip, SliceCache
 from .json import returnExportFields
+from .ensight import caseVariables, requiredArrays
+from .cache import cacheKey, cachePath, clearCache
+from .parallel import world, isRoot, broadcast
+from .stats import timeSeriesStats
+from .manifest import ViewManifest
+from .ranges import RangeService
+from .grid import gridPath, AXES
+from .renderfarm import farmJobs, shardJobs, parseShard, workerCommand, runFarm
 
 pd.options.mode.copy_on_write = True
 
@@ -85,6 +106,22 @@ def options(description: str, epilog: str):
         allparsers.add_argument(
             "--bins", type=int, help="set bins number (default 10)", default=20
         )
+        allparsers.add_argument(
+            "--jobs",
+            type=int,
+            help="number of worker processes for per-block stats and histograms (3D/2D)",
+            default=1,
+        )
+        allparsers.add_argument(
+            "--redistribute",
+            help="MPI runs: balance the cells over the ranks (RedistributeDataSet)",
+            action="store_true",
+        )
+        allparsers.add_argument(
+            "--noHistoPlots",
+            help="save histograms tables without rendering plots",
+            action="store_true",
+        )
         allparsers.add_argument(
             "--plots", help="activate plots calculations", action="store_true"
         )
@@ -108,6 +145,14 @@ def options(description: str, epilog: str):
             allparsers.add_argument(
                 "--z", nargs="*", type=float, help="select z in m to display"
             )
+        allparsers.add_argument(
+            "--plotGrid",
+            nargs="+",
+            type=int,
+            help="resample once on a cylindrical grid with these numbers of segments "
+            "(r theta z in 3D, r theta in 2D, r z in Axi, or one value for all) "
+            "and sample the plots in the grid",
+        )
         allparsers.add_argument(
             "--greyspace",
             help="plot grey bar for holes (channels/slits) in plot",
@@ -118,6 +163,49 @@ def options(description: str, epilog: str):
             help="show graphs",
             action="store_true",
         )
+        allparsers.add_argument(
+            "--forceViews",
+            help="render all views, even those unchanged since the last run",
+            action="store_true",
+        )
+        allparsers.add_argument(
+            "--renderJobs",
+            type=int,
+            help="number of off-screen workers rendering the views from the cache (3D/2D)",
+            default=1,
+        )
+        allparsers.add_argument(
+            "--viewShard",
+            type=parseShard,
+            help=argparse.SUPPRESS,
+            default=None,
+        )
+        allparsers.add_argument(
+            "--cacheKey",
+            type=str,
+            help=argparse.SUPPRESS,
+            default=None,
+        )
+        allparsers.add_argument(
+            "--timesteps",
+            help="stream all timesteps and write per-step stats to stats/timeseries.csv (3D/2D)",
+            action="store_true",
+        )
+        allparsers.add_argument(
+            "--noCache",
+            help="do not use nor save the derived dataset cache",
+            action="store_true",
+        )
+        allparsers.add_argument(
+            "--mmapStore",
+            help="also cache the fetched arrays as memory-mapped npy files",
+            action="store_true",
+        )
+        allparsers.add_argument(
+            "--clearCache",
+            help="remove the derived dataset cache before running",
+            action="store_true",
+        )
         allparsers.add_argument(
             "--verbose",
             help="activate verbose mode",
@@ -137,11 +225,78 @@ def options(description: str, epilog: str):
     return parser
 
 
-def init(file: str):
+def selectArrays(args, fieldtype: dict) -> list[str]:
+    """arrays needed by the selected stages
+
+    only a single field is needed for `--field` runs without
+    stats, histos or plots: keep it (or the vector it is derived from),
+    the displacement for deformed views and the magnetic field for getB0
+
+    Args:
+        args: parsed options
+        fieldtype (dict): dictionnary of type of exported fields
+
+    Returns:
+        list[str]: arrays to load (None to load all arrays)
+    """
+    if not args.field or args.stats or args.histos or args.plots:
+        return None
+    if not args.file.endswith(".case"):
+        return None
+
+    variables = list(caseVariables(args.file).keys())
+    suffixes = ["displacement"]
+    if not args.B0:
+        suffixes += [
+            f".{f}" for f in fieldtype if fieldtype[f]["Type"] == "MagneticField"
+        ]
+    return requiredArrays(variables, [args.field], suffixes)
+
+
+@cache
+def unitRegistry() -> UnitRegistry:
+    """pint unit registry, created once per process (see batch)
+
+    Returns:
+        UnitRegistry: registry with percent and ppm units, SI by default
+    """
+    ureg = UnitRegistry()
+    ureg.define("percent = 0.01 = %")
+    ureg.define("ppm = 1e-6")
+    ureg.default_system = "SI"
+    ureg.autoconvert_offset_to_baseunit = True
+    return ureg
+
+
+def viewFields(input, ignored_keys: list[str], field: str = "") -> dict:
+    """fields to display and their color
+
+    Args:
+        input: paraview source
+        ignored_keys (list[str]): list of ignored fields
+        field (str, optional): only display this field (all fields if empty).
+            Defaults to "".
+
+    Returns:
+        dict: {field name: color}, PointData are preferred over CellData
+    """
+    fields = {}
+    for key in list(input.PointData.keys()):
+        fields[key] = ["POINTS", key]
+    for key in list(input.CellData.keys()):
+        fields.setdefault(key, ["CELLS", key])
+    if field:
+        return {key: color for key, color in fields.items() if key == field}
+    return {key: color for key, color in fields.items() if key not in ignored_keys}
+
+
+def init(file: str, arrays: list[str] = None):
     """initialize paraview reader, pint units, results directory
 
     Args:
         file (str): paraview result file
+        arrays (list[str], optional): restrict loading to these arrays.
+            Defaults to None.
 
     Returns:
         cwd (str): current directory
@@ -159,12 +314,7 @@ def init(file: str):
     print("Results are stored in: ", basedir, flush=True)
     os.makedirs(basedir, exist_ok=True)
 
-    # Pint configuration
-    ureg = UnitRegistry()
-    ureg.define("percent = 0.01 = %")
-    ureg.define("ppm = 1e-6")
-    ureg.default_system = "SI"
-    ureg.autoconvert_offset_to_baseunit = True
+    ureg = unitRegistry()
 
     # set default output unit to millimeter
     distance_unit = "millimeter"  # or "meter"
@@ -174,7 +324,7 @@ def init(file: str):
     print(f"Paraview version: {version}", flush=True)
 
     # args.file = "../../HL-31/test/hybride-Bh27.7T-Bb9.15T-Bs9.05T_HPfixed_BPfree/bmap/np_32/thermo-electric.exports/Export.case"
-    reader = load(file)
+    reader = load(file, arrays)
     # print(f"help(reader) = {dir(reader)}",flush=True)
     bounds = getbounds(reader)
     print(f"bounds={bounds}", flush=True)  # , type={type(bounds)}",flush=True)
@@ -185,18 +335,26 @@ def init(file: str):
     return cwd, basedir, ureg, distance_unit, reader
 
 
-def main():
+def main(argv: list[str] = None):
+    """post-process a result file
+
+    Args:
+        argv (list[str], optional): command line arguments, sys.argv if None
+            (see batch). Defaults to None.
+    """
 
     parser = options("", "")
     argcomplete.autocomplete(parser)
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     print(f"args: {args}")
+    if argv is None:
+        argv = sys.argv[1:]
 
     match args.dimmension:
         case "3D":
             from .meshinfo import meshinfo
             from .case3D.plot import makeplot
-            from .case3D.display3D import makeview
+            from .case3D.display3D import makeviews, viewKinds
             from .case3D.method3D import create_dicts, create_dicts_fromjson
 
             dim = 3
@@ -204,7 +362,7 @@ def main():
         case "2D":
             from .meshinfo import meshinfo
             from .case2D.plot import makeplot
-            from .case2D.display2D import makeview
+            from .case2D.display2D import makeviews, viewKinds
             from .case2D.method2D import create_dicts, create_dicts_fromjson
 
             dim = 2
@@ -212,7 +370,7 @@ def main():
         case "Axi":
             from .meshinfoAxi import meshinfo
             from .caseAxi.plot import makeplot
-            from .case2D.display2D import makeview
+            from .case2D.display2D import makeviews, viewKinds
             from .caseAxi.methodAxi import create_dicts, create_dicts_fromjson
 
             dim = 2
@@ -223,11 +381,43 @@ def main():
             )
             return 1
 
-    (cwd, basedir, ureg, distance_unit, reader) = init(args.file)
+    # MPI run (mpiexec pvbatch --symmetric)
+    comm = world()
+    if comm is not None:
+        print(f"MPI: rank {comm.Get_rank()}/{comm.Get_size()}", flush=True)
+        if axis:
+            parser.error("Axi: parallel runs are not supported")
+        if args.jobs > 1:
+            parser.error("--jobs is not supported in MPI runs")
+        if args.renderJobs > 1:
+            parser.error("--renderJobs is not supported in MPI runs")
+
+    if args.renderJobs > 1 and (axis or args.noCache or args.timesteps):
+        parser.error("--renderJobs: workers load the cache (not with Axi, --noCache or --timesteps)")
+
+    if args.timesteps and axis:
+        parser.error("--timesteps: Axi is not supported")
+
+    if args.plotGrid and (
+        len(args.plotGrid) not in [1, len(AXES[args.dimmension])]
+        or min(args.plotGrid) < 1
+    ):
+        parser.error(
+            f"--plotGrid: expect 1 or {len(AXES[args.dimmension])} positive numbers of segments"
+        )
 
     fieldtype = {}
     if args.json:
+        basedir = f"{os.path.dirname(args.file)}/paraview.exports"
+        os.makedirs(basedir, exist_ok=True)
         fieldtype = returnExportFields(args.json, basedir)
+
+    arrays = selectArrays(args, fieldtype)
+    (cwd, basedir, ureg, distance_unit, reader) = init(args.file, arrays)
+    # time values of the file reader (the filters below do not expose them)
+    times = timesteps(reader) if args.timesteps else []
+
+    if args.json:
         fieldunits, ignored_keys = create_dicts_fromjson(
             fieldtype, ureg, distance_unit, basedir
         )
@@ -237,12 +427,21 @@ def main():
     if dim == 2 and args.cliptheta:
         reader = makethetaclip(reader, args.cliptheta, invert=False)
 
+    # MPI run: even pieces on the ranks
+    if comm is not None and args.redistribute:
+        reader = redistribute(reader)
+
     if args.current:
         fieldunits["Current"]["Val"] = getcurrent(args.current)
 
+    # CellData interpolated to points, shared by getB0, meshinfo and plots
+    pointdata = PointDataCache()
+
     B0 = args.B0
     if not B0:
-        B0 = getB0(reader, fieldtype, basedir, dim, axis)
+        B0 = broadcast(
+            getB0(reader, fieldtype, basedir, dim, axis, comm, pointdata), comm
+        )
 
     if B0:
         print(f"B0={B0}T")
@@ -253,22 +452,30 @@ def main():
         print(f"Background Field: {Bbg}")
         fieldunits["Bbg"]["Val"] = Bbg
 
-    if args.field:
-        if args.field in list(reader.CellData.keys()):
-            field = reader.CellData[args.field]
-            # if field.GetNumberOfComponents() == 1:
-            color = ["CELLS", args.field]
-            # if field.GetNumberOfComponents() == dim:
-            #    color = ["CELLS", args.field, "Magnitude"]
-        if args.field in list(reader.PointData.keys()):
-            field = reader.PointData[args.field]
-            # if field.GetNumberOfComponents() == 1:
-            color = ["POINTS", args.field]
-            # if field.GetNumberOfComponents() == dim:
-            #    color = ["POINTS", args.field, "Magnitude"]
+    # derived dataset cache (3D/2D only, not in parallel nor transient runs)
+    if args.clearCache and isRoot(comm):
+        clearCache(basedir)
+    cacheoptions = {
+        "dimmension": args.dimmension,
+        "arrays": arrays,
+        "cliptheta": args.cliptheta,
+    }
+    # render workers share the derived dataset of the parent run
+    key = args.cacheKey or cacheKey(args.file, cacheoptions)
+    meshargs = {}
+    if comm is not None:
+        meshargs["comm"] = comm
+    elif not args.noCache and not axis and not args.timesteps:
+        meshargs["cachefile"] = cachePath(basedir, key)
+        if args.mmapStore:
+            meshargs["storedir"] = cachePath(basedir, key, name="store")
+    if args.jobs > 1 and not axis:
+        meshargs["jobs"] = args.jobs
+    if args.viewShard and not axis:
+        meshargs["WriteStats"] = False
 
     # get Block info
-    cellsize, blockdata, statsdict = meshinfo(
+    cellsize, blockdata, statsdict, store = meshinfo(
         reader,
         dim,
         fieldunits,
@@ -278,14 +485,49 @@ def main():
         ComputeStats=args.stats,
         ComputeHisto=args.histos,
         BinCount=args.bins,
+        PlotHisto=not args.noHistoPlots,
         show=args.show,
         verbose=args.verbose,
+        pointdata=pointdata,
+        **meshargs,
     )
 
+    # transient results: per-step stats, the derived pipeline is reused
+    if args.timesteps:
+        if not times:
+            print("--timesteps: no timestep in input, skipped", flush=True)
+        else:
+            timeSeriesStats(
+                cellsize,
+                store,
+                fieldunits,
+                ignored_keys,
+                basedir,
+                times,
+                comm=comm,
+                verbose=args.verbose,
+            )
+
     # Plots
-    if args.plots:
+    if args.plots and comm is not None:
+        print("--plots is not supported in parallel runs: skipped", flush=True)
+    elif args.plots:
         os.makedirs(f"{basedir}/plots", exist_ok=True)
-        makeplot(args, cellsize, fieldunits, ignored_keys, basedir)
+        # plots sampled in a cached cylindrical grid
+        grid = None
+        if args.plotGrid:
+            cachefile = None
+            if not args.noCache and not args.timesteps:
+                cachefile = gridPath(basedir, key, args.plotGrid)
+            grid = resampleGrid(
+                cellsize,
+                args.dimmension,
+                args.plotGrid,
+                pointdata,
+                cachefile,
+                verbose=args.verbose,
+            )
+        makeplot(args, cellsize, fieldunits, ignored_keys, basedir, pointdata, grid)
 
     # When dealing with elasticity
     suffix = ""
@@ -364,100 +606,61 @@ def main():
 
     # Views
     if args.views:
-        if not args.field:
-            for vkey in list(cellsize.PointData.keys()) + list(
-                cellsize.CellData.keys()
-            ):
-
-                if not vkey in ignored_keys:
-                    if vkey in list(cellsize.CellData.keys()):
-                        color = ["CELLS", vkey]
-                    if vkey in list(cellsize.PointData.keys()):
-                        color = ["POINTS", vkey]
-
-                    makeview(
-                        args,
-                        cellsize,
-                        blockdata,
-                        vkey,
-                        fieldunits,
-                        color,
-                        basedir,
-                        suffix="",
-                        addruler=False,
-                        background=args.transparentBG,
-                        customRangeHisto=args.customRangeHisto,
-                    )
-
-            if found:
-                for vkey in list(cellsize_deformed.PointData.keys()) + list(
-                    cellsize_deformed.CellData.keys()
-                ):
-
-                    if not vkey in ignored_keys:
-                        if vkey in list(cellsize_deformed.CellData.keys()):
-                            color = ["CELLS", vkey]
-                        if vkey in list(cellsize_deformed.PointData.keys()):
-                            color = ["POINTS", vkey]
-
-                        makeview(
-                            args,
-                            cellsize_deformed,
-                            blockdata,
-                            vkey,
-                            fieldunits,
-                            color,
-                            basedir,
-                            suffix=suffix,
-                            addruler=False,
-                            background=args.transparentBG,
-                            customRangeHisto=args.customRangeHisto,
-                        )
-
-        else:
-            if args.field in list(cellsize.PointData.keys()) + list(
-                cellsize.CellData.keys()
-            ):
-                if args.field in list(cellsize.CellData.keys()):
-                    color = ["CELLS", args.field]
-                if args.field in list(cellsize.PointData.keys()):
-                    color = ["POINTS", args.field]
-                makeview(
+        # one render view per geometry, recolored for each field
+        geometries = {"": cellsize}
+        if found:
+            geometries[suffix] = cellsize_deformed
+        fields = {
+            gsuffix: viewFields(geometry, ignored_keys, args.field)
+            for gsuffix, geometry in geometries.items()
+        }
+        kinds = viewKinds(args)
+
+        # split views into (geometry, kind, parameter, fields) jobs
+        nshards = args.renderJobs
+        if args.viewShard:
+            nshards = args.viewShard[1]
+        jobs = []
+        for gsuffix in geometries:
+            jobs += farmJobs([gsuffix], kinds, list(fields[gsuffix]), nshards)
+
+        if args.renderJobs > 1:
+            images = sum(len(job[3]) for job in jobs)
+            nshards = min(args.renderJobs, len(jobs))
+            runFarm(workerCommand(), argv, nshards, images, B0, key)
+            jobs = []
+        elif args.viewShard:
+            jobs = shardJobs(jobs, *args.viewShard)
+
+        # unchanged views (same dataset and view parameters) are skipped
+        manifest = ViewManifest(basedir, key, force=args.forceViews)
+        # colour ranges from the store, shared by original and deformed views
+        ranges = None
+        if store is not None:
+            ranges = RangeService(store, BinCount=args.bins, comm=comm)
+        # clips and slices are shared by the fields of a (geometry, kind, parameter)
+        with SliceCache() as slices:
+            for gsuffix, kind, param, chunk in jobs:
+                makeviews(
                     args,
-                    cellsize,
+                    geometries[gsuffix],
                     blockdata,
-                    args.field,
+                    {name: fields[gsuffix][name] for name in chunk},
                     fieldunits,
-                    color,
                     basedir,
-                    suffix="",
+                    suffix=gsuffix,
                     addruler=False,
                     background=args.transparentBG,
                     customRangeHisto=args.customRangeHisto,
+                    kinds=[(kind, param)],
+                    manifest=manifest,
+                    ranges=ranges,
+                    slices=slices,
                 )
+        if jobs and isRoot(comm):
+            manifest.save()
 
-            if found and (
-                args.field
-                in list(cellsize_deformed.PointData.keys())
-                + list(cellsize_deformed.CellData.keys())
-            ):
-                if args.field in list(cellsize_deformed.CellData.keys()):
-                    color = ["CELLS", args.field]
-                if args.field in list(cellsize_deformed.PointData.keys()):
-                    color = ["POINTS", args.field]
-                makeview(
-                    args,
-                    cellsize_deformed,
-                    blockdata,
-                    args.field,
-                    fieldunits,
-                    color,
-                    basedir,
-                    suffix=suffix,
-                    addruler=False,
-                    background=args.transparentBG,
-                    customRangeHisto=args.customRangeHisto,
-                )
+    pointdata.release()
 
     # for magnetfield:
     #   - view contour for magnetic potential (see pv-contours.py)
@@ -0,0 +1,57 @@
+"""Derived fields computed with NumPy
+
+Computes the norm and the cylindrical components of vector fields in a
+single pass. Used in a ProgrammableFilter instead of chains of Calculator
+filters (see meshinfo.createDerivedFields). This module does not depend on
+ParaView.
+"""
+
+import numpy as np
+
+
+def derivedFields(points: np.ndarray, fields: dict, axi: bool = False) -> dict:
+    """compute derived fields of vector fields
+
+    for each vector field key:
+        * `{key}norm`: magnitude of key
+        * 3D/2D: `{key}_ur` = ux*cos + uy*sin, `{key}_ut` = -ux*sin + uy*cos
+          with r, Cos and Sin computed once from the point coordinates
+        * Axi: `{key}_r` = ux, `{key}_z` = uy
+
+    Args:
+        points (np.ndarray): point coordinates, shape (n, 3)
+        fields (dict): {key: vector PointData array of shape (n, components)}
+        axi (bool, optional): axisymmetric case. Defaults to False.
+
+    Returns:
+        dict: {array name: 1D array}
+    """
+    derived = {}
+    if not fields:
+        return derived
+
+    if not axi:
+        points = np.asarray(points)
+        x = points[:, 0]
+        y = points[:, 1]
+        r = np.sqrt(x * x + y * y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cos = x / r
+            sin = y / r
+        derived["r"] = r
+        derived["Cos"] = cos
+        derived["Sin"] = sin
+
+    for key, values in fields.items():
+        values = np.asarray(values)
+        ux = values[:, 0]
+        uy = values[:, 1]
+        derived[f"{key}norm"] = np.linalg.norm(values, axis=1)
+        if axi:
+            derived[f"{key}_r"] = np.ascontiguousarray(ux)
+            derived[f"{key}_z"] = np.ascontiguousarray(uy)
+        else:
+            derived[f"{key}_ur"] = ux * cos + uy * sin
+            derived[f"{key}_ut"] = -ux * sin + uy * cos
+
+    return derived
@@ -0,0 +1,143 @@
+"""EnSight Gold case file helpers
+
+Reads the VARIABLE section of a case file, so that the reader can be
+restricted to the arrays actually needed before any data is loaded.
+This module does not depend on ParaView.
+"""
+
+import glob
+import os
+
+DERIVED_SUFFIXES = ["norm", "_ur", "_ut", "_r", "_z"]
+
+
+def caseVariables(casefile: str) -> dict:
+    """get variables declared in the VARIABLE section of an EnSight case file
+
+    a variable line reads: `<type> per <location>: [ts] [fs] <name> <file>`
+
+    Args:
+        casefile (str): EnSight case file (ex. Export.case)
+
+    Returns:
+        dict: {name: {"type", "location", "file"}}, file is the data file
+            pattern with its path relative to the case file directory
+    """
+    variables = {}
+    section = None
+    with open(casefile) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.isupper() and ":" not in line:
+                section = line
+                continue
+            if section != "VARIABLE" or ":" not in line:
+                continue
+
+            (kind, values) = line.split(":", 1)
+            tokens = values.split()
+            if "per" not in kind or len(tokens) < 2:
+                continue
+            (vtype, location) = [item.strip() for item in kind.split("per", 1)]
+            if vtype == "constant":
+                continue
+            variables[tokens[-2]] = {
+                "type": vtype,
+                "location": location,
+                "file": os.path.join(os.path.dirname(casefile), tokens[-1]),
+            }
+    return variables
+
+
+def caseFiles(casefile: str) -> list[str]:
+    """get the data files (geometry and variables, all timesteps) of a case file
+
+    Args:
+        casefile (str): EnSight case file (ex. Export.case)
+
+    Returns:
+        list[str]: sorted list of existing data files
+    """
+    patterns = [data["file"] for data in caseVariables(casefile).values()]
+    section = None
+    with open(casefile) as f:
+        for line in f:
+            line = line.strip()
+            if line.isupper() and ":" not in line:
+                section = line
+                continue
+            if section == "GEOMETRY" and line.startswith("model:"):
+                patterns.append(
+                    os.path.join(os.path.dirname(casefile), line.split()[-1])
+                )
+
+    files = set()
+    for pattern in patterns:
+        files.update(glob.glob(pattern.replace("*", "?")))
+    return sorted(files)
+
+
+def variableBytes(variables: dict, names: list[str]) -> int:
+    """size on disk of one timestep of the selected variables
+
+    for binary EnSight files this is close to the memory needed to load them
+
+    Args:
+        variables (dict): variables from caseVariables
+        names (list[str]): selected variable names
+
+    Returns:
+        int: size in bytes
+    """
+    size = 0
+    for name in names:
+        pattern = variables[name]["file"].replace("*", "?")
+        matches = sorted(glob.glob(pattern))
+        if matches:
+            size += os.path.getsize(matches[0])
+    return size
+
+
+def baseArray(key: str, variables: list[str]) -> str:
+    """get the loaded array a (possibly derived) field is computed from
+
+    Args:
+        key (str): field name (ex. "...current_densitynorm")
+        variables (list[str]): loaded variable names
+
+    Returns:
+        str: variable name (key if not derived)
+    """
+    if key in variables:
+        return key
+    for suffix in DERIVED_SUFFIXES:
+        if key.endswith(suffix) and key[: -len(suffix)] in variables:
+            return key[: -len(suffix)]
+    return key
+
+
+def requiredArrays(
+    variables: list[str], fields: list[str], suffixes: list[str] = None
+) -> list[str]:
+    """select the variables needed for the requested fields
+
+    Args:
+        variables (list[str]): variable names declared in the case file
+        fields (list[str]): requested fields (derived fields are mapped to
+            the array they are computed from)
+        suffixes (list[str], optional): also keep variables ending with one
+            of these suffixes (ex. "displacement"). Defaults to None.
+
+    Returns:
+        list[str]: selected variables (in case file order)
+    """
+    if suffixes is None:
+        suffixes = []
+    required = {baseArray(field, variables) for field in fields}
+    return [
+        name
+        for name in variables
+        if name in required or any(name.endswith(suffix) for suffix in suffixes)
+    ]
@@ -0,0 +1,243 @@
+"""Structured cylindrical resampling of the derived dataset (`--plotGrid`)
+
+The point data of the derived dataset is probed once on a structured grid:
+(r, theta, z) in 3D, (r, theta) in 2D and (r, z) in Axi. The Or, Oz and
+Otheta plots are then sampled in the grid arrays (see CylindricalGrid.probe,
+multilinear interpolation, exact at the grid nodes) instead of the mesh.
+The grid is saved compressed (float32) under `paraview.exports/cache/` with
+the key of the derived dataset and its resolution, so later runs with new
+plot positions only read it back.
+This module does not depend on ParaView.
+"""
+
+import itertools
+import os
+
+import numpy as np
+
+from .cache import cachePath
+from .probe import VALID
+
+GRID = "grid"
+
+# grid axes per geometry
+AXES = {"3D": ["r", "theta", "z"], "2D": ["r", "theta"], "Axi": ["r", "z"]}
+
+
+def gridPath(basedir: str, key: str, resolution: list[int]) -> str:
+    """path of a cached grid
+
+    Args:
+        basedir (str): result directory
+        key (str): cache key of the derived dataset (see cache.cacheKey)
+        resolution (list[int]): number of segments per axis
+
+    Returns:
+        str: {basedir}/cache/grid-{key}-{resolution}.npz
+    """
+    res = "x".join(str(n) for n in resolution)
+    return f"{cachePath(basedir, f'{key}-{res}', name=GRID)}.npz"
+
+
+def gridAxes(kind: str, bounds: tuple, resolution: list[int]) -> dict:
+    """axes of a grid covering bounds
+
+    in 3D and 2D r goes from 0 to the farthest corner of bounds and theta
+    from -180 to 180 deg, in Axi x is r and y is z
+
+    Args:
+        kind (str): geometry (3D, 2D or Axi)
+        bounds (tuple): (xmin, xmax, ymin, ymax, zmin, zmax)
+        resolution (list[int]): number of segments per axis, one value for
+            all axes
+
+    Raises:
+        ValueError: gridAxes: expect 1 or ndim resolutions
+
+    Returns:
+        dict: {axis name: node coordinates}
+    """
+    names = AXES[kind]
+    if len(resolution) == 1:
+        resolution = list(resolution) * len(names)
+    if len(resolution) != len(names):
+        raise ValueError(
+            f"gridAxes: expect 1 or {len(names)} resolutions for {kind}, got {resolution}"
+        )
+
+    (xmin, xmax, ymin, ymax, zmin, zmax) = bounds
+    if kind == "Axi":
+        limits = {"r": (xmin, xmax), "z": (ymin, ymax)}
+    else:
+        rmax = max(np.hypot(x, y) for x in (xmin, xmax) for y in (ymin, ymax))
+        limits = {"r": (0.0, rmax), "theta": (-180.0, 180.0), "z": (zmin, zmax)}
+    return {
+        name: np.linspace(*limits[name], n + 1) for name, n in zip(names, resolution, strict=True)
+    }
+
+
+class CylindricalGrid:
+    """point data on a structured cylindrical grid
+
+    Args:
+        kind (str): geometry (3D, 2D or Axi)
+        axes (dict): {axis name: node coordinates} (see gridAxes)
+        values (dict, optional): {key: values of shape grid.shape (+ components)}.
+            Defaults to None.
+        valid (np.ndarray, optional): nodes inside the mesh. Defaults to None.
+    """
+
+    def __init__(self, kind: str, axes: dict, values: dict = None, valid=None):
+        self.kind = kind
+        self.axes = axes
+        self.values = values or {}
+        self.valid = valid
+
+    @property
+    def shape(self) -> tuple:
+        """number of nodes per axis"""
+        return tuple(len(axis) for axis in self.axes.values())
+
+    def coordinates(self, points: np.ndarray) -> np.ndarray:
+        """grid coordinates of cartesian points
+
+        Args:
+            points (np.ndarray): shape (npoints, 3)
+
+        Returns:
+            np.ndarray: shape (npoints, ndim), theta in degree
+        """
+        points = np.asarray(points, dtype=np.float64)
+        (x, y, z) = points.T
+        if self.kind == "Axi":
+            return np.stack([x, y], axis=1)
+        r = np.hypot(x, y)
+        theta = np.degrees(np.arctan2(y, x))
+        if self.kind == "2D":
+            return np.stack([r, theta], axis=1)
+        return np.stack([r, theta, z], axis=1)
+
+    def points(self) -> np.ndarray:
+        """cartesian points of the grid nodes, in C order
+
+        Returns:
+            np.ndarray: shape (nnodes, 3)
+        """
+        nodes = np.meshgrid(*self.axes.values(), indexing="ij")
+        coords = dict(zip(self.axes, [node.ravel() for node in nodes], strict=True))
+        if self.kind == "Axi":
+            zeros = np.zeros_like(coords["r"])
+            return np.stack([coords["r"], coords["z"], zeros], axis=1)
+
+        radian = np.radians(coords["theta"])
+        z = coords.get("z", np.zeros_like(coords["r"]))
+        return np.stack(
+            [coords["r"] * np.cos(radian), coords["r"] * np.sin(radian), z], axis=1
+        )
+
+    def fill(self, arrays: dict):
+        """set the values from the probe of the grid nodes
+
+        Args:
+            arrays (dict): {key: values at points()}, with VALID
+                (see method.probePoints)
+        """
+        shape = self.shape
+        self.values = {
+            key: np.asarray(values, dtype=np.float32).reshape(
+                shape + np.shape(values)[1:]
+            )
+            for key, values in arrays.items()
+            if key != VALID
+        }
+        self.valid = np.ones(shape, dtype=bool)
+        if VALID in arrays:
+            self.valid = np.asarray(arrays[VALID]).reshape(shape) > 0
+
+    def probe(self, points: np.ndarray) -> dict:
+        """values at a set of points, interpolated in the grid
+
+        points outside the grid or next to a node outside the mesh get 0 and
+        are not valid
+
+        Args:
+            points (np.ndarray): probed points, shape (npoints, 3)
+
+        Returns:
+            dict: {key: values at points}, with VALID (as method.probePoints)
+        """
+        coords = self.coordinates(points)
+        npoints = len(coords)
+        inside = np.ones(npoints, dtype=bool)
+        (index, weight) = ([], [])
+        for d, axis in enumerate(self.axes.values()):
+            t = coords[:, d]
+            inside &= (t >= axis[0]) & (t <= axis[-1])
+            i = np.clip(np.searchsorted(axis, t, side="right") - 1, 0, len(axis) - 2)
+            w = np.clip((t - axis[i]) / (axis[i + 1] - axis[i]), 0.0, 1.0)
+            index.append(i)
+            weight.append(w)
+
+        values = {
+            key: np.zeros((npoints,) + array.shape[len(self.shape) :])
+            for key, array in self.values.items()
+        }
+        valid = inside.copy()
+        for corner in itertools.product([0, 1], repeat=len(self.shape)):
+            node = tuple(i + c for i, c in zip(index, corner, strict=True))
+            w = np.prod(
+                [wd if c else 1.0 - wd for wd, c in zip(weight, corner, strict=True)], axis=0
+            )
+            valid &= self.valid[node] | (w == 0)
+            for key, array in self.values.items():
+                nodevalues = array[node]
+                shape = w.shape + (1,) * (nodevalues.ndim - 1)
+                values[key] += w.reshape(shape) * nodevalues
+
+        for key in values:
+            values[key][~valid] = 0.0
+        values[VALID] = valid.astype(np.int8)
+        return values
+
+
+def saveGrid(grid: CylindricalGrid, file: str, verbose: bool = False):
+    """save a grid (compressed npz)
+
+    Args:
+        grid (CylindricalGrid): grid to save
+        file (str): file name (.npz)
+        verbose (bool, optional): print the file size. Defaults to False.
+    """
+    os.makedirs(os.path.dirname(file) or ".", exist_ok=True)
+    keys = list(grid.values)
+    data = {
+        "kind": np.array(grid.kind),
+        "axes": np.array(list(grid.axes)),
+        "keys": np.array(keys),
+        "valid": grid.valid,
+    }
+    for i, axis in enumerate(grid.axes.values()):
+        data[f"axis{i}"] = axis
+    for i, key in enumerate(keys):
+        data[f"value{i}"] = grid.values[key]
+
+    tmpfile = f"{file}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmpfile, **data)
+    os.replace(tmpfile, file)
+    if verbose:
+        print(f"saveGrid: {file} ({os.path.getsize(file) / 1024**2:.1f} MB)", flush=True)
+
+
+def loadGrid(file: str) -> CylindricalGrid:
+    """load a grid saved by saveGrid
+
+    Args:
+        file (str): file name (.npz)
+
+    Returns:
+        CylindricalGrid: grid
+    """
+    with np.load(file) as data:
+        axes = {str(name): data[f"axis{i}"] for i, name in enumerate(data["axes"])}
+        values = {str(key): data[f"value{i}"] for i, key in enumerate(data["keys"])}
+        return CylindricalGrid(str(data["kind"]), axes, values, data["valid"])
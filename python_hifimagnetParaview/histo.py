@@ -7,37 +7,85 @@ from tabulate import tabulate
 
 from paraview.simple import (
     CellSize,
-    Histogram,
     PointDatatoCellData,
     Delete,
-    CreateWriter,
 )
+from paraview import servermanager as sm
+from paraview.vtk.numpy_interface import dataset_adapter as dsa
 
-from .method import convert_data, keyinfo
+from .method import convert_data, keyinfo, fetchArray
+from .nphisto import binEdges, coverageHistograms, weightedHistograms
+
+
+def histoTable(
+    histo: pd.DataFrame,
+    name: str,
+    key: str,
+    fieldunits: dict,
+    AreaorVolume: float,
+    dim: int,
+    verbose: bool = False,
+) -> pd.DataFrame:
+    """convert histogram table to fraction of total area or volume
+
+    Args:
+        histo (pd.DataFrame): histogram table (bin_extents, {Area|Volume}_total)
+        name (str): block name (aka `feelpp` marker) / insert
+        key (str): field name
+        fieldunits (dict): dictionnary field units
+        AreaorVolume (float): total area or volume
+        dim (int): geometry dimmension
+        verbose (bool, optional): print verbose. Defaults to False.
+
+    Returns:
+        pd.DataFrame: bin_extents in output units and {Area|Volume}_total in %
+    """
+
+    if dim == 2:
+        grandeur = "Area"
+    elif dim == 3:
+        grandeur = "Volume"
+
+    csv = histo[["bin_extents", f"{grandeur}_total"]]
+
+    # get key unit
+    if verbose:
+        print(f"histoTable: name={name}, key={key}", flush=True)
+    (toolbox, physic, fieldname) = keyinfo(key.replace("_Magnitude", ""))
+    units = {fieldname: fieldunits[fieldname]["Units"]}
+    values = csv["bin_extents"].to_list()
+    out_values = convert_data(units, values, fieldname)
+    # csv = csv.assign(bin_extents=out_values)
+    csv = csv.assign(bin_extents=np.array([f"{val:.2E}" for val in out_values], float))
+    csv[f"{grandeur}_total"] = csv[f"{grandeur}_total"] / AreaorVolume * 100
+    return csv
 
 
 # plot with matplotlib
 def plotHisto(
-    file: str,
+    histo: pd.DataFrame,
     name: str,
     key: str,
     fieldunits: dict,
     AreaorVolume: float,
     basedir: str,
     dim: int,
+    plot: bool = True,
     show: bool = True,
     verbose: bool = False,
 ):
     """plot histogramms
 
     Args:
-        file (str): csv file containing datas for hist
+        histo (pd.DataFrame): histogram table (bin_extents, {Area|Volume}_total)
         name (str): block name (aka `feelpp` marker) / insert
         key (str): field name
         fieldunits (dict): dictionnary field units
         AreaorVolume (float): total area or volume
         basedir (str): result directory
         dim (int): geometry dimmension
+        plot (bool, optional): render the plot, otherwise only save the table.
+            Defaults to True.
         show (bool, optional): show histogramms. Defaults to True.
         verbose (bool, optional): print verbose. Defaults to False.
     """
@@ -47,17 +95,8 @@ def plotHisto(
     elif dim == 3:
         grandeur = "Volume"
 
-    ax = plt.gca()
-    csv = pd.read_csv(file)
+    csv = histoTable(histo, name, key, fieldunits, AreaorVolume, dim, verbose)
 
-    csv = csv[["bin_extents", f"{grandeur}_total"]]
-    keys = csv.columns.values.tolist()
-    # print("histo before scaling", flush=True)
-    # print(tabulate(csv, headers="keys", tablefmt="psql"))
-
-    # get key unit
-    if verbose:
-        print(f"plotHisto: file={file}, key={key}", flush=True)
     (toolbox, physic, fieldname) = keyinfo(key.replace("_Magnitude", ""))
     symbol = fieldunits[fieldname]["Symbol"]
     msymbol = symbol
@@ -66,45 +105,40 @@ def plotHisto(
     [in_unit, out_unit] = fieldunits[fieldname]["Units"]
     # print(f"in_units={in_unit}, out_units={out_unit}", flush=True)
 
-    units = {fieldname: fieldunits[fieldname]["Units"]}
-    values = csv["bin_extents"].to_list()
-    out_values = convert_data(units, values, fieldname)
-    # csv = csv.assign(bin_extents=out_values)
-    csv = csv.assign(bin_extents=np.array([f"{val:.2E}" for val in out_values], float))
-    csv[f"{grandeur}_total"] = csv[f"{grandeur}_total"] / AreaorVolume * 100
-
-    title = f"{name}: {key}"
-    if fieldunits["Current"]["Val"]:
-        title = title + f"\nI={fieldunits['Current']['Val']}"
-    if fieldunits["B0"]["Val"]:
-        title = title + f"\nB0={fieldunits['B0']['Val']}T"
-    if fieldunits["Bbg"]["Val"]:
-        title = title + f"\nBackground field: {fieldunits['Bbg']['Val']}"
-    csv.plot.bar(
-        x="bin_extents",
-        y=f"{grandeur}_total",
-        xlabel=rf"{msymbol}[{out_unit:~P}]",
-        ylabel=f"Fraction of total {grandeur} [%]",
-        title=title,
-        grid=True,
-        legend=False,
-        rot=45,
-        ax=ax,
-    )
-
-    # if legend is mandatory, set legend to True above and comment out the following line
-    # ax.legend([rf"{symbol}[{out_unit:~P}]"])
-    ax.yaxis.set_major_formatter(lambda x, pos: f"{x:.1f}")
-    # ax.xaxis.set_major_formatter(lambda x, pos: f"{x:.3f}")
-    show = False
-    if show:
-        plt.show()
-    else:
-        plt.tight_layout()
-        plt.savefig(
-            f"{basedir}/histograms/{name}-{key}-histogram-matplotlib.png", dpi=300
+    if plot:
+        ax = plt.gca()
+        title = f"{name}: {key}"
+        if fieldunits["Current"]["Val"]:
+            title = title + f"\nI={fieldunits['Current']['Val']}"
+        if fieldunits["B0"]["Val"]:
+            title = title + f"\nB0={fieldunits['B0']['Val']}T"
+        if fieldunits["Bbg"]["Val"]:
+            title = title + f"\nBackground field: {fieldunits['Bbg']['Val']}"
+        csv.plot.bar(
+            x="bin_extents",
+            y=f"{grandeur}_total",
+            xlabel=rf"{msymbol}[{out_unit:~P}]",
+            ylabel=f"Fraction of total {grandeur} [%]",
+            title=title,
+            grid=True,
+            legend=False,
+            rot=45,
+            ax=ax,
         )
-    plt.close()
+
+        # if legend is mandatory, set legend to True above and comment out the following line
+        # ax.legend([rf"{symbol}[{out_unit:~P}]"])
+        ax.yaxis.set_major_formatter(lambda x, pos: f"{x:.1f}")
+        # ax.xaxis.set_major_formatter(lambda x, pos: f"{x:.3f}")
+        show = False
+        if show:
+            plt.show()
+        else:
+            plt.tight_layout()
+            plt.savefig(
+                f"{basedir}/histograms/{name}-{key}-histogram-matplotlib.png", dpi=300
+            )
+        plt.close()
 
     # rename columns for tabulate
     csv.rename(
@@ -134,22 +168,83 @@ def plotHisto(
     pass
 
 
-def getresultHisto(
+def fetchHistos(input, dim: int, keys: dict, BinCount: int = 10) -> dict:
+    """volume/area weighted histograms of a paraview source
+
+    PointData are converted to CellData with PointDatatoCellData
+
+    Args:
+        input:  paraview reader
+        dim (int): geometry dimmension
+        keys (dict): {field name: number of components}
+        BinCount (int, optional): number of bins in histogram. Defaults to 10.
+
+    Returns:
+        dict: {key: Histogram}
+    """
+    if dim == 2:
+        grandeur = "Area"
+    elif dim == 3:
+        grandeur = "Volume"
+
+    # convert pointdata to celldata (celldata are passed)
+    pointDatatoCellData = PointDatatoCellData(
+        registrationName="pointDatatoCellData", Input=input
+    )
+    cellSize1 = CellSize(registrationName="CellSize1", Input=pointDatatoCellData)
+    # Properties modified on cellSize1 for 3D
+    cellSize1.ComputeVertexCount = 0
+    cellSize1.ComputeLength = 0
+    if dim == 2:
+        cellSize1.ComputeArea = 1  # for 2D
+    elif dim == 3:
+        cellSize1.ComputeArea = 0
+        cellSize1.ComputeVolume = 1  # for 3D
+    cellSize1.ComputeSum = 0
+    cellSize1.UpdatePipeline()
+
+    np_dataset = dsa.WrapDataObject(sm.Fetch(cellSize1))
+    measure = fetchArray(np_dataset, "CellData", grandeur)
+
+    columns = {}
+    edges = {}
+    for key, Components in keys.items():
+        values = fetchArray(np_dataset, "CellData", key)
+        if values is None:
+            continue
+        if Components > 1:
+            values = np.linalg.norm(values, axis=1)
+        columns[key] = values
+        edges[key] = binEdges(values.min(), values.max(), BinCount)
+    histos = weightedHistograms(columns, measure, edges)
+
+    del np_dataset
+    Delete(cellSize1)
+    del cellSize1
+    Delete(pointDatatoCellData)
+    del pointDatatoCellData
+
+    return histos
+
+
+def resultHistos(
     input,
     name: str,
     dim: int,
     AreaorVolume: float,
     fieldunits: dict,
-    key: str,
-    TypeMode: str,
+    keys: dict,
     basedir: str,
-    Components: int = 1,
     BinCount: int = 10,
-    printed: bool = True,
+    plot: bool = True,
     show: bool = False,
     verbose: bool = False,
+    store=None,
 ):
-    """histogramms
+    """volume/area weighted histograms of all fields of a block
+
+    PointData are converted to CellData once, then all fields are binned
+    in memory in a single pass (see nphisto.weightedHistograms)
 
     Args:
         input:  paraview reader
@@ -157,93 +252,101 @@ def getresultHisto(
         dim (int): geometry dimmension
         AreaorVolume (float): total area or volume
         fieldunits (dict): dictionnary field units
-        key (str): field name
-        TypeMode (str):
+        keys (dict): {field name: number of components}
         basedir (str): result directory
-        Components (int, optional): number of components. Defaults to 1.
         BinCount (int, optional): number of bins in histogram. Defaults to 10.
-        printed (bool, optional): Defaults to True.
+        plot (bool, optional): render the plots. Defaults to True.
         show (bool, optional): show histogramms. Defaults to False.
         verbose (bool, optional): print verbose. Defaults to False.
+        store (ResultStore, optional): arrays of input (see method.fetchStore),
+            PointData are then averaged on cells in memory. Defaults to None.
     """
-    os.makedirs(f"{basedir}/histograms", exist_ok=True)
     print(
-        f"getresultHisto: name={name}, key={key}, TypeMode={TypeMode}, Components={Components}, BinCount={BinCount}, show={show}",
+        f"resultHistos: name={name}, keys={list(keys.keys())}, BinCount={BinCount}, plot={plot}",
         flush=True,
     )
 
-    # convert pointdata to celldata
-    if TypeMode == "POINT":
-        pointDatatoCellData = PointDatatoCellData(
-            registrationName="pointDatatoCellData", Input=input
-        )
-
-    elif TypeMode == "CELL":
-        pointDatatoCellData = input
-
+    if store is not None:
+        # each field is weighted by the measure of the blocks it is defined on
+        fields = {}
+        for key in keys:
+            values, groups, measure = store.groupedCellArray(key, magnitude=True)
+            if values is not None:
+                fields[key] = (values, groups, measure)
+        histos = coverageHistograms(fields, BinCount)
     else:
-        print(
-            f'resultHisto: not applicable for {key["Name"]} - unsupported data type {key["Type"]}',
-            flush=True,
-        )
-        return
+        histos = fetchHistos(input, dim, keys, BinCount)
 
-    cellSize1 = CellSize(registrationName="CellSize1", Input=pointDatatoCellData)
-    # Properties modified on cellSize1 for 3D
-    cellSize1.ComputeVertexCount = 0
-    cellSize1.ComputeLength = 0
-    if dim == 2:
-        cellSize1.ComputeArea = 1  # for 2D
-    elif dim == 3:
-        cellSize1.ComputeArea = 0
-        cellSize1.ComputeVolume = 1  # for 3D
-    cellSize1.ComputeSum = 0
-    cellSize1.UpdatePipeline()
-    # print(f"cellSize1 CellData: {cellSize1.CellData[:]}", flush=True)
-
-    histogram1 = Histogram(registrationName="Histogram1", Input=cellSize1)
-    histogram1.SelectInputArray = ["CELLS", key]
-    # for scalar comment out Component
-    if Components > 1:
-        histogram1.Component = "Magnitude"
-    histogram1.CalculateAverages = 1
-    histogram1.CenterBinsAroundMinAndMax = 1
-    histogram1.BinCount = BinCount
-    if not printed:
-        # get params list
-        for prop in histogram1.ListProperties():
-            print(f"Histogram: {prop}={histogram1.GetPropertyValue(prop)}", flush=True)
-    # TODO from key range
-    # histogram1.CustomBinRanges = [min, max]
-
-    # Properties modified on histogram1
-    histogram1.CalculateAverages = 1
-
-    filename = f"{basedir}/histograms/{name}-{key}-histogram.csv"
-    export = CreateWriter(filename, proxy=histogram1)
-    if not printed:
-        for prop in export.ListProperties():
-            print(f"export: {prop}={export.GetPropertyValue(prop)}", flush=True)
-    export.UpdateVTKObjects()  # is it needed?
-    export.UpdatePipeline()
-    Delete(histogram1)
-    del histogram1
-
-    plotHisto(
-        filename,
+    plotHistos(
+        histos,
         name,
-        key,
         fieldunits,
         AreaorVolume,
         basedir,
         dim,
+        plot=plot,
         show=show,
         verbose=verbose,
     )
 
-    # remove temporary csv files
-    # os.remove(filename)
 
-    if TypeMode == "POINT":
-        Delete(pointDatatoCellData)
-        del pointDatatoCellData
+def plotHistos(
+    histos: dict,
+    name: str,
+    fieldunits: dict,
+    AreaorVolume: float,
+    basedir: str,
+    dim: int,
+    plot: bool = True,
+    show: bool = False,
+    verbose: bool = False,
+):
+    """plot in-memory histograms of a block
+
+    fields excluded for this block or constant on this block are skipped
+
+    Args:
+        histos (dict): {key: Histogram} for the block
+        name (str): block name (aka `feelpp` marker) or insert or total
+        fieldunits (dict): dictionnary field units
+        AreaorVolume (float): total area or volume
+        basedir (str): result directory
+        dim (int): geometry dimmension
+        plot (bool, optional): render the plots, otherwise only save the tables.
+            Defaults to True.
+        show (bool, optional): show histogramms. Defaults to False.
+        verbose (bool, optional): print verbose. Defaults to False.
+    """
+    os.makedirs(f"{basedir}/histograms", exist_ok=True)
+
+    if dim == 2:
+        grandeur = "Area"
+    elif dim == 3:
+        grandeur = "Volume"
+
+    for key, histogram in histos.items():
+        if histogram is None or histogram.minimum == histogram.maximum:
+            continue
+
+        (toolbox, physic, fieldname) = keyinfo(key)
+        found = False
+        for excluded in fieldunits[fieldname]["Exclude"]:
+            if excluded in name:
+                found = True
+                break
+        if found:
+            continue
+
+        print(f"plotHistos: name={name}, key={key}", flush=True)
+        plotHisto(
+            histogram.table(grandeur),
+            name,
+            key,
+            fieldunits,
+            AreaorVolume,
+            basedir,
+            dim,
+            plot=plot,
+            show=show,
+            verbose=verbose,
+        )
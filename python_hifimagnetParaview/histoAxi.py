@@ -3,49 +3,42 @@ import numpy as np
 import os
 import gc
 import matplotlib.pyplot as plt
-from matplotlib.pyplot import hist
 
-from paraview.simple import (
-    Delete,
-    CreateView,
-    Show,
-    ExportView,
-)
+from paraview import servermanager as sm
+from paraview.vtk.numpy_interface import dataset_adapter as dsa
 
-from .method import convert_data, resultinfo, keyinfo
+from .method import convert_data, resultinfo, keyinfo, fetchTable
+from .nphisto import uniformEdges, weightedHistograms
 
 
 # plot with matplotlib
 def plotHistoAxi(
-    filename: str,
+    histogram,
     name: str,
     key: str,
     fieldunits: dict,
     basedir: str,
-    BinCount: int,
+    plot: bool = True,
     show: bool = True,
     verbose: bool = False,
 ):
     """plot histogramms
 
     Args:
-        filename (str): csv file containing datas for hist
+        histogram (Histogram): AxiVolume weighted histogram (see nphisto)
         name (str): block name (aka `feelpp` marker) / insert
         key (str): field name
         fieldunits (dict): dict field units
         basedir (str): result directory
-        BinCount (int): number of bins in histogram
+        plot (bool, optional): render the plot, otherwise only save the table.
+            Defaults to True.
         show (bool, optional): show histogramms. Defaults to True.
         verbose (bool, optional): print verbose. Defaults to False.
     """
-    print(f"plotHistAxi: name={name}, key={key}, bin={BinCount}", flush=True)
-
-    ax = plt.gca()
-    csv = pd.read_csv(filename)
-    keys = csv.columns.values.tolist()
-    # print(f"plotHistAxi: keys={keys}", flush=True)
-    # print("histo before scaling",flush=True)
-    # print(tabulate(csv, headers="keys", tablefmt="psql"))
+    print(
+        f"plotHistAxi: name={name}, key={key}, bin={len(histogram.weights)}",
+        flush=True,
+    )
 
     # get key unit
     (toolbox, physic, fieldname) = keyinfo(key.replace("_Magnitude", ""))
@@ -57,51 +50,50 @@ def plotHistoAxi(
     # print(f"in_units={in_unit}, out_units={out_unit}", flush=True)
 
     units = {fieldname: fieldunits[fieldname]["Units"]}
-    values = csv[key].to_list()
-    out_values = convert_data(units, values, fieldname)
-    # csv[key] = out_values
-    csv[key] = [f"{val:.2E}" for val in out_values]
-
-    counts, extend_bins, patches = hist(
-        np.array(csv[key], float),
-        bins=BinCount,
-        weights=csv["AxiVol"],
-        rwidth=0.5,
-    )
-    print(f"counts={counts}", flush=True)
-    print(f"extend_bins={extend_bins}", flush=True)
-    print(f"patches={patches}", flush=True)
-
-    ticks = [(patch._x0 + patch._x0 + patch._width) / 2 for patch in patches]
-    total_key = "Fraction of total Volume [%]"
-    plt.xlabel(rf"{msymbol}[{out_unit:~P}]")
-    plt.ylabel(total_key)
-    plt.xticks(ticks, rotation=45, ha="right")
-    title = f"{name}: {key}"
-    if fieldunits["Current"]["Val"]:
-        title = title + f"\nI={fieldunits['Current']['Val']}"
-    if fieldunits["B0"]["Val"]:
-        title = title + f"\nB0={fieldunits['B0']['Val']}T"
-    if fieldunits["Bbg"]["Val"]:
-        title = title + f"\nBackground field: {fieldunits['Bbg']['Val']}"
-    plt.title(title)
-    plt.grid(True)
-    # plt.legend(False)
-
-    # if legend is mandatory, set legend to True above and comment out the following line
-    # ax.legend([rf"{symbol}[{out_unit:~P}]"])
-    ax.yaxis.set_major_formatter(lambda x, pos: f"{x:.1f}")
-    # ax.xaxis.set_major_formatter(lambda x, pos: f"{x:.3f}")
-    show = False
-    if show:
-        plt.show()
-    else:
-        plt.tight_layout()
-        plt.savefig(
-            f'{basedir}/histograms/{name}-{key.replace("_Magnitude", "")}-histogram-matplotlib.png',
-            dpi=300,
-        )
-    plt.close()
+    edges = np.array(convert_data(units, histogram.edges.tolist(), fieldname), float)
+    ticks = (edges[:-1] + edges[1:]) / 2
+    counts = histogram.weights / histogram.total() * 100
+    if verbose:
+        print(f"counts={counts}", flush=True)
+        print(f"extend_bins={edges}", flush=True)
+
+    if plot:
+        ax = plt.gca()
+        plt.bar(ticks, counts, width=0.5 * np.diff(edges))
+        total_key = "Fraction of total Volume [%]"
+        plt.xlabel(rf"{msymbol}[{out_unit:~P}]")
+        plt.ylabel(total_key)
+        plt.xticks(ticks, rotation=45, ha="right")
+        title = f"{name}: {key}"
+        if fieldunits["Current"]["Val"]:
+            title = title + f"\nI={fieldunits['Current']['Val']}"
+        if fieldunits["B0"]["Val"]:
+            title = title + f"\nB0={fieldunits['B0']['Val']}T"
+        if fieldunits["Bbg"]["Val"]:
+            title = title + f"\nBackground field: {fieldunits['Bbg']['Val']}"
+        plt.title(title)
+        plt.grid(True)
+        # plt.legend(False)
+
+        # if legend is mandatory, set legend to True above and comment out the following line
+        # ax.legend([rf"{symbol}[{out_unit:~P}]"])
+        ax.yaxis.set_major_formatter(lambda x, pos: f"{x:.1f}")
+        # ax.xaxis.set_major_formatter(lambda x, pos: f"{x:.3f}")
+        show = False
+        if show:
+            plt.show()
+        else:
+            plt.tight_layout()
+            plt.savefig(
+                f'{basedir}/histograms/{name}-{key.replace("_Magnitude", "")}-histogram-matplotlib.png',
+                dpi=300,
+            )
+        plt.close()
+
+    # check that sum is roughtly equal to 1
+    eps = 1.0e-4
+    error = abs(1 - counts.sum() / 100.0)
+    assert error <= eps, f"Check Sum(Fraction) failed (error={error} > eps={eps})"
 
     df_histo_plt = pd.DataFrame()
     df_histo_plt[rf"{symbol} [{out_unit:~P}]"] = ticks
@@ -121,12 +113,17 @@ def resultHistos(
     ignored_keys: list[str],
     basedir: str,
     BinCount: int = 10,
+    plot: bool = True,
     printed: bool = True,
     show: bool = False,
     verbose: bool = False,
+    table: pd.DataFrame = None,
 ):
     """histogramms
 
+    all fields are binned in memory in a single pass, weighted by AxiVolume
+    (see nphisto.weightedHistograms)
+
     Args:
         input: paraview reader
         name (str): block name (aka `feelpp` marker) / insert
@@ -135,46 +132,25 @@ def resultHistos(
         ignored_keys (list[str]): list of ignored keys
         basedir (str): result directory
         BinCount (int, optional): number of bins in histograms. Defaults to 10.
+        plot (bool, optional): render the plots. Defaults to True.
         printed (bool, optional): Defaults to True.
         show (bool, optional): show histogramms. Defaults to False.
         verbose (bool, optional): print verbose. Defaults to False.
+        table (pd.DataFrame, optional): cell table of input (see method.fetchTable),
+            fetched from input if None. Defaults to None.
     """
     os.makedirs(f"{basedir}/histograms", exist_ok=True)
     print(f"resultHistos: name={name}, Area={Area}, BinCount={BinCount}", flush=True)
 
-    spreadSheetView = CreateView("SpreadSheetView")
-    cellCenters1Display = Show(input, spreadSheetView, "SpreadSheetRepresentation")
-    spreadSheetView.Update()
-
-    filename = f"{basedir}/histograms/{name}-Axi-cellcenters-all.csv"
-    ExportView(
-        filename,
-        view=spreadSheetView,
-        RealNumberNotation="Scientific",
-    )
-
-    csv = pd.read_csv(filename)
-    keys = csv.columns.values.tolist()
-    # print(f"read_csv: csv={filename}, keys={keys}", flush=True)
-
-    sum = csv["AxiVolume"].sum()
-    csv["AxiVol"] = csv["AxiVolume"] / sum * 100
-    # print(f"Area={Area}, sum={sum}",flush=True)
-
-    # check that sum is roughtly equal to 1
-    # print(f'check Sum(Fraction): {csv["Fraction of total Area [%]"].sum()}',flush=True)
-    eps = 1.0e-4
-    error = abs(1 - csv["AxiVol"].sum() / 100.0)
-    assert error <= eps, f"Check Sum(Fraction) failed (error={error} > eps={eps})"
-
-    csv.to_csv(filename)
-    # print(f'Sum(AxiVol)={csv["AxiVol"].sum()}',flush=True)
+    if table is None:
+        table = fetchTable(dsa.WrapDataObject(sm.Fetch(input)))
+    measure = table["AxiVolume"].to_numpy()
 
+    columns = {}
+    edges = {}
     datadict = resultinfo(input, ignored_keys)
     for datatype in datadict:
         if datatype == "CellData":
-            AttributeMode = datadict[datatype]["AttributeMode"]
-            TypeMode = datadict[datatype]["TypeMode"]
             for key, kdata in datadict[datatype]["Arrays"].items():
                 if not key in ignored_keys:
                     Components = kdata["Components"]
@@ -183,19 +159,26 @@ def resultHistos(
                         keyname = key
                         if Components > 1:
                             keyname = f"{key}_Magnitude"
-                        plotHistoAxi(
-                            filename,
-                            name,
-                            keyname,
-                            fieldunits,
-                            basedir,
-                            BinCount,
-                            show=show,
-                            verbose=verbose,
+                        if keyname not in table:
+                            continue
+                        values = table[keyname].to_numpy()
+                        columns[keyname] = values
+                        edges[keyname] = uniformEdges(
+                            values.min(), values.max(), BinCount
                         )
 
-    Delete(spreadSheetView)
-    del spreadSheetView
+    histos = weightedHistograms(columns, measure, edges)
+    for keyname, histogram in histos.items():
+        plotHistoAxi(
+            histogram,
+            name,
+            keyname,
+            fieldunits,
+            basedir,
+            plot=plot,
+            show=show,
+            verbose=verbose,
+        )
 
     # Force a garbage collection
     collected = gc.collect()
@@ -204,6 +187,3 @@ def resultHistos(
             f"resultsHistos: Garbage collector: collected {collected} objects.",
             flush=True,
         )
-
-    # remove: f"{basedir}/histograms/{name}-Axi-cellcenters-all.csv"
-    # os.remove(filename)
@@ -0,0 +1,213 @@
+"""Process pool for the per-block stats and histograms (`--jobs N`)
+
+The blocks of a ResultStore are split into shards of similar cell counts.
+Each worker process computes the per-block partials (npstats.Moments,
+nphisto.Histogram) of a shard, the parent merges them as for MPI ranks
+(see parallel.mergeGathered). Workers are forked so that they share the
+store memory, or they memory-map it again when it was dumped (see
+store.saveStore).
+This module does not depend on ParaView.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import multiprocessing
+
+import numpy as np
+
+from .nphisto import groupedHistograms
+from .npstats import arrayColumns, groupedMoments
+from .parallel import mergeGathered
+from .store import loadStore
+
+_store = None
+
+
+def shardBlocks(sizes: list[int], jobs: int) -> list[list[int]]:
+    """split blocks into shards of similar sizes
+
+    blocks are assigned by decreasing size to the lightest shard
+
+    Args:
+        sizes (list[int]): number of cells per block
+        jobs (int): number of shards
+
+    Returns:
+        list[list[int]]: sorted block indices per shard (no empty shard)
+    """
+    shards = [[] for _ in range(max(1, jobs))]
+    loads = [0] * len(shards)
+    for i in sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(i)
+        loads[lightest] += sizes[i]
+    return [sorted(shard) for shard in shards if shard]
+
+
+def shardMoments(store, shard: list[int], fields: list[tuple]) -> dict:
+    """Moments per block of a shard
+
+    Args:
+        store (ResultStore): result arrays
+        shard (list[int]): block indices
+        fields (list[tuple]): (datatype, key) of the fields
+
+    Returns:
+        dict: {(datatype, key): Moments (or None) per block of the store}
+    """
+    blocks = [store.blocks[i] for i in shard]
+    partials = {}
+    for datatype, key in fields:
+        values, groups = store.groupedArray(datatype, key, blocks)
+        partials[(datatype, key)] = [None] * len(store.blocks)
+        if values is not None:
+            partials[(datatype, key)] = groupedMoments(
+                arrayColumns(key, values), groups, len(store.blocks)
+            )
+    return partials
+
+
+def shardRanges(store, shard: list[int], keys: list[str]) -> dict:
+    """range of the cell values (norm for vectors) on a shard
+
+    Args:
+        store (ResultStore): result arrays
+        shard (list[int]): block indices
+        keys (list[str]): field names
+
+    Returns:
+        dict: {key: (min, max)}, (inf, -inf) if undefined on the shard
+    """
+    blocks = [store.blocks[i] for i in shard]
+    ranges = {}
+    for key in keys:
+        values, groups, weights = store.groupedCellArray(key, blocks, magnitude=True)
+        ranges[key] = (np.inf, -np.inf)
+        if values is not None:
+            ranges[key] = (values.min(), values.max())
+    return ranges
+
+
+def shardHistograms(store, shard: list[int], edges: dict) -> dict:
+    """measure weighted Histograms per block of a shard
+
+    Args:
+        store (ResultStore): result arrays
+        shard (list[int]): block indices
+        edges (dict): {key: bin edges}
+
+    Returns:
+        dict: {key: Histogram (or None) per block of the store}
+    """
+    blocks = [store.blocks[i] for i in shard]
+    partials = {}
+    for key, kedges in edges.items():
+        values, groups, weights = store.groupedCellArray(key, blocks, magnitude=True)
+        partials[key] = [None] * len(store.blocks)
+        if values is not None:
+            partials[key] = groupedHistograms(
+                values, groups, len(store.blocks), kedges, weights
+            )
+    return partials
+
+
+def mergeShards(results: list[dict], merge) -> dict:
+    """merge the per-block partials returned by the shards
+
+    Args:
+        results (list[dict]): {field: partial per block} of each shard
+        merge: function merging a list of partials (eg. npstats.mergeMoments)
+
+    Returns:
+        dict: {field: merged partial per block}
+    """
+    return {
+        field: mergeGathered([result[field] for result in results], merge)
+        for field in results[0]
+    }
+
+
+def mergeRanges(results: list[dict]) -> dict:
+    """global ranges from the ranges of the shards
+
+    Args:
+        results (list[dict]): {key: (min, max)} of each shard
+
+    Returns:
+        dict: {key: (min, max)}
+    """
+    return {
+        key: (
+            min(result[key][0] for result in results),
+            max(result[key][1] for result in results),
+        )
+        for key in results[0]
+    }
+
+
+def _initWorker(store, storedir: str):
+    global _store
+    _store = loadStore(storedir) if storedir else store
+
+
+def _runShard(task, shard: list[int], args: tuple):
+    return task(_store, shard, *args)
+
+
+class BlockPool:
+    """worker processes computing per-block partials on shards of blocks
+
+    Args:
+        store (ResultStore): result arrays
+        jobs (int): number of worker processes
+        storedir (str, optional): directory of the dumped store, memory-mapped
+            by each worker instead of sharing the parent memory. Defaults to None.
+        method (str, optional): start method of the workers, fork when
+            available if None. Defaults to None.
+    """
+
+    def __init__(self, store, jobs: int, storedir: str = None, method: str = None):
+        sizes = [0 if m is None else len(m) for m in store.measure]
+        self.shards = shardBlocks(sizes, jobs)
+        if method is None and "fork" in multiprocessing.get_all_start_methods():
+            method = "fork"
+        context = multiprocessing.get_context(method)
+        initargs = (None, storedir)
+        if not storedir:
+            # the VTK dataset cannot be pickled (spawn, forkserver)
+            shared = copy.copy(store)
+            shared.dataset = None
+            initargs = (shared, None)
+        self.executor = ProcessPoolExecutor(
+            max_workers=len(self.shards),
+            mp_context=context,
+            initializer=_initWorker,
+            initargs=initargs,
+        )
+        print(
+            f"BlockPool: {len(self.shards)} workers, shards={self.shards}",
+            flush=True,
+        )
+
+    def map(self, task, *args) -> list:
+        """run a shard task (eg. shardMoments) on every shard
+
+        Args:
+            task: function(store, shard, *args)
+            args: extra arguments of task
+
+        Returns:
+            list: result of each shard
+        """
+        n = len(self.shards)
+        return list(self.executor.map(_runShard, [task] * n, self.shards, [args] * n))
+
+    def close(self):
+        """stop the worker processes"""
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
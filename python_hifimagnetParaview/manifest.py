@@ -0,0 +1,144 @@
+"""Fingerprints of the rendered views
+
+Each view (png file) is recorded in `paraview.exports/views-manifest.json`
+with a fingerprint of everything that changes the image: the dataset key
+(see cache.cacheKey), the field and its color array, the selected blocks,
+the camera, the color range (histogram used by `--customRangeHisto`), the
+annotation, the resolution and the background mode. Views whose
+fingerprint is unchanged are not rendered again (unless `--forceViews`).
+This module does not depend on ParaView.
+"""
+
+import hashlib
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MANIFEST = "views-manifest.json"
+
+
+def fileDigest(file: str) -> str:
+    """sha256 of a file content
+
+    Args:
+        file (str): file name
+
+    Returns:
+        str: hexadecimal digest, None if file does not exist
+    """
+    if not os.path.isfile(file):
+        return None
+    with open(file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def viewFingerprint(parts: dict) -> str:
+    """fingerprint of a view
+
+    Args:
+        parts (dict): view parameters (tuples are stored as lists, other
+            non json types by their str)
+
+    Returns:
+        str: hexadecimal key
+    """
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+class ViewManifest:
+    """manifest of the rendered views of a result directory
+
+    Args:
+        basedir (str): result directory (views are in {basedir}/views)
+        dataset (str): key of the displayed dataset (see cache.cacheKey)
+        force (bool, optional): render all views. Defaults to False.
+    """
+
+    def __init__(self, basedir: str, dataset: str, force: bool = False):
+        self.basedir = basedir
+        self.file = f"{basedir}/{MANIFEST}"
+        self.dataset = dataset
+        self.force = force
+        self.entries = self.load()
+        self.pending = {}
+        self.recorded = {}
+        self.skipped = 0
+
+    def load(self) -> dict:
+        """recorded fingerprints
+
+        Returns:
+            dict: {view file relative to basedir: fingerprint}
+        """
+        if not os.path.isfile(self.file):
+            return {}
+        try:
+            with open(self.file) as f:
+                return json.load(f)
+        except ValueError:
+            print(f"ViewManifest: ignore corrupted {self.file}", flush=True)
+            return {}
+
+    def key(self, filename: str) -> str:
+        """view file name relative to basedir"""
+        return os.path.relpath(filename, self.basedir)
+
+    def stale(self, filename: str, parts: dict) -> bool:
+        """check if a view must be rendered
+
+        the fingerprint is kept until the view is recorded
+
+        Args:
+            filename (str): view file
+            parts (dict): view parameters (see viewFingerprint)
+
+        Returns:
+            bool: True if forced, if the file is missing or if the fingerprint changed
+        """
+        key = self.key(filename)
+        fingerprint = viewFingerprint({"dataset": self.dataset, **parts})
+        self.pending[key] = fingerprint
+        if (
+            self.force
+            or not os.path.isfile(filename)
+            or self.entries.get(key) != fingerprint
+        ):
+            return True
+        self.skipped += 1
+        return False
+
+    def record(self, filename: str):
+        """record a rendered view
+
+        Args:
+            filename (str): view file
+        """
+        key = self.key(filename)
+        if key in self.pending:
+            self.recorded[key] = self.pending.pop(key)
+            self.entries[key] = self.recorded[key]
+
+    def save(self):
+        """merge the recorded views into the manifest file
+
+        the file is locked (when possible) so that render workers
+        (see renderfarm) can save concurrently
+        """
+        os.makedirs(self.basedir, exist_ok=True)
+        with open(f"{self.file}.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self.load()
+            entries.update(self.recorded)
+            tmpfile = f"{self.file}.{os.getpid()}.tmp"
+            with open(tmpfile, "w") as f:
+                json.dump(entries, f, indent=2, sort_keys=True)
+            os.replace(tmpfile, self.file)
+        self.entries = entries
+        if self.skipped:
+            print(f"ViewManifest: {self.skipped} views unchanged, skipped", flush=True)
@@ -1,19 +1,29 @@
-import gc
+import os
+import numpy as np
 
 from paraview.simple import (
+    OpenDataFile,
+    SaveData,
     CellSize,
-    ExtractBlock,
-    CellDatatoPointData,
     Calculator,
-    MergeBlocks,
-    Delete,
+    ProgrammableFilter,
 )
-from paraview import servermanager as sm
 from paraview.vtk.numpy_interface import dataset_adapter as dsa
-from paraview.vtk.numpy_interface import algorithms as algs
 
-from .method import convert_data, info, resultinfo
-from .stats import resultStats, createStatsTable
+from .method import convert_data, info, fetchStore, fetchLocal, PointDataCache
+from .stats import (
+    resultStats,
+    resultBlockStats,
+    mergeBlockStats,
+    resultBlockHistos,
+    sumBlockHistos,
+    createStatsTable,
+)
+from .histo import plotHistos
+from .cache import clearEntry
+from .store import isStore, loadStore, saveStore
+from .parallel import allInfo, allSum, isRoot, barrier
+from .jobs import BlockPool
 
 
 def scaleField(input, key: str, nkey: str, AttributeType: str, factor: float):
@@ -67,110 +77,102 @@ def addField(input, key: str, nkey: str, AttributeType: str, factor: float):
     return calculator1
 
 
-def rectTocylField(input, key: str, nkey: str, AttributeType: str):
-    """compute r and theta component of a vector Field
-
-    vr = ux * cos + uy * sin
-    vt = ux* -sin + uy * cos
-
-    with cos = x/sqrt(x²+y²) and sin = y/sqrt(x²+y²)
+def createDerivedFields(input, keys: list[str], axi: bool = False):
+    """create norm and cylindrical components of vector PointData in one stage
 
-    x: coordsX
-    y : coordsY
-
-    ux: "thermo_electric.electric.current_density_X"
+    replaces the Calculator chains (norm, then cylindrical components) by
+    a single ProgrammableFilter running derived.derivedFields, array names
+    are unchanged
 
     Args:
         input: paraview reader
-        key (str): field name
-        nkey (str): _description_
-        AttributeType (str): 'Point Data'
-
-    Raises:
-        RuntimeError: rectTocylField: key - unsupported AttributeType
+        keys (list[str]): vector PointData field names
+        axi (bool, optional): axisymmetric case. Defaults to False.
 
     Returns:
-        cylindric paraview reader
+        paraview ProgrammableFilter
     """
-
-    if AttributeType != "Point Data":
-        raise RuntimeError(
-            f"rectTocylField: {key} - unsupported AttributeType: {AttributeType}"
-        )
-    inputDataPoint = [field.Name for field in input.PointData]
-    # print(
-    #     f"rectTocylField: input PointData = {inputDataPoint}",
-    #     flush=True,
-    # )
-
-    # check if r exists already
-    if "r" in inputDataPoint:
-        # skip the next 3 steps: aka calculator1 to calculator3
-        calculator3 = input
-
-    else:
-        calculator1 = Calculator(registrationName="Calculator1", Input=input)
-        calculator1.AttributeType = AttributeType  # 'Cell Data'
-        calculator1.ResultArrayName = "r"
-        calculator1.Function = "sqrt(coordsX*coordsX+coordsY*coordsY)"
-        calculator1.UpdatePipeline()
-
-        calculator2 = Calculator(Input=calculator1)
-        calculator2.AttributeType = AttributeType  # 'Cell Data'
-        calculator2.ResultArrayName = "Cos"
-        calculator2.Function = "coordsX/r"
-        calculator2.UpdatePipeline()
-
-        calculator3 = Calculator(Input=calculator2)
-        calculator3.AttributeType = AttributeType  # 'Cell Data'
-        calculator3.ResultArrayName = "Sin"
-        calculator3.Function = "coordsY/r"
-        calculator3.UpdatePipeline()
-
-    calculator4 = Calculator(Input=calculator3)
-    calculator4.AttributeType = AttributeType  # 'Cell Data'
-    calculator4.ResultArrayName = f"{key}_ur"
-    calculator4.Function = f'"{key}_X"*Cos+"{key}_Y"*Sin'
-    calculator4.UpdatePipeline()
-
-    calculator5 = Calculator(Input=calculator4)
-    calculator5.AttributeType = AttributeType  # 'Cell Data'
-    calculator5.ResultArrayName = f"{key}_ut"
-    calculator5.Function = f'-"{key}_X"*Sin+"{key}_Y"*Cos'
-
-    calculator5.UpdatePipeline()
-    return calculator5
-
-
-def createVectorNorm(
-    input, key: str, nkey: str, AttributeType: str, printed: bool = True
+    script = f"""
+from paraview.vtk.numpy_interface import dataset_adapter as dsa
+from python_hifimagnetParaview.derived import derivedFields
+
+pairs = [(inputs[0], output)]
+if isinstance(inputs[0], dsa.CompositeDataSet):
+    pairs = zip(inputs[0], output)
+for iblock, oblock in pairs:
+    fields = {{}}
+    for key in {keys!r}:
+        if iblock.PointData[key] is not dsa.NoneArray:
+            fields[key] = iblock.PointData[key]
+    for name, values in derivedFields(iblock.Points, fields, {axi}).items():
+        oblock.PointData.append(values, name)
+"""
+    derived = ProgrammableFilter(registrationName="DerivedFields", Input=input)
+    derived.CopyArrays = 1
+    derived.Script = script
+    derived.UpdatePipeline()
+    return derived
+
+
+def derivedDataset(
+    input, dim: int, printed: bool = True, pointdata: PointDataCache = None
 ):
-    """create Norm of a vector
+    """add derived fields (PointData, norm, cylindrical components) and cell sizes
 
     Args:
         input: paraview reader
-        key (str): field name
-        nkey (str): _description_
-        AttributeType (str): 'Cell Data'
+        dim (int): geometry dimmension
         printed (bool, optional): Defaults to True.
+        pointdata (PointDataCache, optional): share the point data of input.
+            Defaults to None.
 
     Returns:
-        paraview reader
+        cellsize: paraview CellSize filter
     """
 
-    calculator1 = Calculator(registrationName="Calculator1", Input=input)
-    calculator1.AttributeType = AttributeType  # 'Cell Data'
-    calculator1.ResultArrayName = f"{key}norm"
-    calculator1.Function = f'mag("{key}")'
-    if not printed:
-        for prop in calculator1.ListProperties():
+    # rectTocyl: need CellDataToPointData before
+    # for temperature add, for forces and densities norm, rescale
+    cache = pointdata if pointdata is not None else PointDataCache()
+    cellDatatoPointData1 = cache.get(input)
+
+    # for vector
+    print("Add Norm for vectors and RectToCyl:", flush=True)
+    calculator = cellDatatoPointData1
+
+    keys = []
+    for field in cellDatatoPointData1.PointData:
+        if (dim == 2 and field.GetNumberOfComponents() > 1) or (
+            field.GetNumberOfComponents() == dim
+        ):
             print(
-                f"Calculator: {prop}={calculator1.GetPropertyValue(prop)}",
+                f"create {field.Name}norm, {field.Name}ur and {field.Name}ut for {field.Name} PointData vector",
                 flush=True,
             )
+            keys.append(field.Name)
+    if keys:
+        calculator = createDerivedFields(cellDatatoPointData1, keys)
 
-    calculator1.UpdatePipeline()
-    return calculator1
+    print("Get mesh size", flush=True)
+    cellsize = CellSize(calculator)  # input
+
+    # set some params
+    cellsize.ComputeLength = 0
+    if dim == 2:
+        cellsize.ComputeArea = 1
+        cellsize.ComputeVolume = 0
+    elif dim == 3:
+        cellsize.ComputeArea = 0
+        cellsize.ComputeVolume = 1
+    cellsize.ComputeVertexCount = 0
+    cellsize.ComputeSum = 1
+    # get params list
+    if not printed:
+        for prop in cellsize.ListProperties():
+            print(f"cellsize: {prop}={cellsize.GetPropertyValue(prop)}", flush=True)
+
+    # apply
+    cellsize.UpdatePipeline()
+    return cellsize
 
 
 def meshinfo(
@@ -183,9 +185,16 @@ def meshinfo(
     ComputeStats: bool = True,
     ComputeHisto: bool = False,
     BinCount: int = 10,
+    PlotHisto: bool = True,
+    WriteStats: bool = True,
+    cachefile: str = None,
+    storedir: str = None,
+    comm=None,
+    jobs: int = 1,
     show: bool = False,
     verbose: bool = False,
     printed: bool = True,
+    pointdata: PointDataCache = None,
 ) -> tuple:
     """display geometric info from input dataset
 
@@ -199,88 +208,101 @@ def meshinfo(
         ComputeStats (bool, optional): compute statistics. Defaults to True.
         ComputeHisto (bool, optional): compute histograms. Defaults to False.
         BinCount (int, optional): number of bins in histograms. Defaults to 10.
+        PlotHisto (bool, optional): render histogram plots. Defaults to True.
+        WriteStats (bool, optional): compute and write the insert statistics,
+            False in render workers (see renderfarm). Defaults to True.
+        cachefile (str, optional): derived dataset cache path without extension
+            (see cache.cachePath), no cache if None. Defaults to None.
+        storedir (str, optional): directory of the memory-mapped ResultStore
+            (see store.saveStore), loaded if it exists, saved otherwise.
+            Defaults to None.
+        comm (MPI.Comm, optional): parallel run (see parallel.world), each rank
+            works on its local piece, results are written by rank 0.
+            Defaults to None.
+        jobs (int, optional): number of worker processes for the per-block
+            stats and histograms (see jobs.BlockPool). Defaults to 1.
         show (bool, optional): show histograms. Defaults to False.
         verbose (bool, optional): print verbose. Defaults to False.
         printed (bool, optional): Defaults to True.
+        pointdata (PointDataCache, optional): point data shared with the
+            other stages (see method.PointDataCache). Defaults to None.
+
+    Raises:
+        RuntimeError: meshinfo: parallel runs need a MultiBlock dataset
 
     Returns:
         cellsize: updated paraview reader
         blockdata (dict): dict of blocks data
         stats (dict): dict of statistics
+        store (ResultStore): arrays of cellsize per block (see method.fetchStore),
+            local piece in a parallel run
     """
 
-    # rectTocyl: need CellDataToPointData before
-    # for temperature add, for forces and densities norm, rescale
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-
-    # for vector
-    print("Add Norm for vectors and RectToCyl:", flush=True)
-    calculator = cellDatatoPointData1
-
-    for field in cellDatatoPointData1.PointData:
-        if (dim == 2 and field.GetNumberOfComponents() > 1) or (
-            field.GetNumberOfComponents() == dim
-        ):
-            print(
-                f"create {field.Name}norm for {field.Name} PointData vector",
-                flush=True,
-            )
-            calculator = createVectorNorm(
-                calculator, field.Name, field.Name, "Point Data"
-            )
-            print(
-                f"create {field.Name}ur and {field.Name}ut for {field.Name} PointData vector",
-                flush=True,
-            )
-            calculator = rectTocylField(
-                calculator, field.Name, field.Name, "Point Data"
-            )
-
-    print("Get mesh size", flush=True)
-    cellsize = CellSize(calculator)  # input
-
-    # set some params
-    cellsize.ComputeLength = 0
     if dim == 2:
-        cellsize.ComputeArea = 1
-        cellsize.ComputeVolume = 0
         grandeur = "Area"
     elif dim == 3:
-        cellsize.ComputeArea = 0
-        cellsize.ComputeVolume = 1
         grandeur = "Volume"
-    cellsize.ComputeVertexCount = 0
-    cellsize.ComputeSum = 1
-    # get params list
-    if not printed:
-        for prop in cellsize.ListProperties():
-            print(f"cellsize: {prop}={cellsize.GetPropertyValue(prop)}", flush=True)
 
-    # apply
-    cellsize.UpdatePipeline()
-    dataInfo = info(cellsize)
+    cached = None
+    if cachefile:
+        for ext in [".vtm", ".vtu"]:
+            if os.path.isfile(f"{cachefile}{ext}"):
+                cached = f"{cachefile}{ext}"
 
-    dataset = sm.Fetch(cellsize)
-    np_dataset = dsa.WrapDataObject(dataset)
+    if cached:
+        print(f"Load cached dataset: {cached}", flush=True)
+        cellsize = OpenDataFile(cached)
+        cellsize.UpdatePipeline()
+    else:
+        cellsize = derivedDataset(input, dim, printed, pointdata)
+        if cachefile:
+            ext = ".vtu"
+            dataclass = cellsize.GetDataInformation().GetDataClassName()
+            if dataclass == "vtkMultiBlockDataSet":
+                ext = ".vtm"
+            clearEntry(cachefile)
+            print(f"Save dataset to cache: {cachefile}{ext}", flush=True)
+            SaveData(
+                f"{cachefile}{ext}",
+                proxy=cellsize,
+                DataMode="Binary",
+                CompressorType="None",
+            )
 
-    blockdata = {}
-    # check dataset type
-    if dataset.IsA("vtkUnstructuredGrid"):
-        print("UnstructuredGrid", flush=True)
-        block = dataset
-    elif dataset.IsA("vtkMultiBlockDataSet"):
+    dataInfo = info(cellsize)
+
+    # one block per leaf
+    multiblock = dataInfo.GetDataClassName() == "vtkMultiBlockDataSet"
+    blocks = ["insert"]
+    names = ["insert"]
+    if multiblock:
         print("MultiBlockDataSet", flush=True)
-        block = dataset.GetBlock(0)
-
-    grandeur_data = block.GetCellData().GetArray(grandeur)
-    # print(f'block cellData[{grandeur}_data]: {grandeur_data}, type={type(grandeur_data)}', flush=True)
-    AreaorVolume = block.GetFieldData().GetArray(grandeur)
-    # print(f'block fieldData[{grandeur}]: {AreaorVolume}, type={type(AreaorVolume)}', flush=True)
-    np_grandeur = np_dataset.FieldData[grandeur]
-    # print(f'block fieldData[np_{grandeur}]: {np_grandeur}, type={type(np_grandeur)}, length={algs.shape(np_grandeur)}', flush=True)
-    tvol = algs.sum(np_grandeur)
+        hierarchy = dataInfo.GetHierarchy()
+        rootnode = hierarchy.GetRootNode()
+        rootSelector = f"/{hierarchy.GetRootNodeName()}"
+        children = [
+            hierarchy.GetChild(rootnode, i)
+            for i in range(hierarchy.GetNumberOfChildren(rootnode))
+        ]
+        names = [hierarchy.GetNodeName(child) for child in children]
+        blocks = [f"{rootSelector}/{name}" for name in names]
+    else:
+        print("UnstructuredGrid", flush=True)
+        if comm is not None:
+            raise RuntimeError("meshinfo: parallel runs need a MultiBlock dataset")
+
+    if storedir and isStore(storedir):
+        store = loadStore(storedir)
+    else:
+        np_dataset = dsa.WrapDataObject(fetchLocal(cellsize, comm))
+        store = fetchStore(np_dataset, blocks, names, grandeur, comm is not None)
+        if storedir:
+            clearEntry(storedir)
+            saveStore(store, storedir)
+
+    # block measures (summed over the local pieces in a parallel run)
+    totals = allSum(store.totals, comm)
+    tvol = float(totals.sum())
     vunits = fieldunits[grandeur]["Units"]
     mmdim = f"{vunits[1]:~P}"
     tvol_mmdim = convert_data(
@@ -289,28 +311,25 @@ def meshinfo(
         grandeur,
     )
     print(
-        f"block fieldData[np_{grandeur}]: total={tvol_mmdim} {mmdim}, parts={algs.shape(np_grandeur)}",
+        f"block fieldData[{grandeur}]: total={tvol_mmdim} {mmdim}, parts={len(blocks)}",
         flush=True,
     )
 
-    if dataset.IsA("vtkMultiBlockDataSet"):
-        hierarchy = dataInfo.GetHierarchy()
-        rootnode = hierarchy.GetRootNode()
-        rootSelector = f"/{hierarchy.GetRootNodeName()}"
-        blocks = hierarchy.GetNumberOfChildren(rootnode)
-        print(f"Load blocks: {blocks}", flush=True)
-
-        sum_vol = 0
-        for i in range(blocks):
-            child = hierarchy.GetChild(rootnode, i)
-            name = hierarchy.GetNodeName(child)
-            rootChild = f"{rootSelector}/{name}"
+    blockdata = {}
+    if multiblock:
+        print(f"Load blocks: {len(blocks)}", flush=True)
+
+        measures = [0 if m is None else np.sum(m) for m in store.measure]
+        sum_vol = float(allSum(measures, comm).sum())
+        for i, child in enumerate(children):
+            name = names[i]
+            rootChild = blocks[i]
             child_info = input.GetSubsetDataInformation(0, child)  # rootChild)
             # print(f'block[{i}]: {name}, child={child}, childInfo: {child_info}', flush=True)
 
             nodes = child_info.GetNumberOfPoints()
             cells = child_info.GetNumberOfCells()
-            vol = np_grandeur.Arrays[i][0]
+            vol = float(totals[i])
             vol_mmdim = convert_data(
                 {grandeur: vunits},
                 vol,
@@ -328,255 +347,138 @@ def meshinfo(
                 grandeur: vol,
             }
 
-            sum_vol += vol
-
-        # check tvol == Sum(vol)
+        # check tvol == Sum(cell vol)
         if abs(1 - sum_vol / tvol) > 1.0e-3:
             raise RuntimeError(
                 f"Total {grandeur} != Sum({grandeur}), error={abs(1-sum_vol/tvol)}"
             )
 
+        # render workers only need the dataset and its blocks
+        if not WriteStats:
+            barrier(comm)
+            return cellsize, blockdata, {}, store
+
         # Compute Stats
         stats = []
 
         print("Data ranges:", flush=True)
-        datadict = resultinfo(cellsize, ignored_keys, verbose)
-
-        """
-        # To speed up Stats by blocks
-        # !!! add Standard Deviation form Mean and M2 !!!
-        # this would replace also createStatsTable
-
-        print("Global Stats:", flush=True)
-
-        for datatype in datadict:
-            if datatype != "FieldData":
-                AttributeMode = datadict[datatype]["AttributeMode"]
-                TypeMode = datadict[datatype]["TypeMode"]
-        
-                statistics = DescriptiveStatistics(cellsize)
-                statistics.VariablesofInterest = [
-                    key for key in datadict["PointData"]["Arrays"] if not key in ignored_keys
-                ]
-                print(
-                f"statistics.VariablesofInterest={statistics.VariablesofInterest}",
-                    flush=True,
-                )
-                statistics.AttributeMode = AttributeMode
-                spreadSheetView = CreateView("SpreadSheetView")
-                descriptiveStatisticsDisplay = Show(
-                    statistics, spreadSheetView, "SpreadSheetRepresentation"
-                )
-                spreadSheetView.Update()
-                export = ExportView(
-                    f"total-descriptivestats-ttt.csv",
-                    view=spreadSheetView,
-                    RealNumberNotation="Scientific",
-                )
-                csv = pd.read_csv(f"total-descriptivestats-ttt.csv")
-                csv.rename(columns={"Block Name": "BlockName"}, inplace=True)
-                csv = csv[(csv.BlockName != "Derived Statistics")]
-                dropped_keys = [
-                    "BlockName",
-                    "Cardinality",
-                    "Kurtosis",
-                    "Skewness",
-                    "Sum",
-                    "Variance",
-                ]
-                csv.drop(columns=dropped_keys, inplace=True)
-                
-                # Compute Standard Deviation
-                csv['Standard Deviation'] = sqrt(abs(csv["Mean"]**2 - csv["M2"]))
-                    
-                # Add Name 
-                (nrows, ncols) = csv.shape
-                csv['Name'] = [name for i in range(nrows)]
-
-                # Reorder columns
-                csv = csv[
-                    [
-                        "Variable",
-                        "Name",
-                        "Minimum",
-                        "Mean",
-                        "Maximum",
-                        "Standard Deviation",
-                        "M2",
-                        "M3",
-                        "M4",
-                    ]
-                ]
-                print(f"total stats: key={list(csv.keys())}", flush=True)
-                print(
-                    tabulate(
-                        csv,
-                        headers="keys",
-                        tablefmt="psql", 
-                        showindex=False
-                    )
-                )
-                    
-                # convert data to requested units, 
-                # add units for Variable
-                # set values with appropriate units
-
-                # per blocks
-                for i, block in enumerate(blockdata.keys()):
-                    name = blockdata[block]["name"]
-                    print(f"block[{i}]: extract {block}, name={name}", flush=True)
-                    descriptiveStatisticsDisplay.BlockVisibilities = [block]
-                    spreadSheetView.Update()
-                    export = ExportView(
-                        f"{name}-descriptivestats-ttt.csv",
-                        view=spreadSheetView,
-                        RealNumberNotation="Scientific",
-                    )
-                    csv = pd.read_csv(f"{name}-descriptivestats-ttt.csv")
-                    csv.rename(columns={"Block Name": "BlockName"}, inplace=True)
-                    csv = csv[(csv.BlockName != "Derived Statistics")]
-                    dropped_keys = [
-                        "BlockName",
-                        "Cardinality",
-                        "Kurtosis",
-                        "Skewness",
-                        "Sum",
-                        "Variance",
-                    ]
-                    csv.drop(columns=dropped_keys, inplace=True)
-                    
-                    # Compute Standard Deviation
-                    csv['Standard Deviation'] = sqrt(abs(csv["Mean"]**2 - csv["M2"]))
-                    
-                    # Add Name 
-                    (nrows, ncols) = csv.shape
-                    csv['Name'] = [name for i in range(nrows)]
-
-                    # Reorder columns
-                    csv = csv[
-                        [
-                            "Variable",
-                            "Name",
-                            "Minimum",
-                            "Mean",
-                            "Maximum",
-                            "Standard Deviation",
-                            "M2",
-                            "M3",
-                            "M4",
-                        ]
-                    ]
-                    print(f"{name} stats: key={list(csv.keys())}", flush=True)
-                    print(
-                        tabulate(
-                            csv,
-                            headers="keys",
-                            tablefmt="psql", 
-                            showindex=False
-                        )
-                    )
-                
-                    # convert data to requested units, 
-                    # add units for Variable
-                    # set values with appropriate units
-
-                Delete(descriptiveStatisticsDisplay)
-                Delete(spreadSheetView)
-                del spreadSheetView
-                Delete(statistics)
-                del statistics
+        datadict = allInfo(store.info(), comm)
+        if verbose:
+            print(f"datadict={datadict}", flush=True)
 
-        # concat csv per datatype
-                
+        # per-block partials on shards of blocks in worker processes
+        pool = None
+        if jobs > 1 and comm is None:
+            pool = BlockPool(store, jobs, storedir)
 
-        exit(1)
-        """
+        # stats for all blocks in a single grouped pass
+        blockstats = resultBlockStats(
+            store, datadict, blockdata, fieldunits, ignored_keys, verbose, comm, pool
+        )
 
         print("Data ranges without Air:", flush=True)
-        extractBlock1 = ExtractBlock(registrationName="insert", Input=cellsize)
-        extractBlock1.Selectors = [
-            block for block in blockdata.keys() if not "Air" in block
-        ]
-        extractBlock1.UpdatePipeline()
-        Grandeurs = [blockdata[block][grandeur] for block in extractBlock1.Selectors]
-        mergeBlocks1 = MergeBlocks(registrationName="MergeBlocks1", Input=extractBlock1)
-        mergeBlocks1.UpdatePipeline()
-        statsdict = resultStats(
-            mergeBlocks1,
-            "insert",
-            dim,
-            sum(Grandeurs),
-            fieldunits,
-            ignored_keys,
-            ureg,
-            basedir,
-            histo=ComputeHisto,
-            BinCount=BinCount,
-            show=show,
-            verbose=verbose,
-        )
+        # insert stats are merged from the per-block partials (no MergeBlocks)
+        insertblocks = [block for block in blockdata.keys() if not "Air" in block]
+        statsdict = mergeBlockStats(blockstats, insertblocks, "insert", fieldunits)
+        if ComputeHisto:
+            # histograms for all blocks, each cell binned once per field
+            blockhistos = resultBlockHistos(
+                store,
+                datadict,
+                blockdata,
+                ignored_keys,
+                BinCount=BinCount,
+                verbose=verbose,
+                comm=comm,
+                pool=pool,
+            )
+            # kept for the colour ranges of the views (see ranges.RangeService)
+            for key in {key for histos in blockhistos.values() for key in histos}:
+                store.histograms[key] = [
+                    blockhistos[block].get(key) for block in store.blocks
+                ]
+        if pool is not None:
+            pool.close()
+
+        # results are written by rank 0 only
+        if not isRoot(comm):
+            barrier(comm)
+            return cellsize, blockdata, statsdict, store
+
+        if ComputeHisto:
+            # insert histograms are summed from the block histograms
+            Grandeurs = [blockdata[block][grandeur] for block in insertblocks]
+            plotHistos(
+                sumBlockHistos(blockhistos, insertblocks),
+                "insert",
+                fieldunits,
+                sum(Grandeurs),
+                basedir,
+                dim,
+                plot=PlotHisto,
+                show=show,
+                verbose=verbose,
+            )
+
         if verbose:
             print(f"insert statsdict={statsdict}", flush=True)
         stats.append(statsdict)
-        extractBlock1.UpdatePipeline()
-        Delete(extractBlock1)
-        del extractBlock1
-
-        # Force a garbage collection
-        collected = gc.collect()
-        if verbose:
-            print(f"Garbage collector: collected {collected} objects.", flush=True)
 
         # aggregate stats data
         createStatsTable([statsdict], "insert", fieldunits, basedir, ureg, verbose)
 
         if not ComputeStats:
-            return cellsize, blockdata, statsdict
+            barrier(comm)
+            return cellsize, blockdata, statsdict, store
 
         if len(blockdata.keys()) > 1:
             print("Data ranges per block:", flush=True)
             for i, block in enumerate(blockdata.keys()):
                 name = blockdata[block]["name"]
-                print(f"block[{i}]: extract {block}, name={name}", flush=True)
-                extractBlock1 = ExtractBlock(registrationName=name, Input=cellsize)
-                extractBlock1.Selectors = [block]
-                extractBlock1.UpdatePipeline()
-                statsdict = resultStats(
-                    extractBlock1,
-                    name,
-                    dim,
-                    blockdata[block][grandeur],
-                    fieldunits,
-                    ignored_keys,
-                    ureg,
-                    basedir,
-                    histo=ComputeHisto,
-                    BinCount=BinCount,
-                    show=show,
-                    verbose=verbose,
-                )
+                print(f"block[{i}]: {block}, name={name}", flush=True)
+                statsdict = blockstats[block]
                 stats.append(statsdict)
-                Delete(extractBlock1)
-                del extractBlock1
-
-                # Force a garbage collection
-                collected = gc.collect()
-                if verbose:
-                    print(
-                        f"Garbage collector: collected {collected} objects.", flush=True
+
+                if ComputeHisto:
+                    plotHistos(
+                        blockhistos[block],
+                        name,
+                        fieldunits,
+                        blockdata[block][grandeur],
+                        basedir,
+                        dim,
+                        plot=PlotHisto,
+                        show=show,
+                        verbose=verbose,
                     )
 
                 # aggregate stats data
                 createStatsTable([statsdict], name, fieldunits, basedir, ureg, verbose)
 
+            if ComputeHisto:
+                plotHistos(
+                    sumBlockHistos(blockhistos, list(blockdata.keys())),
+                    "total",
+                    fieldunits,
+                    tvol,
+                    basedir,
+                    dim,
+                    plot=PlotHisto,
+                    show=show,
+                    verbose=verbose,
+                )
+
             # aggregate stats data
             createStatsTable(stats, "total", fieldunits, basedir, ureg, verbose)
 
-    elif dataset.IsA("vtkUnstructuredGrid"):
+    elif not WriteStats:
+        barrier(comm)
+        return cellsize, blockdata, [], store
+
+    else:
         stats = []
 
         print("Data ranges:", flush=True)
-        datadict = resultinfo(cellsize, ignored_keys, verbose)
 
         statsdict = resultStats(
             cellsize,
@@ -589,8 +491,10 @@ def meshinfo(
             basedir,
             histo=ComputeHisto,
             BinCount=BinCount,
+            plotHisto=PlotHisto,
             show=show,
             verbose=verbose,
+            store=store,
         )
         if verbose:
             print(f"insert statsdict={statsdict}", flush=True)
@@ -600,4 +504,5 @@ def meshinfo(
         if ComputeStats:
             createStatsTable([statsdict], "insert", fieldunits, basedir, ureg, verbose)
 
-    return cellsize, blockdata, stats
+    barrier(comm)
+    return cellsize, blockdata, stats, store
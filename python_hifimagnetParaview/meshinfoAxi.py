@@ -7,7 +7,6 @@ from math import pi, sqrt
 from paraview.simple import (
     CellSize,
     ExtractBlock,
-    CellDatatoPointData,
     Calculator,
     MergeBlocks,
     Delete,
@@ -18,10 +17,19 @@ from paraview import servermanager as sm
 from paraview.vtk.numpy_interface import dataset_adapter as dsa
 from paraview.vtk.numpy_interface import algorithms as algs
 
-from .method import convert_data, info, resultinfo, momentN, integrateKeys, keyinfo
+from .method import (
+    convert_data,
+    info,
+    resultinfo,
+    momentN,
+    integrateKeys,
+    keyinfo,
+    fetchTable,
+    PointDataCache,
+)
 from .statsAxi import resultStats, createStatsTable
 from .histoAxi import resultHistos
-from .meshinfo import createVectorNorm
+from .meshinfo import createDerivedFields
 
 
 def part_integrate(
@@ -31,6 +39,7 @@ def part_integrate(
     basedir: str,
     merge: bool = True,
     verbose: bool = False,
+    pointdata: PointDataCache = None,
 ) -> pd.DataFrame:
     """compute integral over input
 
@@ -41,6 +50,8 @@ def part_integrate(
         basedir (str): result directory
         merge (bool, optional): merge selected blocks. Defaults to True.
         verbose (bool, optional): print verbose. Defaults to False.
+        pointdata (PointDataCache, optional): reuse the point data of input,
+            built and released here if None. Defaults to None.
 
     Returns:
         pd.DataFrame: integral dataframe
@@ -49,10 +60,8 @@ def part_integrate(
 
     # try to add Moment here
     # convert CellData to PointData
-    cellDatatoPointData = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
-    tmp = cellDatatoPointData
+    cache = pointdata if pointdata is not None else PointDataCache()
+    tmp = cache.get(input)
 
     if selected_blocks:
         extractBlock1 = ExtractBlock(registrationName="insert", Input=tmp)
@@ -116,8 +125,8 @@ def part_integrate(
             flush=True,
         )
 
-    Delete(cellDatatoPointData)
-    del cellDatatoPointData
+    if pointdata is None:
+        cache.release()
 
     # Force a garbage collection
     collected = gc.collect()
@@ -139,6 +148,7 @@ def part(
     basedir: str,
     ComputeHisto: bool,
     BinCount: int = 20,
+    PlotHisto: bool = True,
     show: bool = False,
     verbose: bool = False,
 ):
@@ -153,6 +163,7 @@ def part(
         basedir (str): result directory
         ComputeHisto (bool): compute histograms
         BinCount (int, optional): number of bins in histogram. Defaults to 20.
+        PlotHisto (bool, optional): render histogram plots. Defaults to True.
         show (bool, optional): show histogramms. Defaults to False.
         verbose (bool, optional): print verbose. Defaults to False.
 
@@ -217,6 +228,9 @@ def part(
     # if abs(1 - vol / tvol) > 1.0e-3:
     #     print(f"insert Total volume != vol(insert), tvol={tvol}, vol={vol}, error={abs(1-vol/tvol)*100} %",flush=True)
 
+    # one cell table shared by stats and histograms
+    table = fetchTable(np_dataset)
+
     statsdict = resultStats(
         calculator1,
         name,
@@ -227,6 +241,7 @@ def part(
         ureg,
         basedir,
         verbose=verbose,
+        table=table,
     )
     # print(f"insert statsdict: {statsdict}", flush=True)
     if ComputeHisto:
@@ -238,9 +253,12 @@ def part(
             ignored_keys,
             basedir,
             BinCount=BinCount,
+            plot=PlotHisto,
             show=show,
             verbose=verbose,
+            table=table,
         )
+    del table
 
     Delete(pointDatatoCellData)
     del pointDatatoCellData
@@ -253,53 +271,6 @@ def part(
     return vol, statsdict
 
 
-def cylField(input, key: str, nkey: str, AttributeType: str):
-    """compute r and theta component of a vector Field
-
-    vr = ux
-    vz = uy
-
-
-    ux: "thermo_electric.electric.current_density_X"
-
-    Args:
-        input: paraview reader
-        key (str): field name
-        nkey (str): _description_
-        AttributeType (str): 'Point Data'
-
-    Raises:
-        RuntimeError: cylField: key - unsupported AttributeType
-
-    Returns:
-        cylindric paraview reader
-    """
-
-    if AttributeType != "Point Data":
-        raise RuntimeError(
-            f"cylField: {key} - unsupported AttributeType: {AttributeType}"
-        )
-    # inputDataPoint = [field.Name for field in input.PointData]
-    # print(
-    #     f"cylField: input PointData = {inputDataPoint}",
-    #     flush=True,
-    # )
-
-    calculator2 = Calculator(Input=input)
-    calculator2.AttributeType = AttributeType  # 'Cell Data'
-    calculator2.ResultArrayName = f"{key}_r"
-    calculator2.Function = f'"{key}_X"'
-    calculator2.UpdatePipeline()
-
-    calculator3 = Calculator(Input=calculator2)
-    calculator3.AttributeType = AttributeType  # 'Cell Data'
-    calculator3.ResultArrayName = f"{key}_z"
-    calculator3.Function = f'"{key}_Y"'
-
-    calculator3.UpdatePipeline()
-    return calculator3
-
-
 def meshinfo(
     input,
     dim: int,
@@ -310,9 +281,11 @@ def meshinfo(
     ComputeStats: bool = True,
     ComputeHisto: bool = False,
     BinCount: int = 10,
+    PlotHisto: bool = True,
     show: bool = False,
     verbose: bool = False,
     printed: bool = True,
+    pointdata: PointDataCache = None,
 ) -> tuple:
     """display geometric info from input dataset
 
@@ -326,14 +299,18 @@ def meshinfo(
         ComputeStats (bool, optional): compute statistics. Defaults to True.
         ComputeHisto (bool, optional): compute histograms. Defaults to False.
         BinCount (int, optional): number of bins in histograms. Defaults to 10.
+        PlotHisto (bool, optional): render histogram plots. Defaults to True.
         show (bool, optional): show histograms. Defaults to False.
         verbose (bool, optional): print verbose. Defaults to False.
         printed (bool, optional): Defaults to True.
+        pointdata (PointDataCache, optional): point data shared with the
+            other stages (see method.PointDataCache). Defaults to None.
 
     Returns:
         cellsize: updated paraview reader
         blockdata (dict): dict of blocks data
         stats (dict): dict of statistics
+        store: None (no ResultStore in Axi, see statsAxi and histoAxi)
     """
 
     """
@@ -354,31 +331,26 @@ def meshinfo(
                 tmp, field.Name, field.Name, "Cell Data"
             )
     """
-    cellDatatoPointData1 = CellDatatoPointData(
-        registrationName="CellDatatoPointData", Input=input
-    )
+    # the point data of input is shared with part_integrate
+    cache = pointdata if pointdata is not None else PointDataCache()
+    cellDatatoPointData1 = cache.get(input)
 
     # for vector
     print("Add Norm for vectors and CylFields:", flush=True)
     calculator = cellDatatoPointData1
 
+    keys = []
     for field in cellDatatoPointData1.PointData:
         if (dim == 2 and field.GetNumberOfComponents() > 1) or (
             field.GetNumberOfComponents() == dim
         ):
             print(
-                f"create {field.Name}norm for {field.Name} PointData vector",
-                flush=True,
-            )
-            calculator = createVectorNorm(
-                calculator, field.Name, field.Name, "Point Data"
-            )
-
-            print(
-                f"create {field.Name}_r and {field.Name}_z for {field.Name} PointData vector",
+                f"create {field.Name}norm, {field.Name}_r and {field.Name}_z for {field.Name} PointData vector",
                 flush=True,
             )
-            calculator = cylField(calculator, field.Name, field.Name, "Point Data")
+            keys.append(field.Name)
+    if keys:
+        calculator = createDerivedFields(cellDatatoPointData1, keys, axi=True)
 
     # PointData to CellData
     pointDatatoCellData = PointDatatoCellData(
@@ -523,11 +495,18 @@ def meshinfo(
             basedir,
             ComputeHisto,
             BinCount,
+            PlotHisto,
         )
         stats.append(statsdict)
 
         icsv = part_integrate(
-            input, "insert", selected_blocks, basedir, merge=True, verbose=verbose
+            input,
+            "insert",
+            selected_blocks,
+            basedir,
+            merge=True,
+            verbose=verbose,
+            pointdata=cache,
         )
         if verbose:
             print(f'insert: vol={vol}, ivol={icsv["AxiVol"].to_list()[0] * 2 * pi}')
@@ -578,7 +557,7 @@ def meshinfo(
         createStatsTable([statsdict], "insert", fieldunits, basedir, verbose)
 
         if not ComputeStats:
-            return cellsize, blockdata, statsdict
+            return cellsize, blockdata, statsdict, None
 
         print("Data ranges per block:", flush=True)
         sum_vol = 0
@@ -599,12 +578,19 @@ def meshinfo(
                 basedir,
                 ComputeHisto,
                 BinCount,
+                PlotHisto,
             )
             stats.append(statsdict)
             sum_vol += vol
 
             icsv = part_integrate(
-                input, name, [block], basedir, merge=False, verbose=verbose
+                input,
+                name,
+                [block],
+                basedir,
+                merge=False,
+                verbose=verbose,
+                pointdata=cache,
             )
             if verbose:
                 print(
@@ -702,11 +688,18 @@ def meshinfo(
             basedir,
             ComputeHisto,
             BinCount,
+            PlotHisto,
         )
         stats.append(statsdict)
 
         icsv = part_integrate(
-            input, "insert", selected_blocks, basedir, merge=True, verbose=verbose
+            input,
+            "insert",
+            selected_blocks,
+            basedir,
+            merge=True,
+            verbose=verbose,
+            pointdata=cache,
         )
         if verbose:
             print(f'insert: vol={vol}, ivol={icsv["AxiVol"].to_list()[0] * 2 * pi}')
@@ -752,4 +745,4 @@ def meshinfo(
         if ComputeStats:
             createStatsTable([statsdict], "insert", fieldunits, basedir, verbose)
 
-    return input, blockdata, stats
+    return input, blockdata, stats, None
@@ -1,6 +1,7 @@
 import gc
 import os
 import re
+import numpy as np
 import pandas as pd
 
 from paraview.simple import (
@@ -13,11 +14,29 @@ from paraview.simple import (
     ExportView,
     Delete,
     ProbeLocation,
+    RedistributeDataSet,
     SaveData,
+    CellDatatoPointData,
 )
+from paraview import servermanager as sm
+from paraview.vtk.numpy_interface import dataset_adapter as dsa
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import (
+    vtkPolyData,
+    vtkStaticCellLocator,
+    vtkCellLocatorStrategy,
+)
+from vtkmodules.vtkFiltersCore import vtkProbeFilter
+from vtkmodules.util.numpy_support import numpy_to_vtk
 
 from pint import Quantity
 
+from .ensight import caseVariables, variableBytes
+from .store import ResultStore
+from .probe import mergeBlockProbes
+from .grid import CylindricalGrid, gridAxes, saveGrid, loadGrid
+from .parallel import isRoot
+
 # Ignore warning for pint
 import warnings
 
@@ -237,6 +256,475 @@ def getresultInfo(
     return datadict
 
 
+def fetchArray(np_dataset, datatype: str, key: str) -> np.ndarray:
+    """get key array from a wrapped dataset as a single numpy array
+
+    for a MultiBlock dataset the arrays of all blocks are concatenated
+
+    Args:
+        np_dataset: dataset wrapped with dsa.WrapDataObject
+        datatype (str): "PointData" or "CellData"
+        key (str): field name
+
+    Returns:
+        np.ndarray: array values (None if key is not defined)
+    """
+    data = getattr(np_dataset, datatype)[key]
+    if isinstance(data, dsa.VTKCompositeDataArray):
+        arrays = [np.asarray(array) for array in data.Arrays if array is not dsa.NoneArray]
+        if not arrays:
+            return None
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.concatenate(arrays)
+    if data is dsa.NoneArray:
+        return None
+    return np.asarray(data)
+
+
+def fetchTable(np_dataset, datatype: str = "PointData") -> pd.DataFrame:
+    """get coordinates and all arrays of a wrapped dataset as a columnar table
+
+    columns are named as in a SpreadSheetView export:
+    Points_0, Points_1, Points_2, scalars as key,
+    vectors as key_0, ..., key_{n-1} and key_Magnitude.
+    For a single block the columns are views on the VTK arrays (no copy).
+
+    Args:
+        np_dataset: dataset wrapped with dsa.WrapDataObject
+        datatype (str, optional): "PointData" or "CellData". Defaults to "PointData".
+
+    Returns:
+        pd.DataFrame: table with one row per point/cell
+    """
+    columns = {}
+    if datatype == "PointData":
+        points = np_dataset.Points
+        if isinstance(points, dsa.VTKCompositeDataArray):
+            arrays = [np.asarray(a) for a in points.Arrays if a is not dsa.NoneArray]
+            points = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+        points = np.asarray(points)
+        for i in range(points.shape[1]):
+            columns[f"Points_{i}"] = points[:, i]
+
+    for key in getattr(np_dataset, datatype).keys():
+        values = fetchArray(np_dataset, datatype, key)
+        if values is None:
+            continue
+        if values.ndim == 1 or values.shape[1] == 1:
+            columns[key] = values.reshape(-1)
+        else:
+            for i in range(values.shape[1]):
+                columns[f"{key}_{i}"] = values[:, i]
+            columns[f"{key}_Magnitude"] = np.linalg.norm(values, axis=1)
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def fetchStore(
+    np_dataset,
+    blocks: list[str],
+    names: list[str],
+    grandeur: str,
+    local: bool = False,
+) -> ResultStore:
+    """build a ResultStore from a wrapped dataset (eg. meshinfo cellsize)
+
+    arrays are views on the VTK arrays (no copy), the store keeps a
+    reference to the dataset
+
+    Args:
+        np_dataset: dataset wrapped with dsa.WrapDataObject, with grandeur
+            as CellData (see CellSize)
+        blocks (list[str]): block selectors, one per leaf
+        names (list[str]): block names
+        grandeur (str): cell measure (Area or Volume)
+        local (bool, optional): np_dataset is the local piece of a distributed
+            dataset, block measures are computed from the cells of the piece.
+            Defaults to False.
+
+    Raises:
+        RuntimeError: fetchStore: number of leaves != number of blocks
+
+    Returns:
+        ResultStore: columnar store, one block per leaf
+    """
+    leaves = datasetLeaves(np_dataset)
+    if len(leaves) != len(blocks):
+        raise RuntimeError(
+            f"fetchStore: {len(leaves)} leaves for {len(blocks)} blocks"
+        )
+
+    store = ResultStore(blocks, names, grandeur)
+    for i, leaf in enumerate(leaves):
+        if leaf is None:
+            continue
+        cells = leaf.VTKObject.GetCells()
+        total = None
+        if not local and leaf.FieldData[grandeur] is not dsa.NoneArray:
+            total = float(leaf.FieldData[grandeur][0])
+        store.setMesh(
+            i,
+            np.asarray(leaf.Points),
+            np.asarray(dsa.vtkDataArrayToVTKArray(cells.GetConnectivityArray())),
+            np.asarray(dsa.vtkDataArrayToVTKArray(cells.GetOffsetsArray())),
+            np.asarray(leaf.CellData[grandeur]),
+            total,
+        )
+
+    updateStore(store, np_dataset, leaves)
+
+    print(
+        f"fetchStore: blocks={len(blocks)}, memory={store.nbytes() / 1024**2:.1f} MB",
+        flush=True,
+    )
+    return store
+
+
+def datasetLeaves(np_dataset) -> list:
+    """leaves of a wrapped dataset
+
+    Args:
+        np_dataset: dataset wrapped with dsa.WrapDataObject
+
+    Returns:
+        list: wrapped leaves, None for empty leaves (eg. blocks absent from
+            the local piece)
+    """
+    dataset = np_dataset.VTKObject
+    if not dataset.IsA("vtkCompositeDataSet"):
+        return [np_dataset]
+
+    leaves = []
+    iterator = dataset.NewIterator()
+    iterator.SkipEmptyNodesOff()
+    iterator.InitTraversal()
+    while not iterator.IsDoneWithTraversal():
+        leaf = iterator.GetCurrentDataObject()
+        if leaf is not None and leaf.GetNumberOfCells():
+            leaf = dsa.WrapDataObject(leaf)
+        else:
+            leaf = None
+        leaves.append(leaf)
+        iterator.GoToNextItem()
+    return leaves
+
+
+def updateStore(store: ResultStore, np_dataset, leaves: list = None):
+    """replace the PointData/CellData arrays of a store (eg. for a new timestep)
+
+    the mesh and the cell measures of the store are kept, np_dataset must have
+    the same blocks
+
+    Args:
+        store (ResultStore): store to update
+        np_dataset: dataset wrapped with dsa.WrapDataObject
+        leaves (list, optional): leaves of np_dataset (see datasetLeaves).
+            Defaults to None.
+    """
+    if leaves is None:
+        leaves = datasetLeaves(np_dataset)
+
+    store.dataset = np_dataset
+    for datatype in ["PointData", "CellData"]:
+        for key in getattr(np_dataset, datatype).keys():
+            arrays = []
+            for leaf in leaves:
+                array = None
+                if leaf is not None:
+                    array = getattr(leaf, datatype)[key]
+                arrays.append(None if array is dsa.NoneArray else array)
+            store.add(
+                datatype,
+                key,
+                [None if array is None else np.asarray(array) for array in arrays],
+            )
+
+
+def fetchLocal(input, comm=None, time: float = None):
+    """get the output of a paraview source
+
+    Args:
+        input: paraview source
+        comm (MPI.Comm, optional): in a parallel run (see parallel.world),
+            return the piece of the current rank (no gather). Defaults to None.
+        time (float, optional): update the pipeline at this time first, the
+            output of the source itself is returned (no copy). Defaults to None.
+
+    Returns:
+        vtkDataObject: output dataset
+    """
+    if time is not None:
+        UpdatePipeline(time=time, proxy=input)
+    elif comm is None:
+        return sm.Fetch(input)
+    return input.GetClientSideObject().GetOutputDataObject(0)
+
+
+def redistribute(input):
+    """balance the cells of a paraview source over the MPI ranks
+
+    the pieces handed to the ranks by the EnSight reader follow the parts
+    of the case, so the per-rank work can be very uneven; cells are moved
+    between ranks (kd-tree partition, block hierarchy kept), each cell
+    belonging to a single rank. CellData statistics are unchanged, points on
+    the partition boundaries are counted on every rank sharing them
+
+    Args:
+        input: paraview source
+
+    Returns:
+        paraview source with the redistributed dataset
+    """
+    redistributed = RedistributeDataSet(Input=input)
+    redistributed.BoundaryMode = "Assign cells uniquely"
+    redistributed.UpdatePipeline()
+    return redistributed
+
+
+def blockLocators(dataset) -> list[tuple]:
+    """static cell locators of the blocks of a dataset
+
+    Args:
+        dataset (vtkDataObject): dataset (or MultiBlock), client side
+
+    Returns:
+        list[tuple]: (block, cell locator strategy) per non empty block
+    """
+    blocks = [leaf.VTKObject for leaf in datasetLeaves(dsa.WrapDataObject(dataset))]
+
+    locators = []
+    for block in blocks:
+        if block is None:
+            continue
+        locator = vtkStaticCellLocator()
+        locator.SetDataSet(block)
+        locator.BuildLocator()
+        strategy = vtkCellLocatorStrategy()
+        strategy.SetCellLocator(locator)
+        locators.append((block, strategy))
+    return locators
+
+
+def probePoints(dataset, points: np.ndarray, locators: list[tuple] = None) -> dict:
+    """PointData of dataset at a set of points
+
+    points outside the dataset get 0 (as PlotOverLine)
+
+    Args:
+        dataset (vtkDataObject): dataset (or MultiBlock) to probe, client side
+        points (np.ndarray): probed points, shape (npoints, 3)
+        locators (list[tuple], optional): cell locators of dataset (see
+            blockLocators), built here if None. Defaults to None.
+
+    Returns:
+        dict: {key: values at points}
+    """
+    if locators is None:
+        locators = blockLocators(dataset)
+
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    vtkpoints = vtkPoints()
+    vtkpoints.SetData(numpy_to_vtk(points, deep=True))
+    polydata = vtkPolyData()
+    polydata.SetPoints(vtkpoints)
+
+    probes = []
+    for block, strategy in locators:
+        probe = vtkProbeFilter()
+        probe.SetInputData(polydata)
+        probe.SetSourceData(block)
+        probe.SetFindCellStrategy(strategy)
+        probe.Update()
+
+        np_output = dsa.WrapDataObject(probe.GetOutput())
+        mask = probe.GetValidPointMaskArrayName()
+        arrays = {
+            key: np.asarray(np_output.PointData[key])
+            for key in np_output.PointData.keys()
+            if key != mask
+        }
+        probes.append((np.asarray(np_output.PointData[mask]), arrays))
+    return mergeBlockProbes(probes, len(points))
+
+
+class PointDataCache:
+    """CellData interpolated to points, built once per geometry
+
+    one CellDatatoPointData per input proxy (eg. original and deformed
+    geometries) shared by meshinfo, integrals and plots, and the cell
+    locators of the probed datasets (see probe), deleted by release
+    """
+
+    def __init__(self):
+        self.sources = {}
+        self.locators = {}
+        self.avoided = 0
+
+    def get(self, input):
+        """CellDatatoPointData of input, built on first use
+
+        Args:
+            input: paraview reader
+
+        Returns:
+            paraview CellDatatoPointData filter
+        """
+        key = input.GetGlobalIDAsString()
+        if key in self.sources:
+            self.avoided += 1
+            return self.sources[key]
+
+        source = CellDatatoPointData(
+            registrationName="CellDatatoPointData", Input=input
+        )
+        self.sources[key] = source
+        return source
+
+    def probe(self, input, points: np.ndarray) -> dict:
+        """PointData of input at a set of points
+
+        the output of input is fetched and its cell locators are built on
+        first use
+
+        Args:
+            input: paraview source (eg. get(input) for interpolated CellData)
+            points (np.ndarray): probed points, shape (npoints, 3)
+
+        Returns:
+            dict: {key: values at points} (see probePoints)
+        """
+        key = input.GetGlobalIDAsString()
+        if key not in self.locators:
+            dataset = fetchLocal(input)
+            self.locators[key] = (dataset, blockLocators(dataset))
+            print(
+                f"PointDataCache: {len(self.locators[key][1])} cell locators built",
+                flush=True,
+            )
+        (dataset, locators) = self.locators[key]
+        return probePoints(dataset, points, locators)
+
+    def release(self, input=None):
+        """delete the conversion and the cell locators of a geometry
+
+        Args:
+            input (optional): paraview reader, all geometries if None.
+                Defaults to None.
+        """
+        keys = list(self.sources)
+        if input is not None:
+            keys = [key for key in keys if key == input.GetGlobalIDAsString()]
+            self.locators.pop(input.GetGlobalIDAsString(), None)
+        else:
+            self.locators = {}
+        if keys:
+            print(
+                f"PointDataCache: release {len(keys)} conversions ({self.avoided} avoided)",
+                flush=True,
+            )
+        for key in reversed(keys):
+            source = self.sources.pop(key)
+            self.locators.pop(source.GetGlobalIDAsString(), None)
+            Delete(source)
+        if not self.sources:
+            self.avoided = 0
+        gc.collect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def sampleLines(
+    input, lines, pointdata: PointDataCache = None, grid: CylindricalGrid = None
+) -> dict:
+    """sample PointData (CellData interpolated to points) along all lines
+
+    the point data is fetched once and probed once for the points of every
+    line (see probe.ProbeLines), with the cell locators of pointdata
+
+    Args:
+        input: paraview reader
+        lines (ProbeLines): lines to sample
+        pointdata (PointDataCache, optional): reuse the point data and the
+            cell locators of input, built and released here if None.
+            Defaults to None.
+        grid (CylindricalGrid, optional): sample the resampled point data of
+            input instead of the mesh (see resampleGrid). Defaults to None.
+
+    Returns:
+        dict: {line name: {key: values}}, with "arc_length"
+    """
+    if not lines.lines:
+        return {}
+    print(f"sampleLines: {len(lines.lines)} lines", flush=True)
+    if grid is not None:
+        return lines.sample(grid.probe)
+
+    cache = pointdata if pointdata is not None else PointDataCache()
+    source = cache.get(input)
+    samples = lines.sample(lambda points: cache.probe(source, points))
+
+    if pointdata is None:
+        cache.release()
+    return samples
+
+
+def resampleGrid(
+    input,
+    kind: str,
+    resolution: list[int],
+    pointdata: PointDataCache = None,
+    cachefile: str = None,
+    verbose: bool = False,
+) -> CylindricalGrid:
+    """resample PointData (CellData interpolated to points) on a cylindrical grid
+
+    Args:
+        input: paraview reader
+        kind (str): geometry (3D, 2D or Axi), see grid.AXES
+        resolution (list[int]): number of segments per axis (see grid.gridAxes)
+        pointdata (PointDataCache, optional): reuse the point data and the
+            cell locators of input, built and released here if None.
+            Defaults to None.
+        cachefile (str, optional): grid cache (see grid.gridPath), loaded if
+            it exists, saved otherwise. Defaults to None.
+        verbose (bool, optional): print verbose. Defaults to False.
+
+    Returns:
+        CylindricalGrid: resampled point data
+    """
+    if cachefile and os.path.isfile(cachefile):
+        print(f"Load cached grid: {cachefile}", flush=True)
+        return loadGrid(cachefile)
+
+    grid = CylindricalGrid(kind, gridAxes(kind, getbounds(input), resolution))
+    print(f"resampleGrid: {kind} grid {dict(zip(grid.axes, grid.shape, strict=True))}", flush=True)
+    cache = pointdata if pointdata is not None else PointDataCache()
+    grid.fill(cache.probe(cache.get(input), grid.points()))
+    if pointdata is None:
+        cache.release()
+
+    if cachefile:
+        saveGrid(grid, cachefile, verbose)
+    return grid
+
+
+def timesteps(input) -> list[float]:
+    """time values of a reader
+
+    Args:
+        input: paraview reader
+
+    Returns:
+        list[float]: time values (empty for a static dataset)
+    """
+    return [float(t) for t in getattr(input, "TimestepValues", None) or []]
+
+
 def keyinfo(key: str) -> tuple:
     """Extracts toolbox, physic, and fieldname from a key string.
 
@@ -280,11 +768,13 @@ def getbounds(input):
     return bounds
 
 
-def load(file: str, printed: bool = True):
+def load(file: str, arrays: list[str] = None, printed: bool = True):
     """create dataset from file
 
     Args:
         file (str): file name
+        arrays (list[str], optional): restrict loading to these arrays
+            (all arrays if None). Defaults to None.
         printed (bool, optional): Defaults to True.
 
     Returns:
@@ -293,6 +783,25 @@ def load(file: str, printed: bool = True):
 
     print(f"Load Ensight case: {file}", flush=True)
     input = OpenDataFile(file)
+
+    # restrict arrays before the first UpdatePipeline
+    if arrays is not None:
+        skipped = []
+        for prop in ["PointArrays", "CellArrays"]:
+            if prop in input.ListProperties():
+                available = list(input.GetProperty(prop).Available)
+                input.SetPropertyWithName(
+                    prop, [name for name in available if name in arrays]
+                )
+                skipped += [name for name in available if name not in arrays]
+        print(f"Load arrays: {arrays}, skipped: {skipped}", flush=True)
+        if file.endswith(".case"):
+            variables = caseVariables(file)
+            saved = variableBytes(
+                variables, [name for name in skipped if name in variables]
+            )
+            print(f"Load: memory saved ~ {saved / 1024**2:.1f} MB", flush=True)
+
     UpdatePipeline()
 
     if not printed:
@@ -302,6 +811,7 @@ def load(file: str, printed: bool = True):
 
     return input
 
+
 def torque(input, key: str, AttributeType: str):
     """compute torque
 
@@ -500,7 +1010,15 @@ def getcurrent(current: str, marker: str = None) -> str:
     return current
 
 
-def getB0(reader, fieldtype: dict, basedir: str, dim: int, axis: bool = False) -> float:
+def getB0(
+    reader,
+    fieldtype: dict,
+    basedir: str,
+    dim: int,
+    axis: bool = False,
+    comm=None,
+    pointdata: PointDataCache = None,
+) -> float:
     """get B0 for comments
 
     Args:
@@ -509,6 +1027,11 @@ def getB0(reader, fieldtype: dict, basedir: str, dim: int, axis: bool = False) -
         basedir (str): result directory
         dim (int): geometry dimmension
         axis (bool, optional): True if geometry is axis. Defaults to False.
+        comm (MPI.Comm, optional): parallel run, the probe is written and
+            read by rank 0 only (see parallel.broadcast). Defaults to None.
+        pointdata (PointDataCache, optional): reuse the cell locators of
+            reader in a serial run, built and released here if None.
+            Defaults to None.
 
     Returns:
         float: B0
@@ -521,6 +1044,20 @@ def getB0(reader, fieldtype: dict, basedir: str, dim: int, axis: bool = False) -
 
     if not B0:
         return None
+
+    # component along the magnet axis (y in 2D and Axi) at the origin
+    component = 1 if axis or dim == 2 else 2
+    if comm is None:
+        cache = pointdata if pointdata is not None else PointDataCache()
+        values = cache.probe(reader, np.zeros((1, 3)))
+        if pointdata is None:
+            cache.release()
+        for key, value in values.items():
+            (toolbox, physic, fieldname) = keyinfo(key)
+            if B0 == fieldname and value.ndim == 2 and value.shape[1] > component:
+                return round(abs(float(value[-1, component])), 1)
+        return None
+
     # create a new 'Probe Location'
     probeLocation = ProbeLocation(
         registrationName="ProbeLocation",
@@ -555,18 +1092,13 @@ def getB0(reader, fieldtype: dict, basedir: str, dim: int, axis: bool = False) -
             savedkey = key
             break
 
-    if savedkey is None:
+    if savedkey is None or not isRoot(comm):
         return None
 
     try:
         df = pd.read_csv(f"{basedir}/insert-B0.csv")
 
-        if axis:
-            B0 = abs(df[f"{savedkey}:1"].iloc[-1])
-        elif dim == 2:
-            B0 = abs(df[f"{savedkey}:1"].iloc[-1])
-        elif dim == 3:
-            B0 = abs(df[f"{savedkey}:2"].iloc[-1])
+        B0 = abs(df[f"{savedkey}:{component}"].iloc[-1])
 
         os.remove(f"{basedir}/insert-B0.csv")
         return round(B0, 1)
@@ -0,0 +1,255 @@
+"""Weighted histograms computed with NumPy
+
+Histograms share a global, field-wide bin layout so that the histogram of
+a union of blocks (eg. insert or total) is the sum of the block histograms.
+Each cell is binned once per field, weighted by its measure (Area, Volume
+or 2*pi*r*Area in Axi). Plotting is done separately (see histo, histoAxi).
+This module does not depend on ParaView.
+"""
+
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+
+def binEdges(minimum: float, maximum: float, BinCount: int) -> np.ndarray:
+    """bin edges with bins centered around min and max
+
+    same layout as ParaView Histogram with CenterBinsAroundMinAndMax
+
+    Args:
+        minimum (float): field minimum
+        maximum (float): field maximum
+        BinCount (int): number of bins
+
+    Returns:
+        np.ndarray: BinCount+1 bin edges
+    """
+    if BinCount < 2 or maximum <= minimum:
+        return np.linspace(minimum - 0.5, maximum + 0.5, max(BinCount, 1) + 1)
+    width = (maximum - minimum) / (BinCount - 1)
+    return np.linspace(minimum - width / 2, maximum + width / 2, BinCount + 1)
+
+
+def uniformEdges(minimum: float, maximum: float, BinCount: int) -> np.ndarray:
+    """bin edges with BinCount equal bins spanning [min, max]
+
+    same layout as matplotlib hist / np.histogram
+
+    Args:
+        minimum (float): field minimum
+        maximum (float): field maximum
+        BinCount (int): number of bins
+
+    Returns:
+        np.ndarray: BinCount+1 bin edges
+    """
+    if maximum <= minimum:
+        return np.linspace(minimum - 0.5, maximum + 0.5, BinCount + 1)
+    return np.linspace(minimum, maximum, BinCount + 1)
+
+
+def binIndex(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """bin index of each value, out of range values go to the first/last bin
+
+    Args:
+        values (np.ndarray): 1D array
+        edges (np.ndarray): bin edges
+
+    Returns:
+        np.ndarray: bin index of each value
+    """
+    index = np.searchsorted(edges, values, side="right") - 1
+    return np.clip(index, 0, len(edges) - 2)
+
+
+class Histogram:
+    """mergeable weighted histogram on a fixed bin layout
+
+    Args:
+        edges (np.ndarray): bin edges
+        weights (np.ndarray): sum of weights (eg. cell Volume) per bin
+        count (int): number of values
+        minimum (float): minimum value
+        maximum (float): maximum value
+    """
+
+    def __init__(
+        self,
+        edges: np.ndarray,
+        weights: np.ndarray,
+        count: int,
+        minimum: float,
+        maximum: float,
+    ):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.count = int(count)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+
+    def centers(self) -> np.ndarray:
+        """bin centers"""
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    def total(self) -> float:
+        """sum of weights"""
+        return float(self.weights.sum())
+
+    def merge(self, other):
+        """sum two histograms
+
+        Args:
+            other (Histogram): histogram with the same bin layout
+
+        Raises:
+            RuntimeError: Histogram.merge: bin layout mismatch
+
+        Returns:
+            Histogram: histogram of the union
+        """
+        if other is None:
+            return self
+        if not np.array_equal(self.edges, other.edges):
+            raise RuntimeError("Histogram.merge: bin layout mismatch")
+        return Histogram(
+            self.edges,
+            self.weights + other.weights,
+            self.count + other.count,
+            min(self.minimum, other.minimum),
+            max(self.maximum, other.maximum),
+        )
+
+    def table(self, grandeur: str) -> pd.DataFrame:
+        """histogram table (same columns as ParaView Histogram csv export)
+
+        Args:
+            grandeur (str): weight name (eg. Area or Volume)
+
+        Returns:
+            pd.DataFrame: bin_extents and {grandeur}_total columns
+        """
+        return pd.DataFrame(
+            {"bin_extents": self.centers(), f"{grandeur}_total": self.weights}
+        )
+
+
+def mergeHistograms(histograms: list):
+    """sum a list of histograms, None items are skipped
+
+    Args:
+        histograms (list): list of Histogram (or None)
+
+    Returns:
+        Histogram: histogram of the union (None if the list has no histogram)
+    """
+    histograms = [h for h in histograms if h is not None]
+    if not histograms:
+        return None
+    return reduce(lambda a, b: a.merge(b), histograms)
+
+
+def groupedHistograms(
+    values: np.ndarray,
+    groups: np.ndarray,
+    ngroups: int,
+    edges: np.ndarray,
+    weights: np.ndarray,
+) -> list:
+    """weighted histogram of each group in a single bincount
+
+    Args:
+        values (np.ndarray): 1D array of values
+        groups (np.ndarray): group index (eg. block index) of each value
+        ngroups (int): number of groups
+        edges (np.ndarray): bin edges (shared by all groups)
+        weights (np.ndarray): weight of each value (eg. cell Volume)
+
+    Returns:
+        list: for each group a Histogram (None if the group has no value)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    nbins = len(edges) - 1
+
+    flat = groups * nbins + binIndex(values, edges)
+    hweights = np.bincount(flat, weights=weights, minlength=ngroups * nbins)
+    hweights = hweights.reshape(ngroups, nbins)
+    counts = np.bincount(groups, minlength=ngroups)
+
+    minimum = np.full(ngroups, np.inf)
+    maximum = np.full(ngroups, -np.inf)
+    np.minimum.at(minimum, groups, values)
+    np.maximum.at(maximum, groups, values)
+
+    return [
+        Histogram(edges, hweights[i], counts[i], minimum[i], maximum[i])
+        if counts[i]
+        else None
+        for i in range(ngroups)
+    ]
+
+
+def weightedHistograms(columns: dict, measure: np.ndarray, edges: dict) -> dict:
+    """weighted histograms of all fields of a block in a single bincount
+
+    Args:
+        columns (dict): {key: 1D array}, all of same length as measure
+        measure (np.ndarray): cell measure used as weight
+        edges (dict): {key: bin edges}
+
+    Returns:
+        dict: {key: Histogram}
+    """
+    keys = list(columns.keys())
+    if not keys:
+        return {}
+    measure = np.asarray(measure, dtype=np.float64)
+
+    offsets = np.cumsum([0] + [len(edges[key]) - 1 for key in keys])
+    values = {key: np.asarray(columns[key], dtype=np.float64) for key in keys}
+    flat = np.concatenate(
+        [offsets[i] + binIndex(values[key], edges[key]) for i, key in enumerate(keys)]
+    )
+    hweights = np.bincount(
+        flat, weights=np.tile(measure, len(keys)), minlength=offsets[-1]
+    )
+
+    histograms = {}
+    for i, key in enumerate(keys):
+        histograms[key] = Histogram(
+            edges[key],
+            hweights[offsets[i] : offsets[i + 1]],
+            len(values[key]),
+            values[key].min(),
+            values[key].max(),
+        )
+    return histograms
+
+
+def coverageHistograms(fields: dict, BinCount: int) -> dict:
+    """weighted histograms of fields defined on different sets of blocks
+
+    fields defined on the same blocks share their cell measure and are
+    binned in a single bincount
+
+    Args:
+        fields (dict): {key: (values, groups, measure)} as returned by
+            ResultStore.groupedCellArray (values are scalars)
+        BinCount (int): number of bins
+
+    Returns:
+        dict: {key: Histogram}, in the order of fields
+    """
+    bycoverage = {}
+    for key, (values, groups, measure) in fields.items():
+        coverage = tuple(np.unique(groups))
+        columns, edges, _ = bycoverage.setdefault(coverage, ({}, {}, measure))
+        columns[key] = values
+        edges[key] = binEdges(values.min(), values.max(), BinCount)
+
+    histograms = {}
+    for columns, edges, measure in bycoverage.values():
+        histograms.update(weightedHistograms(columns, measure, edges))
+    return {key: histograms[key] for key in fields}
@@ -0,0 +1,379 @@
+"""Descriptive statistics computed with NumPy
+
+Replaces the DescriptiveStatistics -> SpreadSheetView -> CSV round trip:
+the arrays are fetched once from ParaView and all statistics are computed
+in memory. This module does not depend on ParaView.
+"""
+
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+STATS_COLUMNS = [
+    "Variable",
+    "Minimum",
+    "Maximum",
+    "Mean",
+    "M2",
+    "M3",
+    "M4",
+    "Standard Deviation",
+    "Name",
+]
+
+
+def arrayColumns(key: str, values: np.ndarray) -> dict:
+    """split an array into columns named as in ParaView DescriptiveStatistics
+
+    scalar arrays give a single column `key`,
+    vector arrays give `key_0`, ..., `key_{n-1}` and `key_Magnitude`
+
+    Args:
+        key (str): field name
+        values (np.ndarray): array of shape (n,) or (n, components)
+
+    Returns:
+        dict: {column name: 1D array}
+    """
+    values = np.asarray(values)
+    if values.ndim == 1 or (values.ndim == 2 and values.shape[1] == 1):
+        return {key: values.reshape(-1)}
+
+    columns = {}
+    for i in range(values.shape[1]):
+        columns[f"{key}_{i}"] = values[:, i]
+    columns[f"{key}_Magnitude"] = np.linalg.norm(values, axis=1)
+    return columns
+
+
+class Moments:
+    """mergeable accumulator of descriptive statistics
+
+    holds, for each variable, count, weight (sum of weights), min, max, mean
+    and the sums of centered powers M2, M3, M4.
+    Two accumulators are combined exactly with the pairwise update
+    of Chan et al. generalized to order 4 by Pébay, so that the statistics
+    of a union of blocks are obtained from the per-block partials.
+
+    Args:
+        variables (list[str]): variable names
+        count (int): number of values
+        weight (float): sum of weights (equals count when unweighted)
+        minimum, maximum, mean, M2, M3, M4 (np.ndarray): one value per variable
+    """
+
+    def __init__(
+        self,
+        variables: list[str],
+        count: int,
+        weight: float,
+        minimum: np.ndarray,
+        maximum: np.ndarray,
+        mean: np.ndarray,
+        M2: np.ndarray,
+        M3: np.ndarray,
+        M4: np.ndarray,
+    ):
+        self.variables = list(variables)
+        self.count = int(count)
+        self.weight = float(weight)
+        self.minimum = np.asarray(minimum, dtype=np.float64)
+        self.maximum = np.asarray(maximum, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.M2 = np.asarray(M2, dtype=np.float64)
+        self.M3 = np.asarray(M3, dtype=np.float64)
+        self.M4 = np.asarray(M4, dtype=np.float64)
+
+    @classmethod
+    def fromColumns(cls, columns: dict, weights: np.ndarray = None):
+        """compute the moments of columns in one vectorized pass
+
+        Args:
+            columns (dict): {variable name: 1D array}, all of same length
+            weights (np.ndarray, optional): weight of each value. Defaults to None.
+
+        Returns:
+            Moments: accumulator (None if there is no value)
+        """
+        variables = list(columns.keys())
+        if not variables:
+            return None
+        data = np.column_stack(
+            [np.asarray(columns[v], dtype=np.float64) for v in variables]
+        )
+        count = data.shape[0]
+        if count == 0:
+            return None
+
+        if weights is None:
+            weight = float(count)
+            mean = data.mean(axis=0)
+            centered = data - mean
+            squared = centered * centered
+            M2 = squared.sum(axis=0)
+            M3 = (squared * centered).sum(axis=0)
+            M4 = (squared * squared).sum(axis=0)
+        else:
+            w = np.asarray(weights, dtype=np.float64)[:, None]
+            weight = float(w.sum())
+            mean = (w * data).sum(axis=0) / weight
+            centered = data - mean
+            squared = centered * centered
+            M2 = (w * squared).sum(axis=0)
+            M3 = (w * squared * centered).sum(axis=0)
+            M4 = (w * squared * squared).sum(axis=0)
+
+        return cls(
+            variables,
+            count,
+            weight,
+            data.min(axis=0),
+            data.max(axis=0),
+            mean,
+            M2,
+            M3,
+            M4,
+        )
+
+    def merge(self, other):
+        """combine two accumulators (Chan/Pébay pairwise update)
+
+        Args:
+            other (Moments): accumulator on the same variables
+
+        Raises:
+            RuntimeError: Moments.merge: variables mismatch
+
+        Returns:
+            Moments: accumulator of the union
+        """
+        if other is None:
+            return self
+        if other.variables != self.variables:
+            raise RuntimeError(
+                f"Moments.merge: variables mismatch {self.variables} != {other.variables}"
+            )
+
+        na = self.weight
+        nb = other.weight
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+
+        mean = self.mean + nb * delta_n
+        M2 = self.M2 + other.M2 + delta * delta_n * na * nb
+        M3 = (
+            self.M3
+            + other.M3
+            + delta * delta_n * delta_n * na * nb * (na - nb)
+            + 3.0 * delta_n * (na * other.M2 - nb * self.M2)
+        )
+        M4 = (
+            self.M4
+            + other.M4
+            + delta * delta_n**3 * na * nb * (na * na - na * nb + nb * nb)
+            + 6.0 * delta_n**2 * (na * na * other.M2 + nb * nb * self.M2)
+            + 4.0 * delta_n * (na * other.M3 - nb * self.M3)
+        )
+
+        return Moments(
+            self.variables,
+            self.count + other.count,
+            n,
+            np.minimum(self.minimum, other.minimum),
+            np.maximum(self.maximum, other.maximum),
+            mean,
+            M2,
+            M3,
+            M4,
+        )
+
+    def stats(self, name: str) -> pd.DataFrame:
+        """descriptive statistics table
+
+        Standard Deviation is the sample estimate sqrt(M2/(n-1))
+
+        Args:
+            name (str): block name
+
+        Returns:
+            pd.DataFrame: one row per variable with columns
+                Variable, Minimum, Maximum, Mean, M2, M3, M4, Standard Deviation, Name
+        """
+        std = np.zeros_like(self.M2)
+        if self.weight > 1:
+            std = np.sqrt(self.M2 / (self.weight - 1))
+
+        return pd.DataFrame(
+            {
+                "Variable": self.variables,
+                "Minimum": self.minimum,
+                "Maximum": self.maximum,
+                "Mean": self.mean,
+                "M2": self.M2,
+                "M3": self.M3,
+                "M4": self.M4,
+                "Standard Deviation": std,
+                "Name": [name] * len(self.variables),
+            }
+        )
+
+
+def mergeMoments(moments: list):
+    """combine a list of accumulators, None items are skipped
+
+    Args:
+        moments (list): list of Moments (or None)
+
+    Returns:
+        Moments: accumulator of the union (None if the list has no accumulator)
+    """
+    moments = [m for m in moments if m is not None]
+    if not moments:
+        return None
+    return reduce(lambda a, b: a.merge(b), moments)
+
+
+def descriptiveStats(columns: dict, name: str) -> pd.DataFrame:
+    """compute descriptive statistics for each column in one vectorized pass
+
+    M2, M3, M4 are the sums of centered powers (as in vtkDescriptiveStatistics),
+    Standard Deviation is the sample estimate sqrt(M2/(n-1))
+
+    Args:
+        columns (dict): {variable name: 1D array}, all of same length
+        name (str): block name
+
+    Returns:
+        pd.DataFrame: one row per variable with columns
+            Variable, Minimum, Maximum, Mean, M2, M3, M4, Standard Deviation, Name
+    """
+    moments = Moments.fromColumns(columns)
+    if moments is None:
+        return pd.DataFrame(columns=STATS_COLUMNS)
+    return moments.stats(name)
+
+
+def keysStats(arrays: dict, name: str) -> dict:
+    """compute descriptive statistics of several fields in a single pass
+
+    the columns of all fields are reduced together, fields with a different
+    number of values (eg. not defined on every block) go in separate passes
+
+    Args:
+        arrays (dict): {field name: array of shape (n,) or (n, components)}
+        name (str): block name
+
+    Returns:
+        dict: {field name: pd.DataFrame as returned by descriptiveStats}
+    """
+    bylength = {}
+    for key, values in arrays.items():
+        bylength.setdefault(len(values), {})[key] = arrayColumns(key, values)
+
+    results = {}
+    for keycolumns in bylength.values():
+        columns = {}
+        for kcolumns in keycolumns.values():
+            columns.update(kcolumns)
+        stats = descriptiveStats(columns, name)
+        for key, kcolumns in keycolumns.items():
+            results[key] = stats[stats["Variable"].isin(list(kcolumns))].reset_index(
+                drop=True
+            )
+    return results
+
+
+def groupedMoments(
+    columns: dict, groups: np.ndarray, ngroups: int, weights: np.ndarray = None
+) -> list:
+    """compute moments per group in a single grouped reduction
+
+    the values are sorted once by group, then all reductions are done with
+    `reduceat` so that the cost grows with the number of values, not with
+    values x groups
+
+    Args:
+        columns (dict): {variable name: 1D array}, all of same length
+        groups (np.ndarray): group index (eg. block index) of each value
+        ngroups (int): number of groups
+        weights (np.ndarray, optional): weight of each value. Defaults to None.
+
+    Returns:
+        list: for each group a Moments accumulator (None if the group has no value)
+    """
+    variables = list(columns.keys())
+    results = [None] * ngroups
+    if not variables:
+        return results
+
+    groups = np.asarray(groups, dtype=np.int64)
+    data = np.column_stack([np.asarray(columns[v], dtype=np.float64) for v in variables])
+    w = None
+    if weights is not None:
+        w = np.asarray(weights, dtype=np.float64)
+    if np.any(groups[1:] < groups[:-1]):
+        order = np.argsort(groups, kind="stable")
+        groups = groups[order]
+        data = data[order]
+        if w is not None:
+            w = w[order]
+
+    counts = np.bincount(groups, minlength=ngroups)
+    nonempty = np.flatnonzero(counts)
+    if nonempty.size == 0:
+        return results
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[nonempty]
+    n = counts[nonempty]
+
+    if w is None:
+        W = n.astype(np.float64)
+        mean = np.add.reduceat(data, starts, axis=0) / W[:, None]
+        centered = data - np.repeat(mean, n, axis=0)
+        squared = centered * centered
+        M2 = np.add.reduceat(squared, starts, axis=0)
+        M3 = np.add.reduceat(squared * centered, starts, axis=0)
+        M4 = np.add.reduceat(squared * squared, starts, axis=0)
+    else:
+        W = np.add.reduceat(w, starts)
+        mean = np.add.reduceat(w[:, None] * data, starts, axis=0) / W[:, None]
+        centered = data - np.repeat(mean, n, axis=0)
+        squared = centered * centered
+        M2 = np.add.reduceat(w[:, None] * squared, starts, axis=0)
+        M3 = np.add.reduceat(w[:, None] * squared * centered, starts, axis=0)
+        M4 = np.add.reduceat(w[:, None] * squared * squared, starts, axis=0)
+    minimum = np.minimum.reduceat(data, starts, axis=0)
+    maximum = np.maximum.reduceat(data, starts, axis=0)
+
+    for j, i in enumerate(nonempty):
+        results[i] = Moments(
+            variables,
+            n[j],
+            W[j],
+            minimum[j],
+            maximum[j],
+            mean[j],
+            M2[j],
+            M3[j],
+            M4[j],
+        )
+    return results
+
+
+def groupedStats(columns: dict, groups: np.ndarray, names: list[str]) -> list:
+    """compute descriptive statistics per group in a single grouped reduction
+
+    Args:
+        columns (dict): {variable name: 1D array}, all of same length
+        groups (np.ndarray): group index (eg. block index) of each value
+        names (list[str]): group names, names[i] is the name of group i
+
+    Returns:
+        list: for each group a pd.DataFrame as returned by descriptiveStats
+            (None if the group has no value)
+    """
+    moments = groupedMoments(columns, groups, len(names))
+    return [
+        m.stats(name) if m is not None else None for m, name in zip(moments, names, strict=True)
+    ]
@@ -0,0 +1,206 @@
+"""MPI helpers for runs under `mpiexec pvbatch --symmetric`
+
+Each rank works on its local piece of the dataset. Per-block partials
+(npstats.Moments, nphisto.Histogram) are exchanged with mpi4py and merged,
+so that every rank ends up with the same statistics. Files are written by
+rank 0 only. mpi4py is optional: without it (or on a single rank) every
+helper falls back to the serial behaviour.
+This module does not depend on ParaView.
+"""
+
+import numpy as np
+
+from .nphisto import mergeHistograms
+from .npstats import mergeMoments
+
+try:
+    from mpi4py import MPI
+except ImportError:
+    MPI = None
+
+
+def world():
+    """MPI communicator of the run
+
+    Returns:
+        MPI.Comm: COMM_WORLD, None for a serial run (or without mpi4py)
+    """
+    if MPI is None or MPI.COMM_WORLD.Get_size() < 2:
+        return None
+    return MPI.COMM_WORLD
+
+
+def isRoot(comm=None) -> bool:
+    """check if the current rank writes the results
+
+    Args:
+        comm (MPI.Comm, optional): communicator. Defaults to None.
+
+    Returns:
+        bool: True for rank 0 or a serial run
+    """
+    return comm is None or comm.Get_rank() == 0
+
+
+def barrier(comm=None):
+    """wait for all ranks
+
+    Args:
+        comm (MPI.Comm, optional): communicator. Defaults to None.
+    """
+    if comm is not None:
+        comm.Barrier()
+
+
+def broadcast(value, comm=None):
+    """value of rank 0 on all ranks
+
+    Args:
+        value: any picklable value
+        comm (MPI.Comm, optional): communicator. Defaults to None.
+
+    Returns:
+        value of rank 0
+    """
+    if comm is None:
+        return value
+    return comm.bcast(value, root=0)
+
+
+def allSum(values, comm=None) -> np.ndarray:
+    """element-wise sum over all ranks
+
+    Args:
+        values: float or array
+        comm (MPI.Comm, optional): communicator. Defaults to None.
+
+    Returns:
+        np.ndarray: sum
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if comm is None:
+        return values
+    total = np.zeros_like(values)
+    comm.Allreduce(values, total, op=MPI.SUM)
+    return total
+
+
+def allRange(lower: float, upper: float, comm=None) -> tuple:
+    """global range from the ranges of all ranks
+
+    a rank without values passes (inf, -inf)
+
+    Args:
+        lower (float): local minimum
+        upper (float): local maximum
+        comm (MPI.Comm, optional): communicator. Defaults to None.
+
+    Returns:
+        tuple: (min, max)
+    """
+    if comm is None:
+        return (lower, upper)
+    return (comm.allreduce(lower, op=MPI.MIN), comm.allreduce(upper, op=MPI.MAX))
+
+
+def mergeGathered(gathered: list, merge) -> list:
+    """merge per-block partials gathered from all ranks
+
+    Args:
+        gathered (list): for each rank, a list of partials per block (or None)
+        merge: function merging a list of partials (eg. npstats.mergeMoments)
+
+    Returns:
+        list: merged partial per block (None if no rank has values)
+    """
+    return [merge(list(partials)) for partials in zip(*gathered, strict=True)]
+
+
+def allMergeMoments(perblock: list, comm=None) -> list:
+    """merge per-block Moments over all ranks
+
+    Args:
+        perblock (list): local Moments (or None) per block
+        comm (MPI.Comm, optional): communicator. Defaults to None.
+
+    Returns:
+        list: global Moments (or None) per block
+    """
+    if comm is None:
+        return perblock
+    return mergeGathered(comm.allgather(perblock), mergeMoments)
+
+
+def allMergeHistograms(perblock: list, comm=None) -> list:
+    """sum per-block Histograms over all ranks
+
+    Args:
+        perblock (list): local Histogram (or None) per block, same bin layout
+        comm (MPI.Comm, optional): communicator. Defaults to None.
+
+    Returns:
+        list: global Histogram (or None) per block
+    """
+    if comm is None:
+        return perblock
+    return mergeGathered(comm.allgather(perblock), mergeHistograms)
+
+
+def mergeInfo(infos: list) -> dict:
+    """merge ResultStore.info dicts of the local pieces
+
+    a key missing on a rank (eg. no block of its piece defines it)
+    is merged from the ranks that have it
+
+    Args:
+        infos (list): info dict of each rank
+
+    Returns:
+        dict: info dict with global bounds
+    """
+    datadict = {}
+    for info in infos:
+        for datatype, ddata in info.items():
+            if datatype not in datadict:
+                datadict[datatype] = {**ddata, "Arrays": {}}
+            arrays = datadict[datatype]["Arrays"]
+            for key, kdata in ddata["Arrays"].items():
+                arrays.setdefault(key, []).append(kdata)
+
+    for ddata in datadict.values():
+        for key, items in ddata["Arrays"].items():
+            nbounds = max(len(item["Bounds"]) for item in items)
+            bounds = []
+            for i in range(nbounds):
+                ranges = [
+                    item["Bounds"][i]
+                    for item in items
+                    if i < len(item["Bounds"]) and item["Bounds"][i] is not None
+                ]
+                if not ranges:
+                    bounds.append(None)
+                    continue
+                bounds.append(
+                    (min(r[0] for r in ranges), max(r[1] for r in ranges))
+                )
+            ddata["Arrays"][key] = {
+                **items[0],
+                "Components": max(item["Components"] for item in items),
+                "Bounds": bounds,
+            }
+    return datadict
+
+
+def allInfo(datadict: dict, comm=None) -> dict:
+    """info dict with global bounds, identical on all ranks
+
+    Args:
+        datadict (dict): info of the local piece (see ResultStore.info)
+        comm (MPI.Comm, optional): communicator. Defaults to None.
+
+    Returns:
+        dict: info dict
+    """
+    if comm is None:
+        return datadict
+    return mergeInfo(comm.allgather(datadict))
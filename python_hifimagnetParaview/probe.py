@@ -0,0 +1,220 @@
+"""Batched sampling of plot lines
+
+All the lines of the Or/Oz plots (every r x theta x z combination) and the
+circles of the Otheta plots (every r x z) are gathered in a ProbeLines and
+sampled together: their points are probed in a single pass (see
+method.sampleLines), the values of each line are then NumPy slices of the
+probed arrays. No intermediate csv file is written. Lines are sampled like
+PlotOverLine (resolution+1 evenly spaced points from Point1 to Point2),
+circles are sampled analytically at evenly spaced angles (no clip, slice
+or intersection curve).
+The blocks are probed one by one with static cell locators built once per
+geometry (see method.PointDataCache), their values are merged by
+mergeBlockProbes.
+This module does not depend on ParaView.
+"""
+
+import numpy as np
+
+# PlotOverLine default resolution
+RESOLUTION = 1000
+
+# angular resolution of the circles (0.5 deg)
+THETA_RESOLUTION = 720
+
+# mask of the sampled points found in a block (as vtkProbeFilter)
+VALID = "vtkValidPointMask"
+
+# coordinates of the sampled points (not fields)
+COORDINATES = ["arc_length", "theta", VALID]
+
+
+def linePoints(point1: list[float], point2: list[float], resolution: int = RESOLUTION) -> np.ndarray:
+    """evenly spaced points of a line
+
+    Args:
+        point1 (list[float]): first point
+        point2 (list[float]): last point
+        resolution (int, optional): number of segments. Defaults to RESOLUTION.
+
+    Returns:
+        np.ndarray: points, shape (resolution+1, 3)
+    """
+    t = np.linspace(0.0, 1.0, resolution + 1)[:, None]
+    point1 = np.asarray(point1, dtype=np.float64)
+    point2 = np.asarray(point2, dtype=np.float64)
+    return point1 + t * (point2 - point1)
+
+
+def circlePoints(r: float, z: float, resolution: int = THETA_RESOLUTION) -> tuple:
+    """evenly spaced points of a circle of axis Oz
+
+    Args:
+        r (float): radius
+        z (float): z coordinate of the circle
+        resolution (int, optional): number of angular segments.
+            Defaults to THETA_RESOLUTION.
+
+    Returns:
+        tuple: theta in degree from -180 to 180, points of shape (resolution+1, 3)
+    """
+    theta = np.linspace(-180.0, 180.0, resolution + 1)
+    radian = theta * np.pi / 180.0
+    points = np.stack(
+        [r * np.cos(radian), r * np.sin(radian), np.full(len(theta), z)], axis=1
+    )
+    return (theta, points)
+
+
+class ProbeLines:
+    """lines and circles to sample in a single probe
+
+    Args:
+        resolution (int, optional): number of segments per line.
+            Defaults to RESOLUTION.
+    """
+
+    def __init__(self, resolution: int = RESOLUTION):
+        self.resolution = resolution
+        self.lines = {}
+        self.coordinates = {}
+
+    def add(self, name: str, point1: list[float], point2: list[float]):
+        """add a line
+
+        Args:
+            name (str): line name
+            point1 (list[float]): first point
+            point2 (list[float]): last point
+        """
+        length = np.linalg.norm(np.subtract(point2, point1))
+        self.lines[name] = linePoints(point1, point2, self.resolution)
+        self.coordinates[name] = {
+            "arc_length": np.linspace(0.0, length, self.resolution + 1)
+        }
+
+    def addCircle(self, name: str, r: float, z: float, resolution: int = THETA_RESOLUTION):
+        """add a circle of axis Oz
+
+        Args:
+            name (str): circle name
+            r (float): radius
+            z (float): z coordinate of the circle
+            resolution (int, optional): number of angular segments.
+                Defaults to THETA_RESOLUTION.
+        """
+        (theta, points) = circlePoints(r, z, resolution)
+        self.lines[name] = points
+        self.coordinates[name] = {
+            "arc_length": r * (theta - theta[0]) * np.pi / 180.0,
+            "theta": theta,
+        }
+
+    def points(self) -> np.ndarray:
+        """points of all lines, in insertion order
+
+        Returns:
+            np.ndarray: shape (npoints, 3)
+        """
+        if not self.lines:
+            return np.zeros((0, 3))
+        return np.concatenate(list(self.lines.values()))
+
+    def arcLength(self, name: str) -> np.ndarray:
+        """distance of the points of a line to its first point
+
+        Args:
+            name (str): line name
+
+        Returns:
+            np.ndarray: arc length (same as PlotOverLine arc_length)
+        """
+        return self.coordinates[name]["arc_length"]
+
+    def split(self, arrays: dict) -> dict:
+        """values of each line from the values of all points
+
+        Args:
+            arrays (dict): {key: values of all points (see points)}
+
+        Returns:
+            dict: {line name: {key: values}}, with "arc_length" (and "theta"
+                for circles)
+        """
+        samples = {}
+        start = 0
+        for name, points in self.lines.items():
+            end = start + len(points)
+            line = dict(self.coordinates[name])
+            for key, values in arrays.items():
+                line[key] = values[start:end]
+            samples[name] = line
+            start = end
+        return samples
+
+    def sample(self, probe) -> dict:
+        """sample all lines in a single probe
+
+        Args:
+            probe: function returning {key: values} for an array of points
+                (eg. method.probePoints)
+
+        Returns:
+            dict: {line name: {key: values}} (see split)
+        """
+        if not self.lines:
+            return {}
+        return self.split(probe(self.points()))
+
+
+def lineFields(samples: dict, ignored_keys: list[str], argsfield: str = None) -> dict:
+    """sampled fields of a line to plot
+
+    Args:
+        samples (dict): {key: values} of a line (see ProbeLines.sample)
+        ignored_keys (list[str]): list of ignored fields
+        argsfield (str, optional): selected field to display. Defaults to None.
+
+    Returns:
+        dict: {field: number of components}
+    """
+    return {
+        field: 1 if values.ndim == 1 else values.shape[1]
+        for field, values in samples.items()
+        if field not in COORDINATES
+        and field not in ignored_keys
+        and (not argsfield or field.startswith(argsfield))
+    }
+
+
+
+def mergeBlockProbes(probes: list[tuple], npoints: int) -> dict:
+    """values at points from the probes of each block
+
+    as vtkCompositeDataProbeFilter: a point takes the values of the first
+    block containing it, points outside all blocks get 0, arrays missing
+    from a block are dropped
+
+    Args:
+        probes (list[tuple]): (valid point mask, {key: values}) per block
+        npoints (int): number of probed points
+
+    Returns:
+        dict: {key: values at points}, with the merged VALID mask
+    """
+    if not probes:
+        return {}
+    common = set.intersection(*[set(arrays) for _, arrays in probes])
+    keys = [key for key in probes[0][1] if key in common]
+
+    values = {}
+    filled = np.zeros(npoints, dtype=bool)
+    for valid, arrays in probes:
+        found = np.asarray(valid, dtype=bool) & ~filled
+        for key in keys:
+            if key not in values:
+                values[key] = np.zeros_like(np.asarray(arrays[key]))
+            values[key][found] = np.asarray(arrays[key])[found]
+        filled |= found
+    values[VALID] = filled.astype(np.int8)
+    return values
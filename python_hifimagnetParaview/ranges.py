@@ -0,0 +1,122 @@
+"""Colour ranges of the views from the ResultStore
+
+The range of a field over a set of blocks is the union of the cached
+per-block ranges of the store. A trimmed range (`--customRangeHisto`)
+drops the extreme bins of the merged block histograms whose weight is below
+a fraction of the total; the block histograms computed by meshinfo are
+reused, missing ones are computed once per field. Original and deformed
+geometries share the same ranges. The views only take the trimmed range
+from here, other ranges follow the displayed clip or slice.
+This module does not depend on ParaView.
+"""
+
+import numpy as np
+
+from .nphisto import binEdges, groupedHistograms, mergeHistograms
+from .parallel import allMergeHistograms, allRange
+
+# bins holding less than 0.1% of the total area/volume are trimmed
+TRIM = 1.0e-3
+
+
+def trimmedRange(histogram, trim: float = TRIM) -> tuple:
+    """range of a histogram without the extreme bins below trim
+
+    Args:
+        histogram (Histogram): weighted histogram
+        trim (float, optional): fraction of the total weight. Defaults to TRIM.
+
+    Returns:
+        tuple: centers of the first and last kept bins, None if empty
+    """
+    if histogram is None or histogram.total() <= 0:
+        return None
+    kept = np.nonzero(histogram.weights / histogram.total() >= trim)[0]
+    if len(kept) == 0:
+        return None
+    centers = histogram.centers()
+    return (float(centers[kept[0]]), float(centers[kept[-1]]))
+
+
+class RangeService:
+    """colour ranges of fields over sets of blocks
+
+    Args:
+        store (ResultStore): arrays per block (see method.fetchStore),
+            store.histograms holds the block histograms of meshinfo
+        BinCount (int, optional): number of bins of the missing histograms.
+            Defaults to 20.
+        comm (MPI.Comm, optional): ranges and histograms over all ranks
+            (see parallel), every rank must ask for the same ranges.
+            Defaults to None.
+    """
+
+    def __init__(self, store, BinCount: int = 20, comm=None):
+        self.store = store
+        self.BinCount = BinCount
+        self.comm = comm
+        self._ranges = {}
+
+    def blockHistograms(self, key: str) -> list:
+        """histograms of a field per block, computed on first use
+
+        Args:
+            key (str): field name
+
+        Returns:
+            list: Histogram (or None) per block of the store
+        """
+        store = self.store
+        if key not in store.histograms:
+            values, groups, weights = store.groupedCellArray(key, magnitude=True)
+            (lower, upper) = (np.inf, -np.inf)
+            if values is not None:
+                (lower, upper) = (values.min(), values.max())
+            (lower, upper) = allRange(lower, upper, self.comm)
+
+            perblock = [None] * len(store.blocks)
+            if values is not None:
+                edges = binEdges(lower, upper, self.BinCount)
+                perblock = groupedHistograms(
+                    values, groups, len(store.blocks), edges, weights
+                )
+            store.histograms[key] = allMergeHistograms(perblock, self.comm)
+        return store.histograms[key]
+
+    def range(self, key: str, blocks: list[str] = None, trim: float = None) -> tuple:
+        """range of a field over a set of blocks (magnitude for vectors)
+
+        Args:
+            key (str): field name
+            blocks (list[str], optional): block selectors, all blocks if None,
+                blocks missing from the store are ignored. Defaults to None.
+            trim (float, optional): trim the extreme bins holding less than
+                this fraction of the total weight (see trimmedRange).
+                Defaults to None.
+
+        Returns:
+            tuple: (min, max), None if the field is not stored
+        """
+        cachekey = (key, None if blocks is None else tuple(blocks), trim)
+        if cachekey in self._ranges:
+            return self._ranges[cachekey]
+
+        datatype = self.store.datatype(key)
+        if datatype is None:
+            return None
+        if blocks is not None:
+            blocks = [block for block in blocks if block in self.store.blocks]
+
+        if trim is None:
+            (lower, upper) = self.store.range(datatype, key, blocks) or (np.inf, -np.inf)
+            (lower, upper) = allRange(lower, upper, self.comm)
+            result = (lower, upper) if lower <= upper else None
+        else:
+            perblock = self.blockHistograms(key)
+            histogram = mergeHistograms(
+                [perblock[i] for i in self.store.index(blocks)]
+            )
+            result = trimmedRange(histogram, trim)
+
+        self._ranges[cachekey] = result
+        return result
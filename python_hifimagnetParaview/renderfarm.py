@@ -0,0 +1,185 @@
+"""Off-screen rendering of the views in worker processes (`--renderJobs N`)
+
+The views are split into jobs (geometry, view kind, parameter, fields).
+Each worker is a pvbatch process running the cli on the same case with
+`--viewShard k/N` and the cache key of the parent run (`--cacheKey`): it
+loads the derived dataset cached by the parent (see cache) and renders
+every N-th job under the usual `views/` names. Within a job the
+render view is reused for all fields (see view.ViewSession).
+This module does not depend on ParaView.
+"""
+
+import math
+import shutil
+import subprocess
+import sys
+import time
+
+# cli options of the parent run that workers must not repeat: {option: number of values}
+PARENT_OPTIONS = {
+    "--stats": 0,
+    "--histos": 0,
+    "--plots": 0,
+    "--channels": 0,
+    "--timesteps": 0,
+    "--clearCache": 0,
+    "--jobs": 1,
+    "--renderJobs": 1,
+    "--cacheKey": 1,
+}
+
+
+def farmJobs(
+    geometries: list[str], kinds: list[tuple], fields: list[str], workers: int
+) -> list[tuple]:
+    """split the views into jobs
+
+    fields are split into chunks when there are fewer views than workers
+
+    Args:
+        geometries (list[str]): geometry suffixes (eg. ["", "-deformed_factor1"])
+        kinds (list[tuple]): (kind, parameter) of the views (see display3D.viewKinds)
+        fields (list[str]): fields to display
+        workers (int): number of workers
+
+    Returns:
+        list[tuple]: (geometry, kind, parameter, fields) jobs
+    """
+    views = [(geometry, kind) for geometry in geometries for kind in kinds]
+    nchunks = 1
+    if views and fields:
+        nchunks = min(len(fields), max(1, math.ceil(workers / len(views))))
+    size = math.ceil(len(fields) / nchunks) if fields else 0
+
+    jobs = []
+    for geometry, (kind, param) in views:
+        for i in range(nchunks):
+            chunk = tuple(fields[i * size : (i + 1) * size])
+            if chunk:
+                jobs.append((geometry, kind, param, chunk))
+    return jobs
+
+
+def shardJobs(jobs: list[tuple], shard: int, nshards: int) -> list[tuple]:
+    """jobs of a worker
+
+    Args:
+        jobs (list[tuple]): all jobs (see farmJobs)
+        shard (int): worker index
+        nshards (int): number of workers
+
+    Returns:
+        list[tuple]: every nshards-th job starting at shard
+    """
+    return jobs[shard::nshards]
+
+
+def parseShard(value: str) -> tuple:
+    """parse a `k/N` worker index
+
+    Args:
+        value (str): eg. "0/4"
+
+    Raises:
+        ValueError: parseShard: expect k/N with 0 <= k < N
+
+    Returns:
+        tuple: (k, N)
+    """
+    (shard, nshards) = [int(item) for item in value.split("/")]
+    if not 0 <= shard < nshards:
+        raise ValueError(f"parseShard: expect k/N with 0 <= k < N, got {value}")
+    return (shard, nshards)
+
+
+def workerArgs(
+    argv: list[str], shard: int, nshards: int, B0: float = None, key: str = None
+) -> list[str]:
+    """cli arguments of a worker from the arguments of the parent run
+
+    stats, histograms, plots, stl exports and the cache cleanup are left
+    to the parent, the cache key is not recomputed from the reduced
+    arguments (the loaded arrays may differ, see cli.selectArrays)
+
+    Args:
+        argv (list[str]): cli arguments of the parent run
+        shard (int): worker index
+        nshards (int): number of workers
+        B0 (float, optional): magnetic field computed by the parent. Defaults to None.
+        key (str, optional): cache key of the parent run. Defaults to None.
+
+    Returns:
+        list[str]: cli arguments
+    """
+    args = []
+    skip = 0
+    for item in argv:
+        if skip:
+            skip -= 1
+            continue
+        name = item.split("=")[0]
+        if name in PARENT_OPTIONS:
+            if "=" not in item:
+                skip = PARENT_OPTIONS[name]
+            continue
+        args.append(item)
+    if B0 and "--B0" not in args:
+        args += ["--B0", str(B0)]
+    if key:
+        args += ["--cacheKey", key]
+    return args + ["--viewShard", f"{shard}/{nshards}"]
+
+
+def workerCommand(executable: str = None) -> list[str]:
+    """command running the cli in an off-screen ParaView interpreter
+
+    Args:
+        executable (str, optional): interpreter, pvbatch (or the current
+            interpreter if pvbatch is not found) if None. Defaults to None.
+
+    Returns:
+        list[str]: command prefix
+    """
+    if executable is None:
+        executable = shutil.which("pvbatch") or sys.executable
+    return [executable, "-m", "python_hifimagnetParaview.cli"]
+
+
+def runFarm(
+    command: list[str],
+    argv: list[str],
+    nshards: int,
+    images: int,
+    B0: float = None,
+    key: str = None,
+) -> list[int]:
+    """run the workers and report the throughput
+
+    Args:
+        command (list[str]): command prefix (see workerCommand)
+        argv (list[str]): cli arguments of the parent run
+        nshards (int): number of workers
+        images (int): number of images to render
+        B0 (float, optional): magnetic field computed by the parent. Defaults to None.
+        key (str, optional): cache key of the parent run. Defaults to None.
+
+    Returns:
+        list[int]: return code of each worker
+    """
+    start = time.perf_counter()
+    workers = [
+        subprocess.Popen(command + workerArgs(argv, shard, nshards, B0, key))
+        for shard in range(nshards)
+    ]
+    codes = [worker.wait() for worker in workers]
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"renderFarm: {images} images in {elapsed:.1f}s with {nshards} workers "
+        f"({images / elapsed:.2f} images/s)",
+        flush=True,
+    )
+    for shard, code in enumerate(codes):
+        if code:
+            print(f"renderFarm: worker {shard}/{nshards} failed (code {code})", flush=True)
+    return codes
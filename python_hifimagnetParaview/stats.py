@@ -1,62 +1,33 @@
 import pandas as pd
+import numpy as np
 import os
 
 from tabulate import tabulate
 
-from paraview.simple import (
-    DescriptiveStatistics,
-    Delete,
-    ExportView,
-    CreateView,
-    Show,
+from paraview import servermanager as sm
+from paraview.vtk.numpy_interface import dataset_adapter as dsa
+
+from .method import (
+    convert_data,
+    resultinfo,
+    keyinfo,
+    fetchArray,
+    fetchLocal,
+    updateStore,
+    selectBlocks,
 )
-
-from .method import convert_data, resultinfo, keyinfo
-from .histo import getresultHisto
-
-
-def createTable(file: str, key: str, name: str, verbose: bool = False):
-    """create statistics table
-
-    Args:
-        file (str): csv file name
-        key (str): field name
-        name (str): block name
-        verbose (bool, optional): print verbose. Defaults to False.
-
-    Returns:
-        _stat
-    """
-    csv = pd.read_csv(file)
-    keys = csv.columns.values.tolist()
-    if verbose:
-        print(f"createTable: file={file}, key={key}", flush=True)
-    # print(tabulate(csv, headers="keys", tablefmt="psql"))
-
-    # drop following keys
-    csv.rename(columns={"Block Name": "BlockName"}, inplace=True)
-    dropped_keys = ["Row ID", "Cardinality", "Kurtosis", "Skewness", "Sum", "Variance"]
-    csv.drop(columns=dropped_keys, inplace=True)
-
-    # print("createTable: post-process stats table", flush=True)
-    # print(tabulate(csv, headers="keys", tablefmt="psql"))
-
-    # for each row "Derived Stats" copy value to "Primary Statistics"
-    primary = csv.query("BlockName == 'Primary Statistics'").dropna(axis="columns")
-    # print(tabulate(primary, headers="keys", tablefmt="psql"))
-    primary.drop(columns=["BlockName"], inplace=True)
-    # print("primary:", tabulate(primary, headers="keys", tablefmt="psql"))
-    derived = csv.query("BlockName == 'Derived Statistics'").dropna(axis="columns")
-    derived.reset_index(drop=True, inplace=True)
-    # print("derived:", tabulate(derived, headers="keys", tablefmt="psql"))
-    derived.drop(columns=["BlockName"], inplace=True)
-    stats_ = primary.join(derived)
-    # print(tabulate(stats_, headers="keys", tablefmt="psql"))
-
-    (nrows, ncols) = stats_.shape
-    stats_["Name"] = [name for i in range(nrows)]
-    # print("join:\n", tabulate(stats_, headers="keys", tablefmt="psql"))
-    return stats_
+from .histo import resultHistos
+from .npstats import arrayColumns, groupedMoments, keysStats, mergeMoments
+from .nphisto import binEdges, groupedHistograms, mergeHistograms
+from .parallel import allMergeMoments, allMergeHistograms, allRange, isRoot
+from .jobs import (
+    shardMoments,
+    shardRanges,
+    shardHistograms,
+    mergeShards,
+    mergeRanges,
+)
+from .timeseries import stepMoments, stepRows, appendRows
 
 
 def createStatsTable(
@@ -255,85 +226,6 @@ def createStatsTable(
     return total_df
 
 
-def getresultStats(
-    input,
-    name: str,
-    key: str,
-    AttributeMode: str,
-    basedir: str,
-    printed: bool = True,
-    verbose: bool = False,
-) -> str:
-    """compute stats for key
-
-    Args:
-        input (_type_): paraview reader
-        name (str): block name
-        key (str): field name
-        AttributeMode (str): "Point Data" or "Cell Data" or "Field Data"
-        basedir (str): result directory
-        printed (bool, optional): Defaults to True.
-        verbose (bool, optional): print verbose. Defaults to False.
-
-    Returns:
-        str: csv file name
-    """ """
-    
-    """
-    os.makedirs(f"{basedir}/stats", exist_ok=True)
-
-    if verbose:
-        print(
-            f"getresultStats: name={name}, key={key}, AttributeMode={AttributeMode}",
-            flush=True,
-        )
-
-    # if field is a vector, create a field for its norm
-
-    # statistics
-    statistics = DescriptiveStatistics(input)
-    # get params list
-    if not printed:
-        for prop in statistics.ListProperties():
-            print(
-                f"DescriptiveStatistics: {prop}={statistics.GetPropertyValue(prop)}",
-                flush=True,
-            )
-    statistics.VariablesofInterest = [key]
-    statistics.AttributeMode = AttributeMode
-    # statistics.UpdatePipeline()
-    # stats_info = statistics.GetDataInformation()
-    # SetActiveSource(statistics)
-
-    spreadSheetView = CreateView("SpreadSheetView")
-    descriptiveStatisticsDisplay = Show(
-        statistics, spreadSheetView, "SpreadSheetRepresentation"
-    )
-    spreadSheetView.Update()
-
-    filename = f"{basedir}/stats/{name}-{key}-descriptivestats.csv"
-    export = ExportView(
-        filename,
-        view=spreadSheetView,
-        RealNumberNotation="Scientific",
-    )
-
-    # if not printed:
-    #     # get params list
-    #     for prop in export.ListProperties():
-    #         print(f'ExportView: {prop}={export.GetPropertyValue(prop)}', flush=True)
-
-    Delete(descriptiveStatisticsDisplay)
-    Delete(spreadSheetView)
-    del spreadSheetView
-    Delete(statistics)
-    del statistics
-
-    csv = createTable(filename, key, name, verbose)
-
-    return csv
-
-
 def resultStats(
     input,
     name: str,
@@ -345,8 +237,10 @@ def resultStats(
     basedir: str,
     histo: bool = False,
     BinCount: int = 10,
+    plotHisto: bool = True,
     show: bool = False,
     verbose: bool = False,
+    store=None,
 ) -> dict:
     """compute stats for PointData, CellData and FieldData
 
@@ -361,20 +255,31 @@ def resultStats(
         basedir (str): result directory
         histo (bool, optional): compute histograms. Defaults to False.
         BinCount (int, optional): number of bins in histograms. Defaults to 10.
+        plotHisto (bool, optional): render histogram plots. Defaults to True.
         show (bool, optional): show histograms. Defaults to False.
         verbose (bool, optional): print verbose. Defaults to False.
+        store (ResultStore, optional): arrays of input (see method.fetchStore),
+            fetched from input if None. Defaults to None.
 
     Returns:
         dict: statistics dict
     """
-    datadict = resultinfo(input, ignored_keys, verbose)
+    if store is None:
+        datadict = resultinfo(input, ignored_keys, verbose)
+        # fetch arrays once, stats are computed in memory with numpy
+        np_dataset = dsa.WrapDataObject(sm.Fetch(input))
+    else:
+        datadict = store.info()
     if verbose:
         print(f"resultStats[{name}]: datadict={datadict}", flush=True)
 
+    histokeys = {}
+
     for datatype in datadict:
         if datatype != "FieldData":
             AttributeMode = datadict[datatype]["AttributeMode"]
-            TypeMode = datadict[datatype]["TypeMode"]
+            # arrays of all keys, stats are computed in a single pass
+            arrays = {}
             for key, kdata in datadict[datatype]["Arrays"].items():
                 if not key in ignored_keys:
 
@@ -391,34 +296,398 @@ def resultStats(
                     if not found:
                         Components = kdata["Components"]
                         bounds = kdata["Bounds"]
-                        if bounds[0][0] != bounds[0][1]:
-                            if not "Stats" in kdata:
-                                # print(f"\t{key}: create kdata[Stats]", flush=True)
-                                kdata["Stats"] = {}
-
-                            kdata["Stats"] = getresultStats(
-                                input,
-                                name,
-                                key,
-                                AttributeMode,
-                                basedir,
-                                verbose=verbose,
-                            )
+                        if bounds[0] is not None and bounds[0][0] != bounds[0][1]:
+                            if store is None:
+                                values = fetchArray(np_dataset, datatype, key)
+                            else:
+                                values = store.array(datatype, key)
+                            if values is None:
+                                continue
+                            arrays[key] = values
+                            if verbose:
+                                print(
+                                    f"resultStats[{name}]: key={key}, AttributeMode={AttributeMode}",
+                                    flush=True,
+                                )
 
                             if histo:
-                                getresultHisto(
-                                    input,
-                                    name,
-                                    dim,
-                                    AreaorVolume,
-                                    fieldunits,
-                                    key,
-                                    TypeMode,
-                                    basedir,
-                                    Components,
-                                    BinCount=BinCount,
-                                    show=show,
-                                    verbose=verbose,
-                                )
+                                histokeys[key] = Components
+
+            for key, stats in keysStats(arrays, name).items():
+                datadict[datatype]["Arrays"][key]["Stats"] = stats
+
+    if histo and histokeys:
+        resultHistos(
+            input,
+            name,
+            dim,
+            AreaorVolume,
+            fieldunits,
+            histokeys,
+            basedir,
+            BinCount=BinCount,
+            plot=plotHisto,
+            show=show,
+            verbose=verbose,
+            store=store,
+        )
+
     # display stats
     return datadict
+
+
+def momentsStats(
+    key: str, Components: int, moments, name: str, fieldunits: dict
+) -> dict:
+    """build a statsdict array entry from a Moments accumulator
+
+    Stats is only set when the block is not excluded for this field
+    and the field is not constant on the block
+
+    Args:
+        key (str): field name
+        Components (int): number of components
+        moments (Moments): accumulator for key on the block
+        name (str): block name
+        fieldunits (dict): dict of field units
+
+    Returns:
+        dict: {"Components", "Bounds", "Moments"[, "Stats"]}
+    """
+    (toolbox, physic, fieldname) = keyinfo(key)
+    variable = key
+    if Components > 1:
+        variable = f"{key}_Magnitude"
+    index = moments.variables.index(variable)
+    bounds = (moments.minimum[index], moments.maximum[index])
+
+    entry = {
+        "Components": Components,
+        "Bounds": [bounds],
+        "Moments": moments,
+    }
+
+    for excluded in fieldunits[fieldname]["Exclude"]:
+        if excluded in name:
+            return entry
+
+    # skip constant field on block
+    if bounds[0] != bounds[1]:
+        entry["Stats"] = moments.stats(name)
+    return entry
+
+
+def mergeBlockStats(
+    blockstats: dict, blocks: list[str], name: str, fieldunits: dict
+) -> dict:
+    """compute stats of a union of blocks from the per-block partials
+
+    Args:
+        blockstats (dict): statistics dict for each block from resultBlockStats
+        blocks (list[str]): selected blocks
+        name (str): name of the union (eg. "insert")
+        fieldunits (dict): dict of field units
+
+    Returns:
+        dict: statistics dict (same layout as resultStats)
+    """
+    statsdict = {}
+    for block in blocks:
+        for datatype, ddata in blockstats[block].items():
+            if datatype not in statsdict:
+                statsdict[datatype] = {
+                    "TypeMode": ddata["TypeMode"],
+                    "AttributeMode": ddata["AttributeMode"],
+                    "Arrays": {},
+                }
+            for key, kdata in ddata["Arrays"].items():
+                arrays = statsdict[datatype]["Arrays"]
+                if key not in arrays:
+                    arrays[key] = {"Components": kdata["Components"], "Moments": []}
+                arrays[key]["Moments"].append(kdata["Moments"])
+
+    for datatype in statsdict:
+        arrays = statsdict[datatype]["Arrays"]
+        for key in arrays:
+            moments = mergeMoments(arrays[key]["Moments"])
+            arrays[key] = momentsStats(
+                key, arrays[key]["Components"], moments, name, fieldunits
+            )
+
+    return statsdict
+
+
+def blockFields(datadict: dict, ignored_keys: list[str]) -> list[tuple]:
+    """fields with a non constant global range
+
+    Args:
+        datadict (dict): info dictionnary from ResultStore.info
+        ignored_keys (list[str]): list of ignored fields
+
+    Returns:
+        list[tuple]: (datatype, key) of the selected fields
+    """
+    fields = []
+    for datatype in datadict:
+        if datatype == "FieldData":
+            continue
+        for key, kdata in datadict[datatype]["Arrays"].items():
+            if key in ignored_keys:
+                continue
+            bounds = kdata["Bounds"]
+            if bounds[0] is None or bounds[0][0] == bounds[0][1]:
+                continue
+            fields.append((datatype, key))
+    return fields
+
+
+def resultBlockStats(
+    store,
+    datadict: dict,
+    blockdata: dict,
+    fieldunits: dict,
+    ignored_keys: list[str],
+    verbose: bool = False,
+    comm=None,
+    pool=None,
+) -> dict:
+    """compute stats for PointData and CellData of every block in a single pass
+
+    each point/cell is tagged once with its block index, then the stats of all
+    blocks are obtained with a grouped reduction per field
+    (no ExtractBlock per block)
+
+    Args:
+        store (ResultStore): arrays of the MultiBlock dataset (see method.fetchStore)
+        datadict (dict): info dictionnary from ResultStore.info
+        blockdata (dict): dict of blocks data from meshinfo
+        fieldunits (dict): dict of field units
+        ignored_keys (list[str]): list of ignored fields
+        verbose (bool, optional): print verbose. Defaults to False.
+        comm (MPI.Comm, optional): merge the partials of the local pieces
+            over all ranks (see parallel), datadict must have global bounds.
+            Defaults to None.
+        pool (BlockPool, optional): compute the partials on shards of blocks
+            in worker processes (see jobs). Defaults to None.
+
+    Returns:
+        dict: statistics dict for each block (same layout as resultStats),
+            each array also keeps its Moments partial for mergeBlockStats
+    """
+    blocks = list(blockdata.keys())
+    names = [blockdata[block]["name"] for block in blocks]
+
+    blockstats = {}
+    for block in blocks:
+        blockstats[block] = {}
+        for datatype in datadict:
+            blockstats[block][datatype] = {
+                "TypeMode": datadict[datatype]["TypeMode"],
+                "AttributeMode": datadict[datatype]["AttributeMode"],
+                "Arrays": {},
+            }
+
+    fields = blockFields(datadict, ignored_keys)
+    partials = None
+    if pool is not None:
+        partials = mergeShards(
+            pool.map(shardMoments, [(datatype, key) for datatype, key in fields]),
+            mergeMoments,
+        )
+
+    for datatype, key in fields:
+        kdata = datadict[datatype]["Arrays"][key]
+        if partials is not None:
+            perblock = partials[(datatype, key)]
+        else:
+            values, groups = store.groupedArray(datatype, key)
+            if values is None and comm is None:
+                continue
+            if verbose:
+                print(f"resultBlockStats: key={key}", flush=True)
+
+            perblock = [None] * len(blocks)
+            if values is not None:
+                perblock = groupedMoments(
+                    arrayColumns(key, values), groups, len(blocks)
+                )
+            perblock = allMergeMoments(perblock, comm)
+        for block, name, moments in zip(blocks, names, perblock, strict=True):
+            if moments is None:
+                continue
+            blockstats[block][datatype]["Arrays"][key] = momentsStats(
+                key, kdata["Components"], moments, name, fieldunits
+            )
+
+    return blockstats
+
+
+def resultBlockHistos(
+    store,
+    datadict: dict,
+    blockdata: dict,
+    ignored_keys: list[str],
+    BinCount: int = 10,
+    verbose: bool = False,
+    comm=None,
+    pool=None,
+) -> dict:
+    """compute weighted histograms of every block in a single pass per field
+
+    PointData are averaged on cells (as with PointDatatoCellData) and weighted
+    by the cell measure. The bin layout is computed once per field from the
+    global range, so that block histograms can be summed (eg. for insert or total)
+
+    Args:
+        store (ResultStore): arrays of the MultiBlock dataset (see method.fetchStore)
+        datadict (dict): info dictionnary from ResultStore.info
+        blockdata (dict): dict of blocks data from meshinfo
+        ignored_keys (list[str]): list of ignored fields
+        BinCount (int, optional): number of bins in histograms. Defaults to 10.
+        verbose (bool, optional): print verbose. Defaults to False.
+        comm (MPI.Comm, optional): sum the histograms of the local pieces
+            over all ranks (see parallel), datadict must have global bounds.
+            Defaults to None.
+        pool (BlockPool, optional): compute the histograms on shards of blocks
+            in worker processes (see jobs), ranges are gathered first so that
+            all shards share the bin layout. Defaults to None.
+
+    Returns:
+        dict: {block: {key: Histogram}}
+    """
+    blocks = list(blockdata.keys())
+    blockhistos = {block: {} for block in blocks}
+
+    keys = [key for datatype, key in blockFields(datadict, ignored_keys)]
+    partials = None
+    if pool is not None:
+        ranges = mergeRanges(pool.map(shardRanges, keys))
+        edges = {
+            key: binEdges(lower, upper, BinCount)
+            for key, (lower, upper) in ranges.items()
+            if lower <= upper
+        }
+        partials = mergeShards(pool.map(shardHistograms, edges), mergeHistograms)
+
+    for key in keys:
+        if partials is not None:
+            perblock = partials.get(key, [])
+        else:
+            values, groups, weights = store.groupedCellArray(key, magnitude=True)
+            if values is None and comm is None:
+                continue
+            if verbose:
+                print(f"resultBlockHistos: key={key}", flush=True)
+
+            (lower, upper) = (np.inf, -np.inf)
+            if values is not None:
+                (lower, upper) = (values.min(), values.max())
+            (lower, upper) = allRange(lower, upper, comm)
+
+            edges = binEdges(lower, upper, BinCount)
+            perblock = [None] * len(blocks)
+            if values is not None:
+                perblock = groupedHistograms(
+                    values, groups, len(blocks), edges, weights
+                )
+            perblock = allMergeHistograms(perblock, comm)
+        for block, histogram in zip(blocks, perblock, strict=True):
+            if histogram is not None:
+                blockhistos[block][key] = histogram
+
+    return blockhistos
+
+
+def sumBlockHistos(blockhistos: dict, blocks: list[str]) -> dict:
+    """histograms of a union of blocks from the block histograms
+
+    Args:
+        blockhistos (dict): {block: {key: Histogram}} from resultBlockHistos
+        blocks (list[str]): selected blocks
+
+    Returns:
+        dict: {key: Histogram}
+    """
+    keys = []
+    for block in blocks:
+        keys += [key for key in blockhistos[block] if key not in keys]
+    return {
+        key: mergeHistograms([blockhistos[block].get(key) for block in blocks])
+        for key in keys
+    }
+
+
+def timeSeriesStats(
+    input,
+    store,
+    fieldunits: dict,
+    ignored_keys: list[str],
+    basedir: str,
+    times: list[float],
+    comm=None,
+    verbose: bool = False,
+) -> str:
+    """stream the timesteps of input and write per-step stats of every block
+
+    the pipeline is updated in place for each time, only the arrays of the
+    store are replaced (mesh and cell measures are reused), so memory is
+    bounded to one timestep. Pipeline and store are set back to the first
+    time on return.
+
+    Args:
+        input: paraview source the store was fetched from (eg. meshinfo cellsize)
+        store (ResultStore): arrays of input (see method.fetchStore)
+        fieldunits (dict): dict of field units, blocks in Exclude are skipped
+        ignored_keys (list[str]): list of ignored fields
+        basedir (str): result directory
+        times (list[float]): time values (see method.timesteps)
+        comm (MPI.Comm, optional): merge the partials of the local pieces
+            over all ranks (see parallel). Defaults to None.
+        verbose (bool, optional): print verbose. Defaults to False.
+
+    Returns:
+        str: csv file with rows Step, Time, Block, Field, Stat, Value
+    """
+    os.makedirs(f"{basedir}/stats", exist_ok=True)
+    csvfile = f"{basedir}/stats/timeseries.csv"
+    if isRoot(comm) and os.path.isfile(csvfile):
+        os.remove(csvfile)
+
+    unions = {}
+    if len(store.blocks) > 1:
+        unions["insert"] = [
+            i for i, block in enumerate(store.blocks) if "Air" not in block
+        ]
+    print(f"timeSeriesStats: {len(times)} timesteps -> {csvfile}", flush=True)
+
+    for step, time in enumerate(times):
+        np_dataset = dsa.WrapDataObject(fetchLocal(input, comm, time=time))
+        updateStore(store, np_dataset)
+        fields = [
+            (datatype, key)
+            for datatype in ["PointData", "CellData"]
+            for key in store.keys(datatype)
+            if key not in ignored_keys
+        ]
+        partials = {}
+        for field, perblock in stepMoments(store, fields).items():
+            (toolbox, physic, fieldname) = keyinfo(field[1])
+            selected = selectBlocks(store.blocks, fieldunits[fieldname]["Exclude"])
+            perblock = [
+                moments if block in selected else None
+                for block, moments in zip(store.blocks, perblock, strict=True)
+            ]
+            partials[field] = allMergeMoments(perblock, comm)
+        if verbose:
+            print(f"timeSeriesStats: step={step}, time={time}", flush=True)
+        if isRoot(comm):
+            appendRows(
+                csvfile, stepRows(step, time, partials, store.names, unions)
+            )
+
+    # later stages expect the first time
+    if times:
+        np_dataset = dsa.WrapDataObject(fetchLocal(input, comm, time=times[0]))
+        updateStore(store, np_dataset)
+
+    return csvfile
@@ -4,13 +4,10 @@ import os
 from tabulate import tabulate
 from math import pi, sqrt
 
-from paraview.simple import (
-    ExportView,
-    CreateView,
-    Show,
-)
+from paraview import servermanager as sm
+from paraview.vtk.numpy_interface import dataset_adapter as dsa
 
-from .method import convert_data, resultinfo, keyinfo
+from .method import convert_data, resultinfo, keyinfo, fetchTable
 
 
 def createStatsTable(
@@ -140,6 +137,7 @@ def resultStats(
     BinCount: int = 10,
     show: bool = False,
     verbose: bool = False,
+    table: pd.DataFrame = None,
 ) -> dict:
     """compute stats for PointData, CellData and FieldData
 
@@ -156,6 +154,8 @@ def resultStats(
         BinCount (int, optional): number of bins in histograms. Defaults to 10.
         show (bool, optional): show histograms. Defaults to False.
         verbose (bool, optional): print verbose. Defaults to False.
+        table (pd.DataFrame, optional): cell table of input (see method.fetchTable),
+            fetched from input if None. Defaults to None.
 
     Returns:
         dict: statistics dict
@@ -170,20 +170,9 @@ def resultStats(
         )
     PointData_keys = list(datadict["PointData"]["Arrays"].keys())
 
-    spreadSheetView = CreateView("SpreadSheetView")
-    cellCenters1Display = Show(input, spreadSheetView, "SpreadSheetRepresentation")
-    spreadSheetView.Update()
-
-    filename = f"{basedir}/stats/{name}-Axi-cellcenters-all.csv"
-    ExportView(
-        filename,
-        view=spreadSheetView,
-        RealNumberNotation="Scientific",
-    )
-
-    csv = pd.read_csv(filename)
-    keys = csv.columns.values.tolist()
-    # print(f"read_csv: csv={filename}, keys={keys}", flush=True)
+    if table is None:
+        table = fetchTable(dsa.WrapDataObject(sm.Fetch(input)))
+    keys = table.columns.values.tolist()
 
     PointData_keys = []
     for item in input.PointData[:]:
@@ -199,7 +188,7 @@ def resultStats(
         PointData_keys.append(f"{item.Name}{suffix}")
 
     # print(f"PointData_keys={PointData_keys}")
-    # print(f"csv keys={keys}")
+    # print(f"table keys={keys}")
     missing_keys = [key for key in PointData_keys if key not in keys]
     if missing_keys:
         print(f"missing_keys={missing_keys}")
@@ -250,9 +239,9 @@ def resultStats(
                             res = (
                                 2
                                 * pi
-                                * csv["Area"]
-                                * csv["Points_0"]
-                                * csv[key] ** order
+                                * table["Area"]
+                                * table["Points_0"]
+                                * table[key] ** order
                             )
                             value = res.sum() / Area
                             # print(
@@ -282,8 +271,5 @@ def resultStats(
                                 )
                             )
 
-    # remove: f"{basedir}/stats/{name}-Axi-cellcenters-all.csv"
-    os.remove(filename)
-
     # display stats
     return datadict
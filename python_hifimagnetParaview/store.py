@@ -0,0 +1,510 @@
+"""Columnar in-memory store of a result dataset
+
+A ResultStore is built once after meshinfo (see method.fetchStore) and holds
+NumPy views of every PointData/CellData array per block, along with the cell
+measure (Area/Volume) and the mesh connectivity. Stats, histograms and colour
+ranges read from it instead of querying the ParaView proxies again.
+A store can be dumped to a directory of .npy files with a JSON manifest
+(see saveStore) and memory-mapped by later runs (see loadStore).
+This module does not depend on ParaView.
+"""
+
+import json
+import os
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+
+
+def cellAverage(
+    values: np.ndarray, connectivity: np.ndarray, offsets: np.ndarray
+) -> np.ndarray:
+    """average point values over the points of each cell
+
+    same result as ParaView PointDatatoCellData
+
+    Args:
+        values (np.ndarray): point values, shape (npoints,) or (npoints, ncomp)
+        connectivity (np.ndarray): point ids of all cells
+        offsets (np.ndarray): start of each cell in connectivity, ncells+1 items
+
+    Returns:
+        np.ndarray: cell values, shape (ncells,) or (ncells, ncomp)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    sums = np.add.reduceat(values[connectivity], offsets[:-1], axis=0)
+    if sums.ndim > 1:
+        counts = counts[:, None]
+    return sums / counts
+
+
+class ResultStore:
+    """per block columnar view of a result dataset
+
+    arrays are kept as given (views on the VTK arrays when built with
+    method.fetchStore), concatenations and derived values are computed on
+    demand. Ranges are cached.
+
+    Args:
+        blocks (list[str]): block selectors (eg. /Root/H1), one per leaf
+        names (list[str]): block names (aka `feelpp` marker)
+        grandeur (str): cell measure name (Area or Volume)
+    """
+
+    def __init__(self, blocks: list[str], names: list[str], grandeur: str):
+        self.blocks = list(blocks)
+        self.names = list(names)
+        self.grandeur = grandeur
+        nblocks = len(self.blocks)
+        self.points = [None] * nblocks
+        self.connectivity = [None] * nblocks
+        self.offsets = [None] * nblocks
+        self.measure = [None] * nblocks
+        self.totals = np.zeros(nblocks)
+        self.arrays = {"PointData": {}, "CellData": {}}
+        self.dataset = None
+        self._centers = [None] * nblocks
+        self._ranges = {}
+        # per-block Histograms of each field (see meshinfo, ranges.RangeService)
+        self.histograms = {}
+
+    def setMesh(
+        self,
+        index: int,
+        points: np.ndarray,
+        connectivity: np.ndarray,
+        offsets: np.ndarray,
+        measure: np.ndarray,
+        total: float = None,
+    ):
+        """set the mesh of a block
+
+        Args:
+            index (int): block index
+            points (np.ndarray): point coordinates, shape (npoints, 3)
+            connectivity (np.ndarray): point ids of all cells
+            offsets (np.ndarray): start of each cell in connectivity
+            measure (np.ndarray): cell measure (Area or Volume)
+            total (float, optional): block measure, sum of measure if None.
+                Defaults to None.
+        """
+        self.points[index] = points
+        self.connectivity[index] = connectivity
+        self.offsets[index] = offsets
+        self.measure[index] = measure
+        if total is None:
+            total = float(np.sum(measure))
+        self.totals[index] = total
+        self._centers[index] = None
+
+    def add(self, datatype: str, key: str, arrays: list):
+        """add a field
+
+        Args:
+            datatype (str): "PointData" or "CellData"
+            key (str): field name
+            arrays (list): one array per block (None if undefined on the block)
+        """
+        self.arrays[datatype][key] = list(arrays)
+        self._ranges = {
+            k: v for k, v in self._ranges.items() if k[:2] != (datatype, key)
+        }
+        self.histograms.pop(key, None)
+
+    def release(self, datatype: str, key: str):
+        """drop a field from the store
+
+        Args:
+            datatype (str): "PointData" or "CellData"
+            key (str): field name
+        """
+        self.arrays[datatype].pop(key, None)
+        self._ranges = {
+            k: v for k, v in self._ranges.items() if k[:2] != (datatype, key)
+        }
+        self.histograms.pop(key, None)
+
+    def keys(self, datatype: str) -> list[str]:
+        """field names
+
+        Args:
+            datatype (str): "PointData" or "CellData"
+
+        Returns:
+            list[str]: field names
+        """
+        return list(self.arrays[datatype].keys())
+
+    def datatype(self, key: str) -> str:
+        """datatype of a field
+
+        Args:
+            key (str): field name
+
+        Returns:
+            str: "PointData", "CellData" or None if key is not stored
+        """
+        for datatype in self.arrays:
+            if key in self.arrays[datatype]:
+                return datatype
+        return None
+
+    def components(self, datatype: str, key: str) -> int:
+        """number of components of a field
+
+        Args:
+            datatype (str): "PointData" or "CellData"
+            key (str): field name
+
+        Returns:
+            int: number of components
+        """
+        for array in self.arrays[datatype][key]:
+            if array is not None:
+                return 1 if array.ndim == 1 else array.shape[1]
+        return 0
+
+    def index(self, blocks: list[str] = None) -> list[int]:
+        """block indices
+
+        Args:
+            blocks (list[str], optional): block selectors, all blocks if None.
+                Defaults to None.
+
+        Returns:
+            list[int]: indices of blocks
+        """
+        if blocks is None:
+            return list(range(len(self.blocks)))
+        return [self.blocks.index(block) for block in blocks]
+
+    def blockArray(self, datatype: str, key: str, block: str) -> np.ndarray:
+        """field values on a block
+
+        Args:
+            datatype (str): "PointData" or "CellData"
+            key (str): field name
+            block (str): block selector
+
+        Returns:
+            np.ndarray: values (None if undefined on the block)
+        """
+        return self.arrays[datatype][key][self.blocks.index(block)]
+
+    def array(self, datatype: str, key: str, blocks: list[str] = None) -> np.ndarray:
+        """field values on a set of blocks
+
+        Args:
+            datatype (str): "PointData" or "CellData"
+            key (str): field name
+            blocks (list[str], optional): block selectors, all blocks if None.
+                Defaults to None.
+
+        Returns:
+            np.ndarray: concatenated values, no copy for a single block
+                (None if undefined on all blocks)
+        """
+        values, groups = self.groupedArray(datatype, key, blocks)
+        return values
+
+    def groupedArray(
+        self, datatype: str, key: str, blocks: list[str] = None
+    ) -> tuple:
+        """field values on a set of blocks and block index of each value
+
+        Args:
+            datatype (str): "PointData" or "CellData"
+            key (str): field name
+            blocks (list[str], optional): block selectors, all blocks if None.
+                Defaults to None.
+
+        Returns:
+            tuple: values (np.ndarray), block index of each value (np.ndarray)
+        """
+        arrays = []
+        ids = []
+        for i in self.index(blocks):
+            array = self.arrays[datatype][key][i]
+            if array is not None:
+                arrays.append(array)
+                ids.append(i)
+        if not arrays:
+            return None, None
+        groups = np.repeat(
+            np.array(ids, dtype=np.int64), [len(array) for array in arrays]
+        )
+        if len(arrays) == 1:
+            return arrays[0], groups
+        return np.concatenate(arrays), groups
+
+    def cellArray(self, key: str, index: int) -> np.ndarray:
+        """field values per cell on a block, PointData are averaged on cells
+
+        Args:
+            key (str): field name
+            index (int): block index
+
+        Returns:
+            np.ndarray: cell values (None if undefined on the block)
+        """
+        if key in self.arrays["CellData"]:
+            return self.arrays["CellData"][key][index]
+        values = self.arrays["PointData"][key][index]
+        if values is None:
+            return None
+        return cellAverage(values, self.connectivity[index], self.offsets[index])
+
+    def groupedCellArray(
+        self, key: str, blocks: list[str] = None, magnitude: bool = False
+    ) -> tuple:
+        """field values per cell on a set of blocks, with block index and measure
+
+        Args:
+            key (str): field name
+            blocks (list[str], optional): block selectors, all blocks if None.
+                Defaults to None.
+            magnitude (bool, optional): return the norm of vector fields.
+                Defaults to False.
+
+        Returns:
+            tuple: values, block index and cell measure of each cell (np.ndarray)
+        """
+        arrays = []
+        ids = []
+        for i in self.index(blocks):
+            values = self.cellArray(key, i)
+            if values is not None:
+                if magnitude and values.ndim > 1:
+                    values = np.linalg.norm(values, axis=1)
+                arrays.append(values)
+                ids.append(i)
+        if not arrays:
+            return None, None, None
+        groups = np.repeat(
+            np.array(ids, dtype=np.int64), [len(array) for array in arrays]
+        )
+        measure = [self.measure[i] for i in ids]
+        if len(arrays) == 1:
+            return arrays[0], groups, measure[0]
+        return np.concatenate(arrays), groups, np.concatenate(measure)
+
+    def cellCenters(self, index: int) -> np.ndarray:
+        """cell centers of a block (mean of the cell points)
+
+        Args:
+            index (int): block index
+
+        Returns:
+            np.ndarray: centers, shape (ncells, 3)
+        """
+        if self._centers[index] is None:
+            self._centers[index] = cellAverage(
+                self.points[index], self.connectivity[index], self.offsets[index]
+            )
+        return self._centers[index]
+
+    def total(self, blocks: list[str] = None) -> float:
+        """measure (Area or Volume) of a set of blocks
+
+        Args:
+            blocks (list[str], optional): block selectors, all blocks if None.
+                Defaults to None.
+
+        Returns:
+            float: sum of block measures
+        """
+        return float(self.totals[self.index(blocks)].sum())
+
+    def range(
+        self, datatype: str, key: str, blocks: list[str] = None, component: int = -1
+    ) -> tuple:
+        """range of a field on a set of blocks
+
+        Args:
+            datatype (str): "PointData" or "CellData"
+            key (str): field name
+            blocks (list[str], optional): block selectors, all blocks if None.
+                Defaults to None.
+            component (int, optional): component, -1 for magnitude.
+                Defaults to -1.
+
+        Returns:
+            tuple: (min, max), None if undefined on all blocks
+        """
+        lower = np.inf
+        upper = -np.inf
+        for i in self.index(blocks):
+            cached = self._ranges.get((datatype, key, i, component))
+            if cached is None:
+                values = self.arrays[datatype][key][i]
+                if values is None or len(values) == 0:
+                    continue
+                if values.ndim > 1:
+                    if component < 0:
+                        values = np.linalg.norm(values, axis=1)
+                    else:
+                        values = values[:, component]
+                cached = (float(values.min()), float(values.max()))
+                self._ranges[(datatype, key, i, component)] = cached
+            lower = min(lower, cached[0])
+            upper = max(upper, cached[1])
+        if lower > upper:
+            return None
+        return (lower, upper)
+
+    def info(self) -> dict:
+        """info on PointData and CellData
+
+        same layout as method.resultinfo, without querying the proxies
+
+        Returns:
+            dict: info dictionnary
+        """
+        datadict = {
+            "PointData": {
+                "TypeMode": "POINT",
+                "AttributeMode": "Point Data",
+                "Arrays": {},
+            },
+            "CellData": {"TypeMode": "CELL", "AttributeMode": "Cell Data", "Arrays": {}},
+        }
+        for datatype in self.arrays:
+            for key in self.arrays[datatype]:
+                components = self.components(datatype, key)
+                bounds = [self.range(datatype, key)]
+                if components > 1:
+                    bounds += [
+                        self.range(datatype, key, component=i)
+                        for i in range(components)
+                    ]
+                datadict[datatype]["Arrays"][key] = {
+                    "Components": components,
+                    "Bounds": bounds,
+                }
+        return datadict
+
+    def nbytes(self) -> int:
+        """memory referenced by the store
+
+        Returns:
+            int: size in bytes
+        """
+        size = 0
+        for datatype in self.arrays:
+            for arrays in self.arrays[datatype].values():
+                size += sum(array.nbytes for array in arrays if array is not None)
+        for items in [
+            self.points,
+            self.connectivity,
+            self.offsets,
+            self.measure,
+            self._centers,
+        ]:
+            size += sum(array.nbytes for array in items if array is not None)
+        return size
+
+
+def saveStore(store: ResultStore, directory: str):
+    """dump a store to a directory of .npy files
+
+    one file per block and array, the manifest is written last so that an
+    interrupted dump is never loaded
+
+    Args:
+        store (ResultStore): store to save
+        directory (str): output directory
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    def save(array, name: str) -> str:
+        if array is None:
+            return None
+        np.save(f"{directory}/{name}.npy", np.asarray(array))
+        return f"{name}.npy"
+
+    mesh = []
+    for i in range(len(store.blocks)):
+        mesh.append(
+            {
+                item: save(getattr(store, item)[i], f"{i}-{item}")
+                for item in ["points", "connectivity", "offsets", "measure"]
+            }
+        )
+
+    arrays = {}
+    for datatype in store.arrays:
+        arrays[datatype] = {}
+        for n, (key, values) in enumerate(store.arrays[datatype].items()):
+            arrays[datatype][key] = [
+                save(array, f"{i}-{datatype}-{n}") for i, array in enumerate(values)
+            ]
+
+    manifest = {
+        "blocks": store.blocks,
+        "names": store.names,
+        "grandeur": store.grandeur,
+        "totals": store.totals.tolist(),
+        "mesh": mesh,
+        "arrays": arrays,
+    }
+    with open(f"{directory}/{MANIFEST}", "w") as f:
+        json.dump(manifest, f, indent=1)
+    print(
+        f"saveStore: {directory} ({store.nbytes() / 1024**2:.1f} MB)",
+        flush=True,
+    )
+
+
+def isStore(directory: str) -> bool:
+    """check that directory holds a complete store dump
+
+    Args:
+        directory (str): store directory
+
+    Returns:
+        bool: True if the manifest exists
+    """
+    return os.path.isfile(f"{directory}/{MANIFEST}")
+
+
+def loadStore(directory: str, mmap: bool = True) -> ResultStore:
+    """load a store dumped with saveStore
+
+    with mmap, arrays are memory-mapped read-only: only the columns that are
+    actually used are read from disk
+
+    Args:
+        directory (str): store directory
+        mmap (bool, optional): memory-map the arrays. Defaults to True.
+
+    Returns:
+        ResultStore: loaded store
+    """
+    with open(f"{directory}/{MANIFEST}") as f:
+        manifest = json.load(f)
+    mode = "r" if mmap else None
+
+    def load(name: str) -> np.ndarray:
+        if name is None:
+            return None
+        return np.load(f"{directory}/{name}", mmap_mode=mode)
+
+    store = ResultStore(manifest["blocks"], manifest["names"], manifest["grandeur"])
+    for i, mesh in enumerate(manifest["mesh"]):
+        store.setMesh(
+            i,
+            load(mesh["points"]),
+            load(mesh["connectivity"]),
+            load(mesh["offsets"]),
+            load(mesh["measure"]),
+            manifest["totals"][i],
+        )
+    for datatype, arrays in manifest["arrays"].items():
+        for key, names in arrays.items():
+            store.add(datatype, key, [load(name) for name in names])
+
+    print(f"loadStore: {directory}, blocks={len(store.blocks)}", flush=True)
+    return store
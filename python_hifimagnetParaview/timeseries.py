@@ -0,0 +1,87 @@
+"""Per-timestep statistics of transient results (`--timesteps`)
+
+Each timestep only refreshes the arrays of the ResultStore (mesh and cell
+measures are kept), per-block Moments are computed in a grouped pass and
+appended as tidy rows (Step, Time, Block, Field, Stat, Value) to a single
+csv file, so that memory stays bounded to one timestep.
+This module does not depend on ParaView.
+"""
+
+import os
+
+import pandas as pd
+
+from .npstats import arrayColumns, groupedMoments, mergeMoments
+
+STATS = ["Minimum", "Maximum", "Mean", "Standard Deviation"]
+COLUMNS = ["Step", "Time", "Block", "Field", "Stat", "Value"]
+
+
+def stepMoments(store, fields: list[tuple]) -> dict:
+    """Moments per block of the current timestep
+
+    Args:
+        store (ResultStore): result arrays of the timestep
+        fields (list[tuple]): (datatype, key) of the fields
+
+    Returns:
+        dict: {(datatype, key): Moments (or None) per block}
+    """
+    partials = {}
+    for datatype, key in fields:
+        values, groups = store.groupedArray(datatype, key)
+        partials[(datatype, key)] = [None] * len(store.blocks)
+        if values is not None:
+            partials[(datatype, key)] = groupedMoments(
+                arrayColumns(key, values), groups, len(store.blocks)
+            )
+    return partials
+
+
+def stepRows(
+    step: int, time: float, partials: dict, names: list[str], unions: dict = None
+) -> pd.DataFrame:
+    """tidy stats table of a timestep
+
+    vectors are reported by their magnitude
+
+    Args:
+        step (int): timestep index
+        time (float): time value
+        partials (dict): {(datatype, key): Moments per block} (see stepMoments)
+        names (list[str]): block names
+        unions (dict, optional): {name: block indices} of merged blocks
+            (eg. insert). Defaults to None.
+
+    Returns:
+        pd.DataFrame: rows Step, Time, Block, Field, Stat, Value
+    """
+    if unions is None:
+        unions = {}
+
+    rows = []
+    for (_, key), perblock in partials.items():
+        named = list(zip(names, perblock, strict=True))
+        for name, indices in unions.items():
+            named.append((name, mergeMoments([perblock[i] for i in indices])))
+        for name, moments in named:
+            if moments is None:
+                continue
+            variable = key
+            if f"{key}_Magnitude" in moments.variables:
+                variable = f"{key}_Magnitude"
+            stats = moments.stats(name)
+            stats = stats[stats["Variable"] == variable].iloc[0]
+            for stat in STATS:
+                rows.append([step, time, name, key, stat, float(stats[stat])])
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def appendRows(file: str, df: pd.DataFrame):
+    """append rows to a csv file, the header is written on creation
+
+    Args:
+        file (str): csv file name
+        df (pd.DataFrame): rows
+    """
+    df.to_csv(file, mode="a", header=not os.path.isfile(file), index=False)
@@ -1,3 +1,4 @@
+import gc
 import numpy as np
 import pandas as pd
 import re
@@ -7,10 +8,24 @@ from paraview.simple import (
     Slice,
     WarpByVector,
     UpdatePipeline,
+    BoundingRuler,
+    Text,
+    Delete,
+    CreateView,
+    Show,
+    GetScalarBar,
+    GetColorTransferFunction,
+    ColorBy,
+    HideScalarBarIfNotNeeded,
+    GetOpacityTransferFunction,
+    SaveScreenshot,
+    ExtractBlock,
 )
 from paraview import servermanager as sm
 
-from .method import getbounds, invert_convert_data
+from .method import getbounds, invert_convert_data, keyinfo, selectBlocks
+from .manifest import fileDigest
+from .ranges import TRIM
 
 
 def deformed(input, factor: float = 1, printed: bool = True):
@@ -301,6 +316,59 @@ def makesphereslice(
     return slice1
 
 
+class SliceCache:
+    """clips and slices of the views, built once and reused for all fields
+
+    sources are keyed by (input proxy, builder, parameters) and deleted by
+    release (eg. at the end of the views stage)
+    """
+
+    def __init__(self):
+        self.sources = {}
+        self.hits = 0
+
+    def get(self, make, input, name: str, **params):
+        """clip or slice of input, built on first use
+
+        Args:
+            make: builder (eg. makeboxclip, makeplaneslice)
+            input: paraview reader
+            name (str): name of the clip or slice
+            **params: builder parameters (eg. z=0.0)
+
+        Returns:
+            clipped or sliced paraview reader
+        """
+        key = (input.GetGlobalIDAsString(), make.__name__, tuple(sorted(params.items())))
+        if key in self.sources:
+            self.hits += 1
+            print(f"SliceCache: reuse {name}", flush=True)
+            return self.sources[key]
+
+        source = make(input, name, **params)
+        self.sources[key] = source
+        return source
+
+    def release(self):
+        """delete the clips and slices"""
+        if self.sources:
+            print(
+                f"SliceCache: release {len(self.sources)} sources ({self.hits} reused)",
+                flush=True,
+            )
+        for source in reversed(list(self.sources.values())):
+            Delete(source)
+        self.sources = {}
+        self.hits = 0
+        gc.collect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
 def setCamera(
     renderView,
     Position: tuple = None,
@@ -383,6 +451,24 @@ def setCamera(
     # print(f"help={dir(camera)}", flush=True)
 
 
+def histogramFile(filename: str) -> str:
+    """histogram table of the insert used for the custom range of a view
+
+    Args:
+        filename (str): name of view file
+
+    Returns:
+        str: histogram csv file name
+    """
+    histfile = filename.replace("views/", "histograms/insert-").replace(
+        ".png", "-histogram-matplotlib.csv"
+    )
+    histfile = re.sub(r"-deformed_factor\d+", "", histfile)
+    histfile = re.sub(r"-OrOz-theta=\d+deg", "", histfile)
+    histfile = re.sub(r"-OxOy-z=\d+.\d+mm", "", histfile)
+    return histfile
+
+
 def rangeHisto(field: str, fieldname: str, fieldunits: dict, filename: str) -> tuple:
     """find custom range from histogram of field
     (removes data from extremities whose area/volume is less than 0.1% of total area/volume)
@@ -397,12 +483,7 @@ def rangeHisto(field: str, fieldname: str, fieldunits: dict, filename: str) -> t
         tuple: new custom range (None if doesn't change/ hist doesn't exist)
     """
 
-    histfile = filename.replace("views/", "histograms/insert-").replace(
-        ".png", "-histogram-matplotlib.csv"
-    )
-    histfile = re.sub(r"-deformed_factor\d+", "", histfile)
-    histfile = re.sub(r"-OrOz-theta=\d+deg", "", histfile)
-    histfile = re.sub(r"-OxOy-z=\d+.\d+mm", "", histfile)
+    histfile = histogramFile(filename)
     try:
         df = pd.read_csv(histfile)
     except:
@@ -442,3 +523,393 @@ def rangeHisto(field: str, fieldname: str, fieldunits: dict, filename: str) -> t
 
     print(f"Custom range({r1:.3g},{r2:.3g})")
     return (r1, r2)
+
+
+# default view size
+RESOLUTION = [1400, 1200]
+
+
+class ViewSession:
+    """render view of a geometry reused for all fields
+
+    the render view, the display of input, the camera, the grids, the ruler
+    and the annotation are created once, each field is then only recolored
+    (ColorBy and LUT rescale) before saving the screenshot
+
+    Args:
+        input: paraview source to display (eg. clip or slice)
+        resolution (list[int], optional): view size. Defaults to [1400, 1200].
+        camera (dict, optional): setCamera arguments, ResetCamera only if None.
+            Defaults to None.
+        comment (str, optional): add comment. Defaults to None.
+        grid (bool, optional): add grid to view. Defaults to False.
+        polargrid (bool, optional): add polar grid to view. Defaults to False.
+        addruler (bool, optional): add ruler to view. Defaults to False.
+        background (bool, optional): transparent background (& text black). Defaults to False.
+        printed (bool, optional): Defaults to True.
+    """
+
+    def __init__(
+        self,
+        input,
+        resolution: list[int] = None,
+        camera: dict = None,
+        comment: str = None,
+        grid: bool = False,
+        polargrid: bool = False,
+        addruler: bool = False,
+        background: bool = False,
+        printed: bool = True,
+    ):
+        self.input = input
+        self.resolution = resolution if resolution is not None else RESOLUTION
+        self.background = background
+        self.LUT = None
+        self.sources = []
+
+        print("ViewSession: createrenderView", flush=True)
+        self.renderView = CreateView("RenderView")
+
+        self.textDisplay = None
+        if comment is not None:
+            print(f"add comment: {comment}", flush=True)
+            text = Text(registrationName="Text1")
+            text.Text = rf"{comment}"
+            self.textDisplay = Show(text, self.renderView)
+            self.textDisplay.WindowLocation = "Upper Center"
+            self.textDisplay.FontSize = 24
+            self.textDisplay.Bold = 1
+            self.textDisplay.Italic = 1
+            if background:
+                self.textDisplay.Color = [0.0, 0.0, 0.0]
+            self.sources.append(text)
+
+        self.display = Show(input, self.renderView)
+        black = [0.0, 0.0, 0.0]
+        if grid:
+            self.display.DataAxesGrid.GridAxesVisibility = 1
+            if background:
+                for prop in ["GridColor", "XTitleColor", "YTitleColor", "ZTitleColor"]:
+                    setattr(self.display.DataAxesGrid, prop, black)
+                for prop in ["XLabelColor", "YLabelColor", "ZLabelColor"]:
+                    setattr(self.display.DataAxesGrid, prop, black)
+        if polargrid:
+            self.display.PolarAxes.Visibility = 1
+            self.display.PolarAxes.MaximumAngle = 360.0
+            if background:
+                for prop in [
+                    "PolarAxisColor",
+                    "PolarArcsColor",
+                    "LastRadialAxisColor",
+                    "SecondaryPolarArcsColor",
+                    "SecondaryRadialAxesColor",
+                    "PolarAxisTitleColor",
+                    "PolarAxisLabelColor",
+                    "LastRadialAxisTextColor",
+                    "SecondaryRadialAxesTextColor",
+                ]:
+                    setattr(self.display.PolarAxes, prop, black)
+            self.display.PolarAxes.Use2DMode = 0
+
+        # Add BoundingRuler filter to get an idea of the dimension
+        if addruler:
+            print("Add ruler to see dimensions", flush=True)
+            ruler = BoundingRuler(registrationName="BoundingRuler1", Input=input)
+            ruler.Axis = "Y Axis"
+            Show(ruler, self.renderView)
+            self.sources.append(ruler)
+
+        if camera is None:
+            self.renderView.ResetCamera()
+        else:
+            setCamera(self.renderView, **camera)
+
+        self.renderView.ViewSize = self.resolution
+        if not printed:
+            for prop in self.renderView.ListProperties():
+                print(
+                    f"renderView: {prop}={self.renderView.GetPropertyValue(prop)}",
+                    flush=True,
+                )
+        self.renderView.OrientationAxesVisibility = 1
+
+    def render(
+        self,
+        field: str,
+        color,
+        fieldunits: dict,
+        selectedblocks: list[str],
+        filename: str = None,
+        excludeBlocks: bool = False,
+        customRangeHisto: bool = False,
+        colorrange: tuple = None,
+    ):
+        """color the view by field and save it
+
+        Args:
+            field (str): field name
+            color: color PointData or CellData (eg. ["POINTS", field])
+            fieldunits (dict): dict of field units
+            selectedblocks (list[str]): list of markers of field
+            filename (str, optional): name and path of futur view file. Defaults to None.
+            excludeBlocks (bool, optional): field excluded blocks. Defaults to False.
+            customRangeHisto (bool, optional): create custom range from field histogram. Defaults to False.
+            colorrange (tuple, optional): LUT range (see colorRange),
+                replaces excludeBlocks and customRangeHisto. Defaults to None.
+        """
+        print(f"ViewSession.render: field={field}", flush=True)
+        input = self.input
+        renderView = self.renderView
+        display = self.display
+
+        display.BlockSelectors = selectedblocks
+        display.ColorArrayName = color
+        ColorBy(display, tuple(color))
+
+        # hide the scalar bar of the previous field
+        if self.LUT is not None:
+            HideScalarBarIfNotNeeded(self.LUT, renderView)
+
+        display.SetScalarBarVisibility(renderView, True)
+        display.RescaleTransferFunctionToDataRange(True, False)
+
+        field_name = field.replace(".", "")
+        LUT = GetColorTransferFunction(field_name)
+        LUT.ScalarRangeInitialized = 1.0
+        self.LUT = LUT
+
+        if colorrange is not None:
+            LUT.RescaleTransferFunction(colorrange[0], colorrange[1])
+            excludeBlocks = False
+            customRangeHisto = False
+        elif input.GetDataInformation().DataInformation.GetNumberOfUniqueBlockTypes() == 0:
+            excludeBlocks = False
+        if excludeBlocks:
+            extractBlock1 = ExtractBlock(registrationName="insert", Input=input)
+            extractBlock1.Selectors = selectedblocks
+            extractBlock1.UpdatePipeline()
+            if field in list(extractBlock1.CellData.keys()):
+                arrayInfo = extractBlock1.CellData[field]
+            if field in list(extractBlock1.PointData.keys()):
+                arrayInfo = extractBlock1.PointData[field]
+            r = arrayInfo.GetRange(0)
+            LUT.RescaleTransferFunction(r[0], r[1])
+            Delete(extractBlock1)
+            del extractBlock1
+            gc.collect()
+
+        HideScalarBarIfNotNeeded(LUT, renderView)
+        LUT.ApplyPreset("Rainbow Uniform", True)
+
+        LUTColorBar = GetScalarBar(LUT)
+        (toolbox, physic, fieldname) = keyinfo(field)
+        symbol = fieldunits[fieldname]["Symbol"]
+        msymbol = symbol
+        if "mSymbol" in fieldunits[fieldname]:
+            msymbol = fieldunits[fieldname]["mSymbol"]
+        [in_unit, out_unit] = fieldunits[fieldname]["Units"]
+        LUTColorBar.Title = rf"{msymbol} [{in_unit:~P}]"
+
+        if customRangeHisto:
+            r = rangeHisto(field, fieldname, fieldunits, filename)
+            if r:
+                LUT.RescaleTransferFunction(r[0], r[1])
+
+        if self.background:
+            LUTColorBar.TitleColor = [0.0, 0.0, 0.0]
+            LUTColorBar.LabelColor = [0.0, 0.0, 0.0]
+        LUTColorBar.TitleBold = 1
+        LUTColorBar.TitleItalic = 1
+        LUTColorBar.TitleFontSize = 30
+        LUTColorBar.HorizontalTitle = 1
+        LUTColorBar.LabelFontSize = 30
+        LUTColorBar.ScalarBarThickness = 32
+        LUTColorBar.ScalarBarLength = 0.9
+        LUTColorBar.AutomaticLabelFormat = 0
+        LUTColorBar.RangeLabelFormat = "%-#6.3g"
+        LUTColorBar.DataRangeLabelFormat = "%-#6.3e"
+        LUTColorBar.DrawDataRange = 1
+
+        PWF = GetOpacityTransferFunction(field_name)
+        PWF.ScalarRangeInitialized = 1
+        renderView.Update()
+
+        # TransparentBackground=1, need to set title and label colors to black
+        if filename:
+            SaveScreenshot(
+                filename,
+                renderView,
+                ImageResolution=self.resolution,
+                TransparentBackground=self.background,
+            )
+
+    def close(self):
+        """delete the displays, the annotation and the render view"""
+        if self.textDisplay is not None:
+            Delete(self.textDisplay)
+        Delete(self.display)
+        for source in self.sources:
+            Delete(source)
+        Delete(self.renderView)
+        self.sources = []
+        self.LUT = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def annotation(fieldunits: dict) -> str:
+    """comment with current and magnetic fields
+
+    Args:
+        fieldunits (dict): dict of field units
+
+    Returns:
+        str: comment
+    """
+    lines = []
+    if fieldunits["Current"]["Val"]:
+        lines.append(f'I={fieldunits["Current"]["Val"]}')
+    if fieldunits["B0"]["Val"]:
+        lines.append(f'B0={fieldunits["B0"]["Val"]}T')
+    if fieldunits["Bbg"]["Val"]:
+        lines.append(f'Background field: {fieldunits["Bbg"]["Val"]}')
+    return "\n".join(lines)
+
+
+def colorRange(
+    ranges,
+    field: str,
+    selectedblocks: list[str],
+    customRangeHisto: bool = False,
+) -> tuple:
+    """LUT range of a view
+
+    only the trimmed range of --customRangeHisto comes from the store, the
+    range of the excluded blocks is taken on the displayed data (clip, slice)
+
+    Args:
+        ranges (RangeService): colour ranges of the store
+        field (str): field name
+        selectedblocks (list[str]): list of markers of field
+        customRangeHisto (bool, optional): trim the extreme bins of the
+            histogram of the selected blocks. Defaults to False.
+
+    Returns:
+        tuple: (min, max), None to keep the data range of the view
+    """
+    if customRangeHisto:
+        return ranges.range(field, selectedblocks, trim=TRIM)
+    return None
+
+
+def staleViews(
+    manifest,
+    blockdata,
+    fields: dict,
+    fieldunits: dict,
+    filename: str,
+    view: dict,
+    excludeBlocks: bool = False,
+    customRangeHisto: bool = False,
+    ranges=None,
+) -> dict:
+    """fields whose view has to be rendered
+
+    Args:
+        manifest (ViewManifest): rendered views, all fields if None
+        blockdata: blockdata from meshinfo
+        fields (dict): {field name: color for PointData or CellData}
+        fieldunits (dict): dict of field units
+        filename (str): view file pattern, `{field}` is replaced by the field name
+        view (dict): ViewSession arguments (camera, comment, resolution, ...)
+        excludeBlocks (bool, optional): hide excluded blocks of each field.
+            Defaults to False.
+        customRangeHisto (bool, optional):  create custom range from field histogram. Defaults to False.
+        ranges (RangeService, optional): colour ranges (see colorRange).
+            Defaults to None.
+
+    Returns:
+        dict: {field name: color} of the new or changed views
+    """
+    if manifest is None:
+        return fields
+
+    stale = {}
+    for field, color in fields.items():
+        (toolbox, physic, fieldname) = keyinfo(field)
+        viewfile = filename.replace("{field}", field)
+        selectedblocks = selectBlocks(
+            list(blockdata.keys()), fieldunits[fieldname]["Exclude"]
+        )
+        colorrange = None
+        if customRangeHisto:
+            colorrange = fileDigest(histogramFile(viewfile))
+        if ranges is not None:
+            colorrange = colorRange(ranges, field, selectedblocks, customRangeHisto)
+        parts = {
+            "field": field,
+            "color": color,
+            "blocks": selectedblocks,
+            "excludeBlocks": excludeBlocks,
+            "units": fieldunits[fieldname]["Units"],
+            "view": {"resolution": RESOLUTION, **view},
+            "range": colorrange,
+        }
+        if manifest.stale(viewfile, parts):
+            stale[field] = color
+    return stale
+
+
+def renderFields(
+    session: ViewSession,
+    blockdata,
+    fields: dict,
+    fieldunits: dict,
+    filename: str,
+    excludeBlocks: bool = False,
+    customRangeHisto: bool = False,
+    manifest=None,
+    ranges=None,
+):
+    """render all fields in a view session
+
+    Args:
+        session (ViewSession): view of the geometry
+        blockdata: blockdata from meshinfo
+        fields (dict): {field name: color for PointData or CellData}
+        fieldunits (dict): dict of field units
+        filename (str): view file pattern, `{field}` is replaced by the field name
+        excludeBlocks (bool, optional): hide excluded blocks of each field.
+            Defaults to False.
+        customRangeHisto (bool, optional):  create custom range from field histogram. Defaults to False.
+        manifest (ViewManifest, optional): record the rendered views (see
+            staleViews). Defaults to None.
+        ranges (RangeService, optional): colour ranges from the store instead
+            of a histogram file per view (see colorRange). Defaults to None.
+    """
+    for field, color in fields.items():
+        (toolbox, physic, fieldname) = keyinfo(field)
+        print(f"Exclude blocks = {fieldunits[fieldname]['Exclude']}", flush=True)
+        selectedblocks = selectBlocks(
+            list(blockdata.keys()), fieldunits[fieldname]["Exclude"]
+        )
+        exclude = excludeBlocks and bool(fieldunits[fieldname]["Exclude"])
+        colorrange = None
+        if ranges is not None:
+            colorrange = colorRange(ranges, field, selectedblocks, customRangeHisto)
+        session.render(
+            field,
+            color,
+            fieldunits,
+            selectedblocks,
+            filename=filename.replace("{field}", field),
+            excludeBlocks=exclude,
+            customRangeHisto=customRangeHisto,
+            colorrange=colorrange,
+        )
+        if manifest is not None:
+            manifest.record(filename.replace("{field}", field))
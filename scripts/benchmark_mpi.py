@@ -0,0 +1,110 @@
+import argparse
+import os
+import time
+
+from paraview.simple import (
+    Calculator,
+    CellSize,
+    GroupDatasets,
+    Tetrahedralize,
+    Wavelet,
+)
+from paraview.vtk.numpy_interface import dataset_adapter as dsa
+
+from python_hifimagnetParaview.method import fetchLocal, fetchStore
+from python_hifimagnetParaview.parallel import allInfo, allSum, isRoot, world
+from python_hifimagnetParaview.stats import resultBlockHistos, resultBlockStats
+
+######################## README ########################
+#
+# Scaling benchmark of the meshinfo stats/histograms on synthetic meshes
+#
+# Each block is a tetrahedralized Wavelet (size^3 voxels) with a scalar
+# (RTData) and a vector (U) PointData. Run it at several ranks:
+#
+#   for n in 1 2 4 8; do
+#       mpiexec -n $n pvbatch --symmetric scripts/benchmark_mpi.py --output scaling.csv
+#   done
+#
+# Options:
+#   --size: number of voxels along each axis of a block (default 40)
+#   --blocks: number of blocks (default 8)
+#   --bins: number of bins in histograms (default 20)
+#   --output: append timings to this csv file
+#
+########################################################
+
+parser = argparse.ArgumentParser(description="MPI scaling benchmark")
+parser.add_argument("--size", type=int, help="voxels per axis", default=40)
+parser.add_argument("--blocks", type=int, help="number of blocks", default=8)
+parser.add_argument("--bins", type=int, help="number of bins", default=20)
+parser.add_argument("--output", type=str, help="csv file", default=None)
+args = parser.parse_args()
+
+comm = world()
+ranks = 1 if comm is None else comm.Get_size()
+
+
+def timer():
+    if comm is not None:
+        comm.Barrier()
+    return time.perf_counter()
+
+
+# synthetic MultiBlock dataset
+start = timer()
+half = args.size // 2
+sources = []
+for i in range(args.blocks):
+    wavelet = Wavelet(registrationName=f"block{i}")
+    wavelet.WholeExtent = [-half, half, -half, half, -half, half]
+    wavelet.Center = [0.0, 0.0, 10.0 * i]
+    tetra = Tetrahedralize(Input=wavelet)
+    vector = Calculator(Input=tetra)
+    vector.ResultArrayName = "U"
+    vector.Function = "coordsX*iHat+coordsY*jHat+RTData*kHat"
+    sources.append(vector)
+group = GroupDatasets(Input=sources)
+cellsize = CellSize(Input=group)
+cellsize.ComputeLength = 0
+cellsize.ComputeArea = 0
+cellsize.ComputeVolume = 1
+cellsize.ComputeVertexCount = 0
+cellsize.ComputeSum = 1
+cellsize.UpdatePipeline()
+tmesh = timer() - start
+
+fieldunits = {key: {"Exclude": []} for key in ["RTData", "U", "Volume"]}
+blocks = [f"/Root/block{i}" for i in range(args.blocks)]
+names = [block.split("/")[-1] for block in blocks]
+blockdata = {block: {"name": name} for block, name in zip(blocks, names, strict=True)}
+
+start = timer()
+np_dataset = dsa.WrapDataObject(fetchLocal(cellsize, comm))
+store = fetchStore(np_dataset, blocks, names, "Volume", comm is not None)
+cells = int(allSum([0 if m is None else len(m) for m in store.measure], comm).sum())
+datadict = allInfo(store.info(), comm)
+tfetch = timer() - start
+
+start = timer()
+resultBlockStats(store, datadict, blockdata, fieldunits, ["Volume"], comm=comm)
+tstats = timer() - start
+
+start = timer()
+resultBlockHistos(
+    store, datadict, blockdata, ["Volume"], BinCount=args.bins, comm=comm
+)
+thistos = timer() - start
+
+if isRoot(comm):
+    print(
+        f"ranks={ranks}, cells={cells}, mesh={tmesh:.3f}s, fetch={tfetch:.3f}s, "
+        f"stats={tstats:.3f}s, histos={thistos:.3f}s",
+        flush=True,
+    )
+    if args.output:
+        header = not os.path.isfile(args.output)
+        with open(args.output, "a") as f:
+            if header:
+                f.write("ranks,cells,mesh,fetch,stats,histos\n")
+            f.write(f"{ranks},{cells},{tmesh},{tfetch},{tstats},{thistos}\n")
@@ -111,7 +111,7 @@ def test_views(file, jsonfile):
     fieldunits, ignored_keys = create_dicts_fromjson(
         fieldtype, ureg, distance_unit, basedir
     )
-    cellsize, blockdata, statsdict = meshinfo(
+    cellsize, blockdata, statsdict, store = meshinfo(
         reader, dim, fieldunits, ignored_keys, basedir, ureg, ComputeStats=False
     )
 
@@ -155,7 +155,7 @@ def test_stats(file, jsonfile):
     fieldunits, ignored_keys = create_dicts_fromjson(
         fieldtype, ureg, distance_unit, basedir
     )
-    cellsize, blockdata, statsdict = meshinfo(
+    cellsize, blockdata, statsdict, store = meshinfo(
         reader, dim, fieldunits, ignored_keys, basedir, ureg, ComputeStats=True
     )
 
@@ -181,3 +181,1013 @@ class TestDictTypeUnits3D:
     def test_force_laplace_has_correct_units(self, ureg):
         units = dictTypeUnits3D(ureg, "mm")
         assert units["ForceLaplace"]["Units"][0] == ureg.newton / ureg.meter**3
+
+
+# ---------------------------------------------------------------------------
+# npstats.py — arrayColumns, descriptiveStats, groupedStats, Moments
+# ---------------------------------------------------------------------------
+
+import numpy as np
+
+from python_hifimagnetParaview.npstats import (
+    Moments,
+    arrayColumns,
+    descriptiveStats,
+    groupedStats,
+    keysStats,
+    mergeMoments,
+)
+
+
+class TestArrayColumns:
+    def test_scalar_keeps_key(self):
+        columns = arrayColumns("T", np.arange(4.0))
+        assert list(columns) == ["T"]
+
+    def test_vector_adds_components_and_magnitude(self):
+        values = np.array([[3.0, 4.0], [0.0, 1.0]])
+        columns = arrayColumns("B", values)
+        assert list(columns) == ["B_0", "B_1", "B_Magnitude"]
+        assert columns["B_Magnitude"] == pytest.approx([5.0, 1.0])
+
+
+class TestDescriptiveStats:
+    def test_layout_matches_createStatsTable(self):
+        df = descriptiveStats({"T": np.arange(5.0)}, "insert")
+        for column in (
+            "Variable",
+            "Name",
+            "Minimum",
+            "Mean",
+            "Maximum",
+            "Standard Deviation",
+            "M2",
+            "M3",
+            "M4",
+        ):
+            assert column in df.columns
+        assert df["Name"].iloc[0] == "insert"
+
+    def test_values(self):
+        x = np.array([1.0, 2.0, 4.0, 8.0])
+        df = descriptiveStats({"T": x}, "insert")
+        d = x - x.mean()
+        assert df["Minimum"].iloc[0] == pytest.approx(1.0)
+        assert df["Maximum"].iloc[0] == pytest.approx(8.0)
+        assert df["Mean"].iloc[0] == pytest.approx(x.mean())
+        assert df["M2"].iloc[0] == pytest.approx(np.sum(d**2))
+        assert df["M3"].iloc[0] == pytest.approx(np.sum(d**3))
+        assert df["M4"].iloc[0] == pytest.approx(np.sum(d**4))
+        assert df["Standard Deviation"].iloc[0] == pytest.approx(np.std(x, ddof=1))
+
+    def test_one_row_per_column(self):
+        df = descriptiveStats(arrayColumns("B", np.ones((3, 3))), "H1")
+        assert df["Variable"].to_list() == ["B_0", "B_1", "B_2", "B_Magnitude"]
+
+
+class TestKeysStats:
+    def test_matches_descriptiveStats_per_key(self):
+        rng = np.random.default_rng(3)
+        arrays = {"T": rng.normal(size=20), "B": rng.normal(size=(20, 3))}
+        stats = keysStats(arrays, "H1")
+        for key, values in arrays.items():
+            expected = descriptiveStats(arrayColumns(key, values), "H1")
+            assert stats[key]["Variable"].to_list() == expected["Variable"].to_list()
+            for column in ("Minimum", "Maximum", "Mean", "M2", "Standard Deviation"):
+                assert stats[key][column].to_numpy() == pytest.approx(
+                    expected[column].to_numpy()
+                )
+
+    def test_key_with_other_length(self):
+        # eg. a field not defined on every block
+        arrays = {"T": np.arange(6.0), "J": np.arange(4.0)}
+        stats = keysStats(arrays, "insert")
+        assert stats["J"]["Maximum"].iloc[0] == pytest.approx(3.0)
+        assert stats["T"]["Maximum"].iloc[0] == pytest.approx(5.0)
+
+
+class TestGroupedStats:
+    def test_matches_descriptiveStats_per_group(self):
+        rng = np.random.default_rng(0)
+        x = rng.normal(size=30)
+        groups = rng.integers(0, 3, size=30)
+        results = groupedStats({"T": x}, groups, ["a", "b", "c"])
+        for i, name in enumerate(["a", "b", "c"]):
+            expected = descriptiveStats({"T": x[groups == i]}, name)
+            for column in ("Minimum", "Maximum", "Mean", "M2", "M3", "M4"):
+                assert results[i][column].iloc[0] == pytest.approx(
+                    expected[column].iloc[0]
+                )
+            assert results[i]["Name"].iloc[0] == name
+
+    def test_empty_group_is_none(self):
+        results = groupedStats({"T": np.arange(4.0)}, [0, 0, 2, 2], ["a", "b", "c"])
+        assert results[1] is None
+        assert results[2]["Mean"].iloc[0] == pytest.approx(2.5)
+
+
+class TestMoments:
+    def test_merge_matches_union(self):
+        rng = np.random.default_rng(1)
+        x = rng.normal(loc=3.0, scale=2.0, size=50)
+        parts = [Moments.fromColumns({"T": p}) for p in (x[:7], x[7:30], x[30:])]
+        merged = mergeMoments(parts).stats("insert")
+        expected = descriptiveStats({"T": x}, "insert")
+        for column in ("Minimum", "Maximum", "Mean", "M2", "M3", "M4"):
+            assert merged[column].iloc[0] == pytest.approx(expected[column].iloc[0])
+        assert merged["Standard Deviation"].iloc[0] == pytest.approx(
+            np.std(x, ddof=1)
+        )
+
+    def test_weighted_merge_matches_union(self):
+        rng = np.random.default_rng(2)
+        x = rng.normal(size=40)
+        w = rng.uniform(0.1, 2.0, size=40)
+        whole = Moments.fromColumns({"T": x}, w)
+        merged = Moments.fromColumns({"T": x[:15]}, w[:15]).merge(
+            Moments.fromColumns({"T": x[15:]}, w[15:])
+        )
+        assert merged.count == 40
+        assert merged.weight == pytest.approx(w.sum())
+        for attr in ("mean", "M2", "M3", "M4"):
+            assert getattr(merged, attr) == pytest.approx(getattr(whole, attr))
+
+    def test_merge_skips_none(self):
+        m = Moments.fromColumns({"T": np.arange(3.0)})
+        assert mergeMoments([None, m, None]) is m
+        assert mergeMoments([None]) is None
+
+
+# ---------------------------------------------------------------------------
+# nphisto.py — binEdges, Histogram, groupedHistograms, weightedHistograms
+# ---------------------------------------------------------------------------
+
+from python_hifimagnetParaview.nphisto import (
+    binEdges,
+    coverageHistograms,
+    groupedHistograms,
+    mergeHistograms,
+    uniformEdges,
+    weightedHistograms,
+)
+
+
+class TestBinEdges:
+    def test_bins_centered_on_min_and_max(self):
+        edges = binEdges(0.0, 9.0, 10)
+        centers = (edges[:-1] + edges[1:]) / 2
+        assert len(edges) == 11
+        assert centers[0] == pytest.approx(0.0)
+        assert centers[-1] == pytest.approx(9.0)
+
+
+class TestGroupedHistograms:
+    def test_matches_numpy_histogram_per_group(self):
+        rng = np.random.default_rng(3)
+        x = rng.uniform(0.0, 1.0, size=100)
+        w = rng.uniform(0.5, 1.5, size=100)
+        groups = rng.integers(0, 3, size=100)
+        edges = binEdges(x.min(), x.max(), 5)
+        histos = groupedHistograms(x, groups, 3, edges, w)
+        for i in range(3):
+            expected, _ = np.histogram(
+                x[groups == i], bins=edges, weights=w[groups == i]
+            )
+            assert histos[i].weights == pytest.approx(expected)
+            assert histos[i].count == np.sum(groups == i)
+
+    def test_union_is_sum_of_blocks(self):
+        x = np.array([0.0, 1.0, 2.0, 3.0])
+        edges = binEdges(0.0, 3.0, 4)
+        histos = groupedHistograms(x, [0, 1, 1, 3], 4, edges, np.ones(4))
+        assert histos[2] is None
+        union = mergeHistograms(histos)
+        assert union.weights == pytest.approx([1.0, 1.0, 1.0, 1.0])
+        assert union.total() == pytest.approx(4.0)
+        assert (union.minimum, union.maximum) == (0.0, 3.0)
+
+
+class TestWeightedHistograms:
+    def test_all_fields_in_one_pass(self):
+        rng = np.random.default_rng(4)
+        measure = rng.uniform(0.1, 1.0, size=60)
+        columns = {"T": rng.normal(size=60), "J": rng.uniform(size=60)}
+        edges = {key: binEdges(v.min(), v.max(), 6) for key, v in columns.items()}
+        edges["J"] = uniformEdges(columns["J"].min(), columns["J"].max(), 4)
+        histos = weightedHistograms(columns, measure, edges)
+        for key, values in columns.items():
+            expected, _ = np.histogram(values, bins=edges[key], weights=measure)
+            assert histos[key].weights == pytest.approx(expected)
+            assert histos[key].total() == pytest.approx(measure.sum())
+
+
+# ---------------------------------------------------------------------------
+# derived.py — derivedFields
+# ---------------------------------------------------------------------------
+
+from python_hifimagnetParaview.derived import derivedFields
+
+
+class TestDerivedFields:
+    def test_cylindrical_components(self):
+        points = np.array([[1.0, 0.0, 0.0], [0.0, 2.0, 1.0]])
+        j = np.array([[3.0, 4.0, 0.0], [3.0, 4.0, 12.0]])
+        derived = derivedFields(points, {"J": j})
+        assert derived["r"] == pytest.approx([1.0, 2.0])
+        assert derived["Jnorm"] == pytest.approx([5.0, 13.0])
+        assert derived["J_ur"] == pytest.approx([3.0, 4.0])
+        assert derived["J_ut"] == pytest.approx([4.0, -3.0])
+
+    def test_axi_components(self):
+        points = np.array([[1.0, 0.0, 0.0]])
+        b = np.array([[3.0, 4.0]])
+        derived = derivedFields(points, {"B": b}, axi=True)
+        assert set(derived) == {"Bnorm", "B_r", "B_z"}
+        assert derived["B_r"] == pytest.approx([3.0])
+        assert derived["B_z"] == pytest.approx([4.0])
+
+
+# ---------------------------------------------------------------------------
+# ensight.py — caseVariables, variableBytes, requiredArrays
+# ---------------------------------------------------------------------------
+
+from python_hifimagnetParaview.ensight import (
+    caseVariables,
+    requiredArrays,
+    variableBytes,
+)
+
+CASE = """FORMAT
+type: ensight gold
+
+GEOMETRY
+model: 1 Export.geo***
+
+VARIABLE
+constant per case: 1 Current 31000
+scalar per node: 1 cfpdes.heat.temperature Export.temperature***
+vector per node: 1 cfpdes.elastic.displacement Export.displacement***
+vector per element: 1 cfpdes.magnetic.magnetic_field Export.B***
+
+TIME
+time set: 1
+number of steps: 1
+filename start number: 1
+filename increment: 1
+time values: 0
+"""
+
+
+class TestEnsight:
+    def test_caseVariables(self, tmp_path):
+        case = tmp_path / "Export.case"
+        case.write_text(CASE)
+        variables = caseVariables(str(case))
+        assert list(variables) == [
+            "cfpdes.heat.temperature",
+            "cfpdes.elastic.displacement",
+            "cfpdes.magnetic.magnetic_field",
+        ]
+        assert variables["cfpdes.magnetic.magnetic_field"]["location"] == "element"
+
+    def test_variableBytes(self, tmp_path):
+        case = tmp_path / "Export.case"
+        case.write_text(CASE)
+        (tmp_path / "Export.temperature001").write_bytes(b"0" * 100)
+        variables = caseVariables(str(case))
+        assert variableBytes(variables, ["cfpdes.heat.temperature"]) == 100
+        assert variableBytes(variables, ["cfpdes.magnetic.magnetic_field"]) == 0
+
+    def test_requiredArrays_maps_derived_fields(self):
+        variables = [
+            "cfpdes.heat.temperature",
+            "cfpdes.elastic.displacement",
+            "cfpdes.electric.current_density",
+        ]
+        assert requiredArrays(
+            variables, ["cfpdes.electric.current_densitynorm"], ["displacement"]
+        ) == ["cfpdes.elastic.displacement", "cfpdes.electric.current_density"]
+
+
+# ---------------------------------------------------------------------------
+# cache.py — cacheKey, clearCache, clearEntry
+# ---------------------------------------------------------------------------
+
+import os
+
+from python_hifimagnetParaview.cache import cacheKey, cachePath, clearCache, clearEntry
+
+
+class TestCache:
+    def _case(self, tmp_path):
+        case = tmp_path / "Export.case"
+        case.write_text(CASE)
+        (tmp_path / "Export.temperature001").write_bytes(b"0" * 10)
+        return str(case)
+
+    def test_key_is_stable(self, tmp_path):
+        case = self._case(tmp_path)
+        assert cacheKey(case, {"dimmension": "3D"}) == cacheKey(
+            case, {"dimmension": "3D"}
+        )
+
+    def test_key_depends_on_options_and_data_files(self, tmp_path):
+        case = self._case(tmp_path)
+        key = cacheKey(case, {"dimmension": "3D"})
+        assert key != cacheKey(case, {"dimmension": "2D"})
+        (tmp_path / "Export.temperature001").write_bytes(b"0" * 20)
+        assert key != cacheKey(case, {"dimmension": "3D"})
+
+    def test_clearCache_by_name(self, tmp_path):
+        basedir = str(tmp_path)
+        os.makedirs(f"{basedir}/cache/cellsize-0123")
+        open(f"{cachePath(basedir, '0123')}.vtm", "w").close()
+        open(f"{cachePath(basedir, '4567', name='other')}.vtm", "w").close()
+        clearCache(basedir, "cellsize")
+        assert os.listdir(f"{basedir}/cache") == ["other-4567.vtm"]
+        clearCache(basedir)
+        assert not os.path.exists(f"{basedir}/cache")
+
+    def test_clearEntry_keeps_other_keys(self, tmp_path):
+        basedir = str(tmp_path)
+        os.makedirs(f"{cachePath(basedir, '0123')}")
+        open(f"{cachePath(basedir, '0123')}.vtm", "w").close()
+        open(f"{cachePath(basedir, '4567')}.vtm", "w").close()
+        clearEntry(cachePath(basedir, "0123"))
+        assert os.listdir(f"{basedir}/cache") == ["cellsize-4567.vtm"]
+
+
+# ---------------------------------------------------------------------------
+# store.py — cellAverage, ResultStore
+# ---------------------------------------------------------------------------
+
+from python_hifimagnetParaview.store import ResultStore, cellAverage
+
+
+def _store():
+    # two blocks of two triangles each (unit squares at x=0 and x=1)
+    store = ResultStore(["/Root/A", "/Root/B"], ["A", "B"], "Area")
+    connectivity = np.array([0, 1, 2, 1, 3, 2])
+    offsets = np.array([0, 3, 6])
+    for i in range(2):
+        points = np.array(
+            [[i, 0, 0], [i + 1, 0, 0], [i, 1, 0], [i + 1, 1, 0]], dtype=float
+        )
+        store.setMesh(i, points, connectivity, offsets, np.array([0.5, 0.5]))
+    store.add("PointData", "T", [np.array([0.0, 3.0, 3.0, 6.0]), None])
+    store.add("CellData", "U", [np.array([[3.0, 4.0], [0.0, 1.0]]), np.zeros((2, 2))])
+    return store
+
+
+class TestResultStore:
+    def test_cellAverage(self):
+        values = np.array([0.0, 3.0, 6.0, 9.0])
+        cells = cellAverage(values, np.array([0, 1, 2, 1, 2, 3]), np.array([0, 3, 6]))
+        np.testing.assert_allclose(cells, [3.0, 6.0])
+
+    def test_groupedArray_skips_missing_blocks(self):
+        values, groups = _store().groupedArray("PointData", "T")
+        assert len(values) == 4
+        assert set(groups) == {0}
+
+    def test_array_single_block_is_not_copied(self):
+        store = _store()
+        assert store.array("PointData", "T") is store.arrays["PointData"]["T"][0]
+
+    def test_range_magnitude_and_blocks(self):
+        store = _store()
+        assert store.range("CellData", "U") == (0.0, 5.0)
+        assert store.range("CellData", "U", blocks=["/Root/A"], component=1) == (
+            1.0,
+            4.0,
+        )
+        assert store.range("PointData", "T", blocks=["/Root/B"]) is None
+
+    def test_info_layout(self):
+        info = _store().info()
+        assert info["PointData"]["Arrays"]["T"] == {
+            "Components": 1,
+            "Bounds": [(0.0, 6.0)],
+        }
+        assert info["CellData"]["Arrays"]["U"]["Components"] == 2
+        assert len(info["CellData"]["Arrays"]["U"]["Bounds"]) == 3
+
+    def test_cell_values_measure_and_centers(self):
+        store = _store()
+        values, groups, measure = store.groupedCellArray("T")
+        np.testing.assert_allclose(values, [2.0, 4.0])
+        np.testing.assert_allclose(measure, [0.5, 0.5])
+        assert store.total() == pytest.approx(2.0)
+        np.testing.assert_allclose(store.cellCenters(1)[0], [4 / 3, 1 / 3, 0])
+
+    def test_histograms_of_key_missing_on_a_block(self):
+        # T is only defined on block A, U on both blocks
+        store = _store()
+        fields = {
+            key: store.groupedCellArray(key, magnitude=True) for key in ("T", "U")
+        }
+        histos = coverageHistograms(fields, 2)
+        assert list(histos) == ["T", "U"]
+        assert histos["T"].weights.sum() == pytest.approx(1.0)
+        assert histos["U"].weights.sum() == pytest.approx(2.0)
+        np.testing.assert_allclose(histos["U"].weights, [1.5, 0.5])
+
+
+# ---------------------------------------------------------------------------
+# store.py — saveStore, loadStore
+# ---------------------------------------------------------------------------
+
+from python_hifimagnetParaview.store import isStore, loadStore, saveStore
+
+
+class TestStoreDump:
+    def test_roundtrip_is_memory_mapped(self, tmp_path):
+        store = _store()
+        directory = str(tmp_path / "store-0123")
+        assert not isStore(directory)
+        saveStore(store, directory)
+        assert isStore(directory)
+
+        loaded = loadStore(directory)
+        assert loaded.blocks == store.blocks
+        assert loaded.names == store.names
+        assert loaded.total() == pytest.approx(store.total())
+        assert isinstance(loaded.array("PointData", "T"), np.memmap)
+        assert loaded.blockArray("PointData", "T", "/Root/B") is None
+        np.testing.assert_array_equal(
+            loaded.array("CellData", "U"), store.array("CellData", "U")
+        )
+        assert loaded.info() == store.info()
+
+
+# ---------------------------------------------------------------------------
+# parallel.py — mergeGathered, mergeInfo, serial fallbacks
+# ---------------------------------------------------------------------------
+from python_hifimagnetParaview.parallel import (
+    allMergeMoments,
+    allRange,
+    allSum,
+    isRoot,
+    mergeGathered,
+    mergeInfo,
+)
+
+
+class TestParallel:
+    def test_serial_fallbacks(self):
+        assert isRoot(None)
+        np.testing.assert_array_equal(allSum([1.0, 2.0]), [1.0, 2.0])
+        assert allRange(0.0, 1.0) == (0.0, 1.0)
+        perblock = [Moments.fromColumns({"T": np.arange(3.0)}), None]
+        assert allMergeMoments(perblock) is perblock
+
+    def test_mergeGathered_matches_union(self):
+        rng = np.random.default_rng(3)
+        x = rng.normal(size=20)
+        ranks = [
+            [Moments.fromColumns({"T": x[:8]}), None],
+            [Moments.fromColumns({"T": x[8:]}), None],
+        ]
+        merged = mergeGathered(ranks, mergeMoments)
+        assert merged[1] is None
+        expected = descriptiveStats({"T": x}, "a")
+        assert merged[0].stats("a")["Mean"].iloc[0] == pytest.approx(
+            expected["Mean"].iloc[0]
+        )
+
+    def test_mergeInfo_global_bounds(self):
+        def info(bounds):
+            return {
+                "PointData": {"Arrays": {"T": {"Components": 1, "Bounds": bounds}}}
+            }
+
+        merged = mergeInfo([info([(0.0, 1.0)]), info([None]), info([(-2.0, 0.5)])])
+        assert merged["PointData"]["Arrays"]["T"]["Bounds"] == [(-2.0, 1.0)]
+        assert mergeInfo([info([None])])["PointData"]["Arrays"]["T"]["Bounds"] == [
+            None
+        ]
+
+    def test_mergeInfo_key_missing_on_a_rank(self):
+        ranks = [
+            {"CellData": {"Arrays": {"T": {"Components": 1, "Bounds": [(0.0, 1.0)]}}}},
+            {"CellData": {"Arrays": {}}},
+            {"CellData": {"Arrays": {"J": {"Components": 3, "Bounds": [(2.0, 3.0)]}}}},
+        ]
+        arrays = mergeInfo(ranks)["CellData"]["Arrays"]
+        assert list(arrays) == ["T", "J"]
+        assert arrays["T"]["Bounds"] == [(0.0, 1.0)]
+        assert arrays["J"]["Components"] == 3
+
+
+# ---------------------------------------------------------------------------
+# jobs.py — shardBlocks, shard tasks, BlockPool
+# ---------------------------------------------------------------------------
+import threading
+
+from python_hifimagnetParaview.jobs import (
+    BlockPool,
+    mergeRanges,
+    mergeShards,
+    shardBlocks,
+    shardHistograms,
+    shardMoments,
+    shardRanges,
+)
+
+
+class TestJobs:
+    def test_shardBlocks_balances_cells(self):
+        shards = shardBlocks([10, 1, 1, 8, 2], 2)
+        assert sorted(i for shard in shards for i in shard) == [0, 1, 2, 3, 4]
+        loads = [sum([10, 1, 1, 8, 2][i] for i in shard) for shard in shards]
+        assert loads == [11, 11]
+        assert shardBlocks([3, 2], 4) == [[0], [1]]
+
+    def test_shards_merge_to_serial(self):
+        store = _store()
+        fields = [("PointData", "T"), ("CellData", "U")]
+        serial = shardMoments(store, [0, 1], fields)
+        merged = mergeShards(
+            [shardMoments(store, [0], fields), shardMoments(store, [1], fields)],
+            mergeMoments,
+        )
+        for field in fields:
+            for a, b in zip(serial[field], merged[field], strict=True):
+                assert (a is None) == (b is None)
+                if a is not None:
+                    assert a.mean == pytest.approx(b.mean)
+
+        ranges = mergeRanges([shardRanges(store, [i], ["U"]) for i in (0, 1)])
+        assert ranges == shardRanges(store, [0, 1], ["U"])
+
+    def test_pool_matches_serial(self):
+        store = _store()
+        (lower, upper) = shardRanges(store, [0, 1], ["U"])["U"]
+        edges = {"U": binEdges(lower, upper, 4)}
+        serial = shardHistograms(store, [0, 1], edges)["U"]
+        with BlockPool(store, 2) as pool:
+            pooled = mergeShards(
+                pool.map(shardHistograms, edges), mergeHistograms
+            )["U"]
+        for a, b in zip(serial, pooled, strict=True):
+            np.testing.assert_allclose(a.weights, b.weights)
+
+    def test_pool_spawn_without_dataset(self):
+        store = _store()
+        store.dataset = threading.Lock()  # not picklable, as the VTK dataset
+        with BlockPool(store, 2, method="spawn") as pool:
+            ranges = mergeRanges(pool.map(shardRanges, ["U"]))
+        assert ranges == shardRanges(store, [0, 1], ["U"])
+        assert store.dataset is not None
+
+
+# ---------------------------------------------------------------------------
+# timeseries.py — stepMoments, stepRows, appendRows
+# ---------------------------------------------------------------------------
+import pandas as pd
+
+from python_hifimagnetParaview.timeseries import (
+    COLUMNS,
+    appendRows,
+    stepMoments,
+    stepRows,
+)
+
+
+class TestTimeSeries:
+    def test_stepRows_tidy(self):
+        store = _store()
+        partials = stepMoments(store, [("PointData", "T"), ("CellData", "U")])
+        assert partials[("PointData", "T")][1] is None
+        df = stepRows(3, 0.5, partials, store.names, {"insert": [0, 1]})
+        assert df.columns.to_list() == COLUMNS
+        assert set(df["Step"]) == {3}
+        T = df[(df["Field"] == "T") & (df["Block"] == "A")].set_index("Stat")
+        assert T.loc["Mean", "Value"] == pytest.approx(3.0)
+        assert T.loc["Maximum", "Value"] == pytest.approx(6.0)
+        # vectors are reported by their magnitude, insert merges both blocks
+        U = df[(df["Field"] == "U") & (df["Block"] == "insert")].set_index("Stat")
+        assert U.loc["Maximum", "Value"] == pytest.approx(5.0)
+        assert U.loc["Minimum", "Value"] == pytest.approx(0.0)
+        assert len(df[df["Field"] == "T"]) == 2 * 4
+
+    def test_appendRows_single_header(self, tmp_path):
+        store = _store()
+        partials = stepMoments(store, [("PointData", "T")])
+        csvfile = str(tmp_path / "timeseries.csv")
+        for step in range(3):
+            appendRows(csvfile, stepRows(step, 0.1 * step, partials, store.names))
+        df = pd.read_csv(csvfile)
+        assert df["Step"].to_list() == [0] * 4 + [1] * 4 + [2] * 4
+
+
+# ---------------------------------------------------------------------------
+# batch.py — splitArgs, expandCases, caseArgs, writeIndex, redirectOutput
+# ---------------------------------------------------------------------------
+from python_hifimagnetParaview.batch import (
+    INDEX,
+    caseArgs,
+    expandCases,
+    redirectOutput,
+    splitArgs,
+    writeIndex,
+)
+
+
+class TestBatch:
+    def test_splitArgs(self):
+        assert splitArgs(["a/*.case", "--workers", "2", "--", "3D", "--stats"]) == (
+            ["a/*.case", "--workers", "2"],
+            ["3D", "--stats"],
+        )
+        assert splitArgs(["a.case"]) == (["a.case"], [])
+
+    def test_caseArgs_puts_case_after_dimmension(self):
+        assert caseArgs("x/Export.case", ["3D", "--stats"]) == [
+            "3D",
+            "x/Export.case",
+            "--stats",
+        ]
+
+    def test_expandCases(self, tmp_path):
+        for sub in ("b/meanH", "a/gradH"):
+            (tmp_path / sub).mkdir(parents=True)
+            (tmp_path / sub / "Export.case").write_text("")
+        pattern = str(tmp_path / "**" / "Export.case")
+        cases = expandCases([pattern, str(tmp_path / "a/gradH/Export.case")])
+        assert cases == [
+            str(tmp_path / "a/gradH/Export.case"),
+            str(tmp_path / "b/meanH/Export.case"),
+        ]
+
+    def test_writeIndex(self, tmp_path):
+        rows = [
+            {"case": "b", "status": "failed", "seconds": 1.0, "error": "boom"},
+            {"case": "a", "status": "ok", "seconds": 2.0, "error": ""},
+        ]
+        df = writeIndex(rows, str(tmp_path / "index.csv"))
+        assert df["case"].to_list() == ["a", "b"]
+        assert pd.read_csv(tmp_path / "index.csv").columns.to_list() == INDEX
+
+    def test_redirectOutput_catches_file_descriptors(self, tmp_path):
+        logfile = tmp_path / "batch.log"
+        with open(logfile, "w", buffering=1) as log, redirectOutput(log):
+            print("python", flush=True)
+            # as the C++ code does, bypassing sys.stdout
+            os.write(1, b"stdout\n")
+            os.write(2, b"stderr\n")
+        assert logfile.read_text().split() == ["python", "stdout", "stderr"]
+
+
+# ---------------------------------------------------------------------------
+# renderfarm.py — farmJobs, shardJobs, parseShard, workerArgs
+# ---------------------------------------------------------------------------
+from python_hifimagnetParaview.renderfarm import (
+    farmJobs,
+    parseShard,
+    shardJobs,
+    workerArgs,
+)
+
+
+class TestRenderFarm:
+    def test_farmJobs_one_job_per_view(self):
+        kinds = [("3D", None), ("OxOy", 0.0)]
+        jobs = farmJobs(["", "-deformed"], kinds, ["T", "U"], workers=2)
+        assert len(jobs) == 4
+        assert jobs[0] == ("", "3D", None, ("T", "U"))
+
+    def test_farmJobs_chunks_fields_for_idle_workers(self):
+        jobs = farmJobs([""], [("3D", None)], ["T", "U", "J", "B"], workers=3)
+        assert [job[3] for job in jobs] == [("T", "U"), ("J", "B")]
+        jobs = farmJobs([""], [("3D", None)], ["T", "U"], workers=8)
+        assert [job[3] for job in jobs] == [("T",), ("U",)]
+
+    def test_shards_cover_jobs_once(self):
+        jobs = farmJobs([""], [("OrOz", t) for t in range(0, 181, 30)], ["T"], 3)
+        shards = [shardJobs(jobs, k, 3) for k in range(3)]
+        assert sorted(sum(shards, [])) == sorted(jobs)
+
+    def test_parseShard(self):
+        assert parseShard("1/4") == (1, 4)
+        with pytest.raises(ValueError):
+            parseShard("4/4")
+
+    def test_workerArgs_strips_parent_options(self):
+        argv = ["3D", "x.case", "--stats", "--renderJobs", "4", "--views", "--jobs=2"]
+        assert workerArgs(argv, 1, 4, B0=12.5, key="abc") == [
+            "3D",
+            "x.case",
+            "--views",
+            "--B0",
+            "12.5",
+            "--cacheKey",
+            "abc",
+            "--viewShard",
+            "1/4",
+        ]
+
+
+# ---------------------------------------------------------------------------
+# manifest.py — viewFingerprint, ViewManifest
+# ---------------------------------------------------------------------------
+from python_hifimagnetParaview.manifest import ViewManifest, viewFingerprint
+
+
+class TestViewManifest:
+    def _view(self, basedir, name="T.png"):
+        (basedir / "views").mkdir(exist_ok=True)
+        view = basedir / "views" / name
+        view.write_bytes(b"png")
+        return str(view)
+
+    def test_viewFingerprint_is_order_independent(self):
+        a = viewFingerprint({"field": "T", "camera": {"roll": 90, "Up": (0, 1, 0)}})
+        b = viewFingerprint({"camera": {"Up": [0, 1, 0], "roll": 90}, "field": "T"})
+        assert a == b
+        assert a != viewFingerprint({"field": "T", "camera": {"roll": 0}})
+
+    def test_unchanged_view_is_skipped(self, tmp_path):
+        view = self._view(tmp_path)
+        manifest = ViewManifest(str(tmp_path), "key")
+        assert manifest.stale(view, {"field": "T"})
+        manifest.record(view)
+        manifest.save()
+
+        manifest = ViewManifest(str(tmp_path), "key")
+        assert not manifest.stale(view, {"field": "T"})
+        assert manifest.stale(view, {"field": "T", "background": True})
+        assert ViewManifest(str(tmp_path), "other").stale(view, {"field": "T"})
+        assert ViewManifest(str(tmp_path), "key", force=True).stale(view, {"field": "T"})
+
+    def test_missing_file_is_stale(self, tmp_path):
+        view = self._view(tmp_path)
+        manifest = ViewManifest(str(tmp_path), "key")
+        manifest.stale(view, {})
+        manifest.record(view)
+        os.remove(view)
+        assert manifest.stale(view, {})
+
+    def test_save_merges_concurrent_manifests(self, tmp_path):
+        views = [self._view(tmp_path, f"{name}.png") for name in ("T", "U")]
+        manifests = [ViewManifest(str(tmp_path), "key") for _ in views]
+        for manifest, view in zip(manifests, views, strict=True):
+            manifest.stale(view, {})
+            manifest.record(view)
+        for manifest in manifests:
+            manifest.save()
+        entries = ViewManifest(str(tmp_path), "key").entries
+        assert sorted(entries) == ["views/T.png", "views/U.png"]
+
+
+# ---------------------------------------------------------------------------
+# ranges.py — trimmedRange, RangeService
+# ---------------------------------------------------------------------------
+from python_hifimagnetParaview.nphisto import Histogram
+from python_hifimagnetParaview.ranges import RangeService, trimmedRange
+
+
+class TestRanges:
+    def test_trimmedRange_drops_extreme_bins(self):
+        histogram = Histogram(
+            np.arange(5.0), np.array([1e-4, 1.0, 0.0, 1.0]), 4, 0.0, 4.0
+        )
+        assert trimmedRange(histogram, 1e-3) == (1.5, 3.5)
+        assert trimmedRange(histogram, 0.0) == (0.5, 3.5)
+        assert trimmedRange(None) is None
+
+    def test_range_over_blocks(self):
+        ranges = RangeService(_store())
+        assert ranges.range("U") == (0.0, 5.0)
+        assert ranges.range("U", ["/Root/A"]) == (1.0, 5.0)
+        assert ranges.range("T", ["/Root/B"]) is None
+        assert ranges.range("missing") is None
+
+    def test_trimmed_range_uses_stored_histograms(self):
+        store = _store()
+        ranges = RangeService(store, BinCount=5)
+        assert ranges.range("U", trim=0.0) == pytest.approx((0.0, 5.0))
+        assert len(store.histograms["U"]) == 2
+
+        # histograms of meshinfo are reused, dropped when the field changes
+        edges = np.array([0.0, 1.0, 2.0])
+        store.histograms["U"] = [Histogram(edges, [0.0, 1.0], 1, 1.5, 1.5), None]
+        assert RangeService(store).range("U", trim=0.1) == (1.5, 1.5)
+        store.add("CellData", "U", [np.ones((2, 2)), None])
+        assert "U" not in store.histograms
+
+
+# ---------------------------------------------------------------------------
+# probe.py — linePoints, ProbeLines, lineFields, mergeBlockProbes
+# ---------------------------------------------------------------------------
+from python_hifimagnetParaview.probe import (
+    VALID,
+    ProbeLines,
+    lineFields,
+    linePoints,
+    mergeBlockProbes,
+)
+
+
+class TestProbe:
+    def test_linePoints(self):
+        points = linePoints([0.0, 0.0, 0.0], [1.0, 2.0, 0.0], 4)
+        assert points.shape == (5, 3)
+        np.testing.assert_allclose(points[0], [0.0, 0.0, 0.0])
+        np.testing.assert_allclose(points[2], [0.5, 1.0, 0.0])
+        np.testing.assert_allclose(points[-1], [1.0, 2.0, 0.0])
+
+    def test_sample_lines_in_a_single_probe(self):
+        lines = ProbeLines(resolution=2)
+        lines.add("Or", [1.0, 0.0, 0.0], [3.0, 0.0, 0.0])
+        lines.add("Oz", [0.0, 0.0, -1.0], [0.0, 0.0, 1.0])
+        calls = []
+
+        def probe(points):
+            calls.append(len(points))
+            return {"x": points[:, 0], "z": points[:, 2]}
+
+        samples = lines.sample(probe)
+        assert calls == [6]
+        np.testing.assert_allclose(samples["Or"]["arc_length"], [0.0, 1.0, 2.0])
+        np.testing.assert_allclose(samples["Or"]["x"], [1.0, 2.0, 3.0])
+        np.testing.assert_allclose(samples["Oz"]["z"], [-1.0, 0.0, 1.0])
+        assert ProbeLines().sample(probe) == {}
+
+    def test_circle_sampled_with_lines(self):
+        lines = ProbeLines(resolution=2)
+        lines.add("Or", [1.0, 0.0, 0.0], [3.0, 0.0, 0.0])
+        lines.addCircle("Otheta", 2.0, 0.5, resolution=4)
+        samples = lines.sample(lambda points: {"x": points[:, 0], "z": points[:, 2]})
+        circle = samples["Otheta"]
+        np.testing.assert_allclose(circle["theta"], [-180.0, -90.0, 0.0, 90.0, 180.0])
+        np.testing.assert_allclose(circle["x"], [-2.0, 0.0, 2.0, 0.0, -2.0], atol=1e-12)
+        np.testing.assert_allclose(circle["z"], 0.5)
+        assert circle["arc_length"][-1] == pytest.approx(4 * np.pi)
+        assert lineFields(circle, []) == {"x": 1, "z": 1}
+
+    def test_lineFields(self):
+        samples = {
+            "arc_length": np.zeros(3),
+            "heat.temperature": np.zeros(3),
+            "elasticity.displacement": np.zeros((3, 3)),
+            "vtkValidPointMask": np.zeros(3),
+        }
+        assert lineFields(samples, ["vtkValidPointMask"]) == {
+            "heat.temperature": 1,
+            "elasticity.displacement": 3,
+        }
+        assert lineFields(samples, [], "heat") == {"heat.temperature": 1}
+
+    def test_mergeBlockProbes_first_block_wins(self):
+        first = {"T": np.array([1.0, 2.0, 0.0, 0.0]), "U": np.zeros(4)}
+        second = {"T": np.array([0.0, 9.0, 3.0, 0.0])}
+        probes = [(np.array([1, 1, 0, 0]), first), (np.array([0, 1, 1, 0]), second)]
+        values = mergeBlockProbes(probes, 4)
+        # U is missing from the second block, the last point is outside
+        assert list(values) == ["T", VALID]
+        np.testing.assert_allclose(values["T"], [1.0, 2.0, 3.0, 0.0])
+        np.testing.assert_array_equal(values[VALID], [1, 1, 1, 0])
+        assert mergeBlockProbes([], 4) == {}
+
+
+# ---------------------------------------------------------------------------
+# grid.py — gridAxes, CylindricalGrid, saveGrid/loadGrid
+# ---------------------------------------------------------------------------
+from python_hifimagnetParaview.grid import (
+    CylindricalGrid,
+    gridAxes,
+    gridPath,
+    loadGrid,
+    saveGrid,
+)
+
+
+def _grid(kind="3D", resolution=(4, 8, 2)):
+    grid = CylindricalGrid(kind, gridAxes(kind, (-1, 1, -1, 1, 0, 1), resolution))
+    points = grid.points()
+    valid = np.ones(len(points))
+    grid.fill(
+        {
+            "T": points[:, 0] + 2 * points[:, 2],
+            "U": np.stack([points[:, 2]] * 3, axis=1),
+            VALID: valid,
+        }
+    )
+    return grid
+
+
+class TestGrid:
+    def test_gridAxes(self):
+        axes = gridAxes("3D", (-1, 1, 0, 1, -2, 2), [4])
+        assert list(axes) == ["r", "theta", "z"]
+        assert axes["r"][-1] == pytest.approx(np.sqrt(2))
+        assert (axes["theta"][0], axes["theta"][-1]) == (-180.0, 180.0)
+        axes = gridAxes("Axi", (0.1, 0.5, -1, 1, 0, 0), [2, 4])
+        np.testing.assert_allclose(axes["r"], [0.1, 0.3, 0.5])
+        assert len(axes["z"]) == 5
+        with pytest.raises(ValueError):
+            gridAxes("2D", (0, 1, 0, 1, 0, 0), [2, 2, 2])
+
+    def test_points_and_coordinates(self):
+        grid = CylindricalGrid("3D", gridAxes("3D", (-1, 1, -1, 1, 0, 1), [2, 4, 1]))
+        points = grid.points()
+        assert points.shape == (3 * 5 * 2, 3)
+        coords = grid.coordinates(points[[-1]])
+        np.testing.assert_allclose(coords, [[grid.axes["r"][-1], 180.0, 1.0]])
+
+    def test_probe_interpolates(self):
+        grid = _grid()
+        values = grid.probe(np.array([[0.5, 0.0, 0.25], [0.0, 0.5, 0.75], [5, 0, 0]]))
+        np.testing.assert_allclose(values["T"], [1.0, 1.5, 0.0], atol=1e-6)
+        np.testing.assert_allclose(values["U"][1], [0.75] * 3)
+        np.testing.assert_array_equal(values[VALID], [1, 1, 0])
+
+    def test_probe_invalid_nodes(self):
+        grid = _grid("Axi", (2, 2))
+        grid.valid[0, 0] = False
+        values = grid.probe(np.array([[-0.9, -0.9, 0.0], [-1.0, 0.0, 0.0]]))
+        np.testing.assert_array_equal(values[VALID], [0, 1])
+        assert values["T"][0] == 0.0
+
+    def test_save_load(self, tmp_path):
+        grid = _grid()
+        file = gridPath(str(tmp_path), "key", [4, 8, 2])
+        assert file.endswith("cache/grid-key-4x8x2.npz")
+        saveGrid(grid, file)
+        loaded = loadGrid(file)
+        assert loaded.kind == "3D" and loaded.shape == grid.shape
+        np.testing.assert_array_equal(loaded.values["U"], grid.values["U"])
+        points = np.array([[0.3, 0.2, 0.4]])
+        np.testing.assert_allclose(loaded.probe(points)["T"], grid.probe(points)["T"])
+
+
+# ---------------------------------------------------------------------------
+# cli.py — main argv path, ParaView replaced by mocks
+# ---------------------------------------------------------------------------
+import importlib
+import sys
+from unittest import mock
+
+PARAVIEW_MODULES = [
+    "paraview",
+    "paraview.simple",
+    "paraview.servermanager",
+    "paraview.vtk",
+    "paraview.vtk.numpy_interface",
+    "paraview.vtk.numpy_interface.dataset_adapter",
+    "paraview.vtk.numpy_interface.algorithms",
+    "vtkmodules",
+    "vtkmodules.util",
+    "vtkmodules.util.numpy_support",
+    "vtkmodules.vtkCommonCore",
+    "vtkmodules.vtkCommonDataModel",
+    "vtkmodules.vtkFiltersCore",
+]
+
+
+class ReachedParaView(Exception):
+    """raised by the first ParaView call of cli.main"""
+
+
+@pytest.fixture
+def stubcli(monkeypatch):
+    """cli imported with ParaView mocked, GetParaViewVersion raises ReachedParaView"""
+
+    def imported():
+        return [
+            name
+            for name in sys.modules
+            if name.split(".")[0] in ("paraview", "vtkmodules", "python_hifimagnetParaview")
+        ]
+
+    for name in imported():
+        monkeypatch.delitem(sys.modules, name)
+    for name in PARAVIEW_MODULES:
+        monkeypatch.setitem(sys.modules, name, mock.MagicMock())
+    simple = sys.modules["paraview.simple"]
+    simple.GetParaViewVersion.side_effect = ReachedParaView
+    yield importlib.import_module("python_hifimagnetParaview.cli")
+    for name in imported():
+        del sys.modules[name]
+
+
+class TestCliMain:
+    def test_main_reaches_paraview(self, stubcli, tmp_path):
+        case = str(tmp_path / "Export.case")
+        with pytest.raises(ReachedParaView):
+            stubcli.main(["3D", case, "--stats", "--plots", "--r", "0.1"])
+        assert os.path.isdir(tmp_path / "paraview.exports")
+
+    def test_runCase_reaches_paraview(self, stubcli, tmp_path):
+        from python_hifimagnetParaview.batch import runCase
+
+        row = runCase(str(tmp_path / "Export.case"), ["2D", "--stats"])
+        assert row["status"] == "failed"
+        assert row["error"] == repr(ReachedParaView())
+
+    def test_worker_keeps_parent_cache_key(self, stubcli):
+        argv = ["3D", "x.case", "--field", "T", "--stats", "--views", "--renderJobs", "2"]
+        args = stubcli.options("", "").parse_args(workerArgs(argv, 1, 2, key="abc"))
+        assert (args.cacheKey, args.viewShard) == ("abc", (1, 2))
+        assert not args.stats and args.renderJobs == 1